@@ -0,0 +1,187 @@
+"""
+Scan service load test
+Drives a running scan service (python main.py serve) on localhost with
+concurrent single, batch or streamed requests and reports throughput and
+latency percentiles
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import http.client
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from synthetic_corpus import SyntheticCorpus  # noqa: E402
+from run_benchmarks import _isolate_environment  # noqa: E402
+
+
+def build_texts(count: int, size: int, seed: int = 1337) -> List[str]:
+    """Paste-like texts: credential dumps mixed with ordinary pages"""
+    corpus = SyntheticCorpus(seed)
+    return [
+        corpus.credential_dump(size, i) if i % 2 else corpus.html_page(size, i)
+        for i in range(count)
+    ]
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    from host_health import percentile
+    return {
+        name: round(percentile(samples, fraction) * 1000, 3) if samples else None
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99))
+    }
+
+
+def run_load(url: str, mode: str = 'single', clients: int = 4, requests: int = 200,
+             batch_size: int = 10, size: int = 2_000, seed: int = 1337) -> Dict:
+    """Send `requests` requests from `clients` keep-alive connections
+
+    Each single request scans one text; batch and stream requests carry
+    batch_size texts. Client latency is measured around each request; the
+    server-reported latency comes from the X-Scan-Seconds header (or the
+    stream's final line).
+    """
+    target = urlparse(url)
+    texts = build_texts(max(batch_size, 16), size, seed)
+    client_seconds: List[float] = []
+    server_seconds: List[float] = []
+    counts = {'requests': 0, 'items': 0, 'findings': 0, 'errors': 0}
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def take() -> bool:
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def items_for(n: int) -> List[Dict]:
+        return [{'id': i, 'text': texts[(n + i) % len(texts)]} for i in range(batch_size)]
+
+    def one_request(conn: http.client.HTTPConnection, n: int):
+        if mode == 'single':
+            body = json.dumps({'text': texts[n % len(texts)]})
+            conn.request('POST', '/scan', body=body, headers={'Content-Type': 'application/json'})
+        elif mode == 'batch':
+            body = json.dumps({'items': items_for(n)})
+            conn.request('POST', '/scan/batch', body=body, headers={'Content-Type': 'application/json'})
+        else:
+            lines = (json.dumps(item).encode('utf-8') + b'\n' for item in items_for(n))
+            conn.request('POST', '/scan/stream', body=lines, encode_chunked=True,
+                         headers={'Content-Type': 'application/x-ndjson'})
+
+        response = conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {data[:200]!r}")
+        if mode == 'stream':
+            records = [json.loads(line) for line in data.splitlines() if line.strip()]
+            trailer = records.pop()
+            return len(records), sum(len(r.get('findings', [])) for r in records), trailer['seconds']
+        payload = json.loads(data)
+        if mode == 'single':
+            return 1, len(payload['findings']), float(response.headers['X-Scan-Seconds'])
+        findings = sum(len(r['findings']) for r in payload['results'])
+        return len(payload['results']), findings, float(response.headers['X-Scan-Seconds'])
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+        n = 0
+        while take():
+            n += 1
+            started = time.perf_counter()
+            try:
+                items, findings, server = one_request(conn, n)
+            except Exception:
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+                with lock:
+                    counts['errors'] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                counts['requests'] += 1
+                counts['items'] += items
+                counts['findings'] += findings
+                client_seconds.append(elapsed)
+                server_seconds.append(server)
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, name=f"load-{i}") for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    return dict(
+        counts,
+        mode=mode,
+        clients=clients,
+        seconds=round(elapsed, 3),
+        requests_per_second=round(counts['requests'] / elapsed, 1),
+        items_per_second=round(counts['items'] / elapsed, 1),
+        client=_percentiles(client_seconds),
+        server=_percentiles(server_seconds),
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test the scan service')
+    parser.add_argument('--url', default=None, help='Service URL (default SCAN_SERVICE_HOST/PORT)')
+    parser.add_argument('--mode', choices=['single', 'batch', 'stream'], default='single')
+    parser.add_argument('-c', '--clients', type=int, default=8, help='Concurrent connections')
+    parser.add_argument('-n', '--requests', type=int, default=1000, help='Total requests')
+    parser.add_argument('--batch-size', type=int, default=20, help='Texts per batch or stream request')
+    parser.add_argument('--size', type=int, default=2_000, help='Characters per text')
+    parser.add_argument('--seed', type=int, default=1337, help='Corpus seed')
+    parser.add_argument('--spawn', action='store_true',
+                        help='Start a service in this process on a free port instead of using --url')
+    parser.add_argument('-w', '--workers', type=int, help='Workers of a --spawn service')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    service = None
+    if args.spawn:
+        _isolate_environment(tempfile.mkdtemp(prefix='darkwalker-load-'))
+        from scan_service import ScanService
+        service = ScanService(port=0, workers=args.workers).start()
+        url = service.url
+    else:
+        from config import get_config
+        config = get_config()
+        url = args.url or f"http://{config.SCAN_SERVICE_HOST}:{config.SCAN_SERVICE_PORT}"
+
+    try:
+        report = run_load(url, mode=args.mode, clients=args.clients, requests=args.requests,
+                          batch_size=args.batch_size, size=args.size, seed=args.seed)
+    finally:
+        if service:
+            service.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['mode']}: {report['requests']} requests, {report['items']} texts, "
+              f"{report['errors']} errors in {report['seconds']}s from {report['clients']} clients")
+        print(f"  {report['requests_per_second']} requests/s, {report['items_per_second']} texts/s")
+        for side in ('client', 'server'):
+            latency = report[side]
+            print(f"  {side} latency ms: p50 {latency['p50_ms']}  p95 {latency['p95_ms']}  "
+                  f"p99 {latency['p99_ms']}")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,489 @@
+"""
+Mock onion network
+Local HTTP server and SOCKS5 stand-in that simulate onion hosts with Tor-like
+latency, bandwidth, errors, huge pages, slow-drip responses and a link graph
+"""
+
+import os
+import sys
+import time
+import random
+import select
+import socket
+import struct
+import threading
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingTCPServer, BaseRequestHandler
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_corpus import SyntheticCorpus  # noqa: E402
+
+
+@dataclass
+class HostProfile:
+    """Network behaviour of a simulated onion host
+
+    latency is the median time to first byte in seconds; latency_sigma is the
+    lognormal shape (0 makes it fixed). bandwidth caps bytes per second
+    (0 = unlimited). error_rate answers with 503 and reset_rate drops the
+    connection without a response. A slow-drip host sends drip_bytes every
+    drip_interval seconds.
+    """
+    latency: float = 0.0
+    latency_sigma: float = 0.0
+    bandwidth: int = 0
+    error_rate: float = 0.0
+    reset_rate: float = 0.0
+    page_size: int = 8_000
+    huge_page_rate: float = 0.0
+    huge_page_size: int = 5_000_000
+    slow_drip: bool = False
+    drip_bytes: int = 64
+    drip_interval: float = 0.5
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Draw one time-to-first-byte"""
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency
+        return self.latency * rng.lognormvariate(0.0, self.latency_sigma)
+
+
+# Roughly what a healthy onion service looks like through a 3-hop circuit
+TOR_LIKE = HostProfile(latency=0.8, latency_sigma=0.6, bandwidth=250_000, error_rate=0.03, reset_rate=0.02)
+
+
+@dataclass
+class MockStats:
+    """Request counters collected by the server"""
+    requests: int = 0
+    errors: int = 0
+    resets: int = 0
+    bytes_sent: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    per_host: Dict[str, int] = field(default_factory=dict)
+
+
+class MockOnionNetwork:
+    """Deterministic set of onion hosts, their link graph and page content
+
+    Search engine hosts answer '?q=' with a results page linking to other
+    hosts; wiki hosts are directories linking to many hosts; every other
+    host serves a forum-style page with links_per_page outgoing links.
+    """
+
+    def __init__(self, hosts: int = 50, links_per_page: int = 5, seed: int = 1337,
+                 profile: Optional[HostProfile] = None,
+                 search_engines: Tuple[str, ...] = ('ahmia', 'torch'),
+                 wikis: Tuple[str, ...] = ('main',)):
+        """Initialize network"""
+        self.seed = seed
+        self.corpus = SyntheticCorpus(seed)
+        self.default_profile = profile or HostProfile()
+        self.overrides: Dict[str, HostProfile] = {}
+        rng = random.Random(f"{seed}:network")
+
+        self.hosts: List[str] = [SyntheticCorpus.onion_host(rng) for _ in range(hosts)]
+        self.search_engines = {name: SyntheticCorpus.onion_host(rng) for name in search_engines}
+        self.wikis = {name: SyntheticCorpus.onion_host(rng) for name in wikis}
+        self.links: Dict[str, List[str]] = {
+            host: rng.sample([h for h in self.hosts if h != host], min(links_per_page, hosts - 1))
+            for host in self.hosts
+        }
+        for wiki in self.wikis.values():
+            self.links[wiki] = list(self.hosts)
+        self._index = {host: i for i, host in enumerate(self.hosts)}
+        self._pages: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+
+    def all_hosts(self) -> List[str]:
+        """Every simulated host, including engines and wikis"""
+        return list(self.search_engines.values()) + list(self.wikis.values()) + self.hosts
+
+    def set_profile(self, host: str, **changes) -> HostProfile:
+        """Override the behaviour of one host"""
+        self.overrides[host] = replace(self.profile(host), **changes)
+        return self.overrides[host]
+
+    def profile(self, host: str) -> HostProfile:
+        """Behaviour of a host"""
+        return self.overrides.get(host, self.default_profile)
+
+    def _body(self, host: str, size: int) -> str:
+        key = (host, size)
+        with self._lock:
+            page = self._pages.get(key)
+        if page is None:
+            base = self.corpus.html_page(min(size, 50_000), self._index.get(host, 0))
+            page = (base * (size // len(base) + 1))[:size] if size > len(base) else base
+            with self._lock:
+                self._pages[key] = page
+        return page
+
+    def render(self, host: str, path: str, query: Dict[str, List[str]], link_base: str,
+               huge: bool = False) -> Optional[str]:
+        """Render a page, or None for an unknown host"""
+        profile = self.profile(host)
+
+        def link(target: str) -> str:
+            return f'<a href="{link_base.format(host=target)}">{target}</a>'
+
+        if host in self.search_engines.values():
+            terms = ' '.join(query.get('q', ['']))
+            rng = random.Random(f"{self.seed}:search:{host}:{terms}")
+            hits = rng.sample(self.hosts, min(10, len(self.hosts)))
+            items = ''.join(
+                f"<li>{link(h)} <p>{terms} results: contact {h[:8]}@mail.example.com</p></li>"
+                for h in hits
+            )
+            return f"<html><body><h1>Results for {terms}</h1><ol>{items}</ol></body></html>"
+
+        if host in self.wikis.values():
+            items = ''.join(f"<li>{link(h)}</li>" for h in self.links[host])
+            return (f"<html><body><h1>Hidden Wiki</h1><ul>{items}</ul>"
+                    f"<p>Submit links to admin@{host}</p></body></html>")
+
+        if host not in self._index:
+            return None
+
+        size = profile.huge_page_size if huge else profile.page_size
+        links = ''.join(link(h) for h in self.links[host])
+        return self._body(host, size).replace('</body>', f"<nav>{links}</nav></body>")
+
+
+class MockOnionServer:
+    """HTTP server for a MockOnionNetwork
+
+    Reached through the SOCKS stand-in, the onion host is taken from the Host
+    header. Reached directly, URLs carry the host as the first path segment
+    (http://127.0.0.1:PORT/<host>.onion/...), so it also works without a proxy.
+    """
+
+    def __init__(self, network: MockOnionNetwork, host: str = '127.0.0.1', port: int = 0):
+        self.network = network
+        self.stats = MockStats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(f"{network.seed}:server")
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def url_for(self, onion_host: str, via_proxy: bool = False) -> str:
+        """URL of a host's front page in direct or proxied form"""
+        if via_proxy:
+            return f"http://{onion_host}/"
+        return f"{self.base_url}/{onion_host}/"
+
+    def config_overrides(self, proxy: Optional['SocksProxy'] = None) -> Dict:
+        """Config attributes that point the monitor at this network
+
+        Use with mock.patch.multiple(Config, **overrides) in-process.
+        """
+        via_proxy = proxy is not None
+        overrides = {
+            'DARK_WEB_SEARCH_ENGINES': {
+                name: self.url_for(host, via_proxy).rstrip('/')
+                for name, host in self.network.search_engines.items()
+            },
+            'HIDDEN_WIKI_URLS': {
+                name: self.url_for(host, via_proxy) for name, host in self.network.wikis.items()
+            },
+            'TOR_ENABLED': via_proxy,
+        }
+        if proxy:
+            overrides['PROXY_URL'] = proxy.url
+        return overrides
+
+    def environment(self, proxy: Optional['SocksProxy'] = None) -> Dict[str, str]:
+        """Environment variables equivalent to config_overrides"""
+        overrides = self.config_overrides(proxy)
+        env = {
+            'DARK_WEB_SEARCH_ENGINES': ','.join(f"{k}={v}" for k, v in overrides['DARK_WEB_SEARCH_ENGINES'].items()),
+            'HIDDEN_WIKI_URLS': ','.join(f"{k}={v}" for k, v in overrides['HIDDEN_WIKI_URLS'].items()),
+            'TOR_ENABLED': str(overrides['TOR_ENABLED']),
+        }
+        if proxy:
+            env['TOR_HOST'], env['TOR_PORT'] = proxy.address[0], str(proxy.address[1])
+        return env
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        parts = urlsplit(handler.path)
+        host_header = (handler.headers.get('Host') or '').split(':')[0]
+
+        if host_header.endswith('.onion'):
+            onion_host, path = host_header, parts.path or '/'
+            link_base = 'http://{host}/'
+        else:
+            segments = parts.path.lstrip('/').split('/', 1)
+            onion_host = segments[0]
+            path = '/' + (segments[1] if len(segments) > 1 else '')
+            link_base = self.base_url + '/{host}/'
+
+        profile = self.network.profile(onion_host)
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+            self.stats.per_host[onion_host] = self.stats.per_host.get(onion_host, 0) + 1
+            roll, huge_roll = self._rng.random(), self._rng.random()
+            latency = profile.sample_latency(self._rng)
+
+        try:
+            time.sleep(latency)
+
+            if roll < profile.reset_rate:
+                with self._lock:
+                    self.stats.resets += 1
+                handler.close_connection = True
+                handler.connection.shutdown(socket.SHUT_RDWR)
+                return
+
+            body = None
+            if roll < profile.reset_rate + profile.error_rate:
+                status = 503
+            else:
+                body = self.network.render(
+                    onion_host, path, parse_qs(parts.query), link_base,
+                    huge=huge_roll < profile.huge_page_rate
+                )
+                status = 200 if body is not None else 404
+
+            if status != 200:
+                with self._lock:
+                    self.stats.errors += 1
+                body = f"<html><body>{status}</body></html>"
+
+            data = body.encode('utf-8')
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'text/html; charset=utf-8')
+            handler.send_header('Content-Length', str(len(data)))
+            handler.end_headers()
+            self._send_body(handler, data, profile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._lock:
+                self.stats.in_flight -= 1
+
+    def _send_body(self, handler: BaseHTTPRequestHandler, data: bytes, profile: HostProfile):
+        if profile.slow_drip:
+            chunk, delay = profile.drip_bytes, profile.drip_interval
+        elif profile.bandwidth:
+            chunk = 16_384
+            delay = chunk / profile.bandwidth
+        else:
+            chunk, delay = len(data) or 1, 0.0
+
+        for start in range(0, len(data), chunk):
+            handler.wfile.write(data[start:start + chunk])
+            handler.wfile.flush()
+            with self._lock:
+                self.stats.bytes_sent += len(data[start:start + chunk])
+            if delay and start + chunk < len(data):
+                time.sleep(delay)
+
+    def start(self) -> 'MockOnionServer':
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-onion', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class SocksProxy:
+    """Minimal SOCKS5 (no auth, CONNECT) stand-in for the Tor client
+
+    Every CONNECT, whatever the requested host and port, is relayed to the
+    mock HTTP server, so crawler sessions configured for Tor reach the
+    simulated network unchanged. An optional circuit_latency is added once
+    per connection to model circuit build time.
+    """
+
+    def __init__(self, target: Tuple[str, int], host: str = '127.0.0.1', port: int = 0,
+                 circuit_latency: float = 0.0):
+        self.target = target
+        self.circuit_latency = circuit_latency
+        self.connections = 0
+        proxy = self
+
+        class Handler(BaseRequestHandler):
+            def handle(self):
+                proxy._handle(self.request)
+
+        ThreadingTCPServer.allow_reuse_address = True
+        self.server = ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"socks5h://{host}:{port}"
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('client closed during handshake')
+            data += chunk
+        return data
+
+    def _handle(self, client: socket.socket):
+        try:
+            version, methods = self._recv_exact(client, 2)
+            self._recv_exact(client, methods)
+            if version != 5:
+                return
+            client.sendall(b'\x05\x00')
+
+            _, command, _, address_type = self._recv_exact(client, 4)
+            if address_type == 1:
+                self._recv_exact(client, 4)
+            elif address_type == 3:
+                self._recv_exact(client, self._recv_exact(client, 1)[0])
+            elif address_type == 4:
+                self._recv_exact(client, 16)
+            self._recv_exact(client, 2)
+
+            if command != 1:
+                client.sendall(b'\x05\x07\x00\x01' + b'\x00' * 6)
+                return
+
+            time.sleep(self.circuit_latency)
+            upstream = socket.create_connection(self.target)
+            self.connections += 1
+            client.sendall(b'\x05\x00\x00\x01' + socket.inet_aton('127.0.0.1') + struct.pack('!H', 0))
+            self._relay(client, upstream)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            client.close()
+
+    @staticmethod
+    def _relay(client: socket.socket, upstream: socket.socket):
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], 30)
+                if not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(65_536)
+                    if not data:
+                        return
+                    (upstream if sock is client else client).sendall(data)
+        finally:
+            upstream.close()
+
+    def start(self) -> 'SocksProxy':
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, name='mock-socks', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the proxy"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a mock onion network for load and latency testing')
+    parser.add_argument('--port', type=int, default=8118, help='HTTP port')
+    parser.add_argument('--socks-port', type=int, default=0, help='Also run a SOCKS5 stand-in on this port')
+    parser.add_argument('--hosts', type=int, default=200, help='Number of simulated onion hosts')
+    parser.add_argument('--links', type=int, default=5, help='Outgoing links per page')
+    parser.add_argument('--seed', type=int, default=1337, help='Network seed')
+    parser.add_argument('--tor-like', action='store_true', help='Tor-like latency, bandwidth and errors')
+    parser.add_argument('--latency', type=float, help='Median time to first byte (s)')
+    parser.add_argument('--latency-sigma', type=float, help='Lognormal latency spread')
+    parser.add_argument('--bandwidth', type=int, help='Bytes per second per response')
+    parser.add_argument('--error-rate', type=float, help='Fraction of 503 responses')
+    parser.add_argument('--reset-rate', type=float, help='Fraction of dropped connections')
+    parser.add_argument('--page-size', type=int, help='Characters per page')
+    parser.add_argument('--huge-page-rate', type=float, help='Fraction of huge pages')
+    parser.add_argument('--slow-drip', action='store_true', help='Drip responses a few bytes at a time')
+    args = parser.parse_args()
+
+    profile = TOR_LIKE if args.tor_like else HostProfile()
+    changes = {
+        name: getattr(args, name)
+        for name in ('latency', 'latency_sigma', 'bandwidth', 'error_rate', 'reset_rate',
+                     'page_size', 'huge_page_rate')
+        if getattr(args, name) is not None
+    }
+    if args.slow_drip:
+        changes['slow_drip'] = True
+    profile = replace(profile, **changes)
+
+    network = MockOnionNetwork(args.hosts, args.links, args.seed, profile)
+    server = MockOnionServer(network, port=args.port).start()
+    proxy = SocksProxy(server.address, port=args.socks_port).start() if args.socks_port else None
+
+    print(f"Mock onion network with {len(network.all_hosts())} hosts on {server.base_url}")
+    if proxy:
+        print(f"SOCKS5 stand-in on {proxy.url}")
+    print("Point the monitor at it with:")
+    for name, value in server.environment(proxy).items():
+        print(f"  export {name}='{value}'")
+
+    try:
+        while True:
+            time.sleep(5)
+            stats = server.stats
+            print(f"requests={stats.requests} errors={stats.errors} resets={stats.resets} "
+                  f"bytes={stats.bytes_sent} max_in_flight={stats.max_in_flight}", flush=True)
+    except KeyboardInterrupt:
+        server.stop()
+        if proxy:
+            proxy.stop()
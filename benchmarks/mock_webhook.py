@@ -0,0 +1,104 @@
+"""
+Mock webhook receiver
+Local HTTP stand-in for alert webhooks that records delivered batches and
+can answer slowly or with errors
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple
+
+
+class MockWebhookServer:
+    """HTTP server that accepts alert batches on any path
+
+    Each POSTed JSON body is kept in `batches` with its arrival time. The
+    next `fail_next` requests are answered with `fail_status`, and every
+    request is held for `latency` seconds first, to stand in for a broken
+    or slow alert endpoint.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.fail_status = 503
+        self.requests = 0
+        self.batches: List[Dict] = []
+        self._lock = threading.Lock()
+        self._received = threading.Condition(self._lock)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}/alerts"
+
+    @property
+    def alerts(self) -> List[Dict]:
+        """All alerts received so far, in arrival order"""
+        with self._lock:
+            return [alert for batch in self.batches for alert in batch['body'].get('alerts', [])]
+
+    def wait_for(self, count: int, timeout: float = 5.0) -> bool:
+        """Wait until `count` alerts have been received"""
+        deadline = time.monotonic() + timeout
+        with self._received:
+            while sum(len(b['body'].get('alerts', [])) for b in self.batches) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._received.wait(remaining)
+        return True
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        data = handler.rfile.read(int(handler.headers.get('Content-Length') or 0))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            failing = self.fail_next > 0
+            if failing:
+                self.fail_next -= 1
+            else:
+                self.batches.append({'received': time.time(), 'body': json.loads(data or b'{}')})
+                self._received.notify_all()
+        status = self.fail_status if failing else 200
+        handler.send_response(status)
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+
+    def start(self) -> 'MockWebhookServer':
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-webhook', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,220 @@
+"""
+Benchmark suite
+Throughput of the scan, parse and export hot paths over a synthetic corpus,
+compared against stored baseline numbers
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from typing import List, Dict, Callable, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+from synthetic_corpus import SyntheticCorpus  # noqa: E402
+
+
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+SIZES = {
+    # documents per kind, characters per document
+    'small': (4, 10_000),
+    'medium': (8, 50_000),
+    'large': (16, 200_000),
+}
+EXPORT_FORMATS = ('json', 'csv', 'txt')
+
+
+def _isolate_environment(results_dir: str):
+    """Keep benchmark runs away from real results, stores and Tor"""
+    os.environ.setdefault('RESULTS_DIR', results_dir)
+    os.environ.setdefault('STORE_FINDINGS', 'False')
+    os.environ.setdefault('CHECKPOINT_ENABLED', 'False')
+    os.environ.setdefault('COMPACT_EVERY_CYCLE', 'False')
+    os.environ.setdefault('TOR_ENABLED', 'False')
+    os.environ.setdefault('ENVIRONMENT', 'production')
+    os.environ.setdefault('LOG_FILE', os.path.join(results_dir, 'benchmark.log'))
+
+
+def measure(func: Callable[[], None], nbytes: int, repeat: int = 5) -> Dict:
+    """Best-of-N throughput of func over nbytes of input"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    best = max(min(timings), 1e-9)
+    return {
+        'seconds': round(best, 6),
+        'bytes': nbytes,
+        'mb_per_second': round(nbytes / best / 1_000_000, 3),
+    }
+
+
+def build_benchmarks(corpus: SyntheticCorpus, count: int, size: int,
+                     results_dir: str) -> Dict[str, Callable[[], Dict]]:
+    """Build the named benchmark cases"""
+    from pattern_scanner import PatternScanner
+    from dark_web_crawler import DarkWebCrawler, extract_text
+    from monitor import DarkWebMonitor
+    from logger import get_logger
+
+    # Per-match debug and per-save info lines would dominate the timings
+    get_logger().logger.setLevel(logging.WARNING)
+
+    scanner = PatternScanner()
+    crawler = DarkWebCrawler(use_tor=False)
+
+    pages = corpus.documents('html_page', count, size)
+    farms = corpus.documents('link_farm', count, size)
+    dumps = corpus.documents('credential_dump', count, size)
+    digits = corpus.documents('digit_runs', count, size)
+    texts = {url: extract_text(html) for url, html in pages.items()}
+
+    def total(documents: Dict[str, str]) -> int:
+        return sum(len(text) for text in documents.values())
+
+    def scan_each(documents: Dict[str, str]) -> Callable[[], None]:
+        def run():
+            for url, text in documents.items():
+                scanner.scan_text(text, url)
+        return run
+
+    cases: Dict[str, Callable[[], Dict]] = {
+        'scan_text.html_text': lambda: measure(scan_each(texts), total(texts)),
+        'scan_text.credential_dump': lambda: measure(scan_each(dumps), total(dumps)),
+        'scan_text.digit_runs': lambda: measure(scan_each(digits), total(digits)),
+        'scan_multiple.mixed': lambda: measure(
+            lambda: scanner.scan_multiple({**texts, **dumps}), total(texts) + total(dumps)
+        ),
+        'parse_html.html_page': lambda: measure(
+            lambda: [crawler.parse_html(html) for html in pages.values()], total(pages)
+        ),
+        'extract_onion_links.link_farm': lambda: measure(
+            lambda: [crawler.extract_onion_links(html) for html in farms.values()], total(farms)
+        ),
+    }
+
+    # Export cost is dominated by the number of findings, so feed a realistic set
+    findings = [r.to_dict() for results in scanner.scan_multiple({**texts, **dumps}).values()
+                for r in results]
+    results = {
+        'timestamp': 'benchmark',
+        'search_query': 'benchmark',
+        'statistics': {'total_findings': len(findings)},
+        'findings': findings,
+        'sources': list(pages),
+    }
+    monitor = DarkWebMonitor()
+    monitor.config.RESULTS_DIR = results_dir
+    payload_bytes = len(json.dumps(results))
+
+    for fmt in EXPORT_FORMATS:
+        def save(fmt=fmt):
+            monitor.config.EXPORT_FORMAT = fmt
+            path = monitor.save_results(results, filename=f"bench_{fmt}")
+            os.remove(path)
+        cases[f'save_results.{fmt}'] = lambda save=save: measure(save, payload_bytes)
+
+    return cases
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float) -> List[Dict]:
+    """Find benchmarks whose throughput dropped more than tolerance below baseline"""
+    regressions = []
+    for name, result in current.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('mb_per_second'):
+            continue
+        ratio = result['mb_per_second'] / reference['mb_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append({
+                'benchmark': name,
+                'baseline': reference['mb_per_second'],
+                'current': result['mb_per_second'],
+                'change': round(ratio - 1, 3),
+            })
+    return regressions
+
+
+def load_baseline(path: str, size: str) -> Dict[str, Dict]:
+    """Load baseline numbers recorded for a corpus size"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get(size, {})
+
+
+def save_baseline(path: str, size: str, current: Dict[str, Dict]):
+    """Store current numbers as the baseline for a corpus size"""
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[size] = current
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def run(size: str = 'small', seed: int = 1337, only: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Run all benchmarks (or those whose name starts with an entry of only)"""
+    count, doc_size = SIZES[size]
+    results_dir = tempfile.mkdtemp(prefix='darkwalker-bench-')
+    _isolate_environment(results_dir)
+
+    cases = build_benchmarks(SyntheticCorpus(seed), count, doc_size, results_dir)
+    current = {}
+    for name, case in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        current[name] = case()
+        print(f"  {name:<36} {current[name]['mb_per_second']:>10.3f} MB/s")
+    return current
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run throughput benchmarks')
+    parser.add_argument('--size', choices=SIZES, default='small', help='Corpus size')
+    parser.add_argument('--seed', type=int, default=1337, help='Corpus seed')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed throughput drop as a fraction of baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline file')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store this run as the new baseline')
+    parser.add_argument('-b', '--benchmark', action='append', help='Only run benchmarks with this prefix')
+    args = parser.parse_args(argv)
+
+    print(f"Running benchmarks ({args.size} corpus)")
+    current = run(args.size, args.seed, args.benchmark)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, args.size, current)
+        print(f"Baseline updated in {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline, args.size)
+    if not baseline:
+        print("No baseline recorded for this size; run with --update-baseline")
+        return 0
+
+    regressions = compare(current, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression['benchmark']}: {regression['baseline']} -> "
+              f"{regression['current']} MB/s ({regression['change']:+.1%})")
+
+    if regressions:
+        return 1
+    print("No regressions beyond tolerance")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
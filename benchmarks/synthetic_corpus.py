@@ -0,0 +1,185 @@
+"""
+Synthetic onion corpus generator
+Deterministic pages for benchmarks and offline tests
+"""
+
+import os
+import random
+import string
+import base64
+from typing import List, Dict, Optional
+
+
+WORDS = [
+    'leaked', 'database', 'breach', 'dump', 'combo', 'fresh', 'verified', 'escrow',
+    'vendor', 'market', 'forum', 'thread', 'reply', 'price', 'bitcoin', 'monero',
+    'access', 'panel', 'shell', 'exploit', 'ransomware', 'affiliate', 'logs', 'stealer',
+    'the', 'a', 'for', 'with', 'and', 'new', 'full', 'private', 'sample', 'contact',
+]
+
+TLDS = ['com', 'net', 'org', 'io', 'ru', 'de']
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+KINDS = ('html_page', 'link_farm', 'credential_dump', 'digit_runs', 'base64_blob')
+
+
+class SyntheticCorpus:
+    """Generates reproducible onion-like documents from a seed"""
+
+    def __init__(self, seed: int = 1337):
+        """Initialize generator"""
+        self.seed = seed
+
+    def _rng(self, kind: str, index: int) -> random.Random:
+        # Independent stream per document so sizes and order do not interact
+        return random.Random(f"{self.seed}:{kind}:{index}")
+
+    @staticmethod
+    def onion_host(rng: random.Random) -> str:
+        """Random v3-style onion host"""
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz234567') for _ in range(56)) + '.onion'
+
+    @staticmethod
+    def _email(rng: random.Random) -> str:
+        user = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        domain = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 8)))
+        return f"{user}@{domain}.{rng.choice(TLDS)}"
+
+    @staticmethod
+    def _btc(rng: random.Random) -> str:
+        return '1' + ''.join(rng.choice(BASE58) for _ in range(33))
+
+    @staticmethod
+    def _ip(rng: random.Random) -> str:
+        return '.'.join(str(rng.randint(1, 254)) for _ in range(4))
+
+    def _sentence(self, rng: random.Random) -> str:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+        roll = rng.random()
+        if roll < 0.08:
+            words.append(self._email(rng))
+        elif roll < 0.12:
+            words.append(self._btc(rng))
+        elif roll < 0.15:
+            words.append(self._ip(rng))
+        return ' '.join(words).capitalize() + '.'
+
+    def html_page(self, size: int, index: int = 0) -> str:
+        """Forum-style HTML page of roughly `size` characters"""
+        rng = self._rng('html_page', index)
+        parts = [f"<html><head><title>Thread {index}</title></head><body>",
+                 f"<h1>{' '.join(rng.choice(WORDS) for _ in range(5))}</h1>"]
+        length = sum(len(p) for p in parts)
+
+        while length < size:
+            if rng.random() < 0.2:
+                chunk = f'<a href="http://{self.onion_host(rng)}/t/{rng.randint(1, 99999)}">{rng.choice(WORDS)}</a>'
+            elif rng.random() < 0.1:
+                chunk = f"<h2>{self._sentence(rng)}</h2>"
+            else:
+                chunk = f"<p>{' '.join(self._sentence(rng) for _ in range(rng.randint(1, 4)))}</p>"
+            parts.append(chunk)
+            length += len(chunk)
+
+        parts.append("</body></html>")
+        return ''.join(parts)
+
+    def link_farm(self, size: int, index: int = 0) -> str:
+        """Directory page consisting almost entirely of onion links"""
+        rng = self._rng('link_farm', index)
+        hosts = [self.onion_host(rng) for _ in range(max(10, size // 2000))]
+        parts = ["<html><body><ul>"]
+        length = len(parts[0])
+
+        while length < size:
+            host = rng.choice(hosts)
+            chunk = f'<li><a href="http://{host}/">{host}</a> {rng.choice(WORDS)}</li>'
+            parts.append(chunk)
+            length += len(chunk)
+
+        parts.append("</ul></body></html>")
+        return ''.join(parts)
+
+    def credential_dump(self, size: int, index: int = 0) -> str:
+        """Plain-text combo list with emails, passwords and API tokens"""
+        rng = self._rng('credential_dump', index)
+        lines = []
+        length = 0
+
+        while length < size:
+            roll = rng.random()
+            if roll < 0.7:
+                password = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(6, 14)))
+                line = f"{self._email(rng)}:{password}"
+            elif roll < 0.85:
+                token = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(32))
+                line = f"api_key={token}"
+            else:
+                line = f"{rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)} {self._ip(rng)}"
+            lines.append(line)
+            length += len(line) + 1
+
+        return '\n'.join(lines)
+
+    def digit_runs(self, size: int, index: int = 0) -> str:
+        """Pathological long digit and separator runs (stress credit_card)"""
+        rng = self._rng('digit_runs', index)
+        parts = []
+        length = 0
+
+        while length < size:
+            run = ''.join(rng.choice('0123456789 -') for _ in range(rng.randint(50, 500)))
+            parts.append(run)
+            length += len(run) + 1
+
+        return '\n'.join(parts)
+
+    def base64_blob(self, size: int, index: int = 0) -> str:
+        """Huge base64 blob embedded in a page"""
+        rng = self._rng('base64_blob', index)
+        raw = bytes(rng.getrandbits(8) for _ in range(size * 3 // 4))
+        return f"<html><body><pre>{base64.b64encode(raw).decode('ascii')}</pre></body></html>"
+
+    def generate(self, kind: str, size: int, index: int = 0) -> str:
+        """Generate one document of the given kind"""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown corpus kind: {kind}")
+        return getattr(self, kind)(size, index)
+
+    def documents(self, kind: str, count: int, size: int) -> Dict[str, str]:
+        """Generate several documents keyed by a synthetic source URL"""
+        return {
+            f"synthetic:{kind}:{i}": self.generate(kind, size, i)
+            for i in range(count)
+        }
+
+    def write(self, directory: str, count: int = 10, size: int = 20_000,
+              kinds: Optional[List[str]] = None) -> List[str]:
+        """Write a corpus to disk (HTML kinds as .html, others as .txt)"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        for kind in kinds or KINDS:
+            extension = 'txt' if kind in ('credential_dump', 'digit_runs') else 'html'
+            for i in range(count):
+                path = os.path.join(directory, f"{kind}_{i:04d}.{extension}")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self.generate(kind, size, i))
+                paths.append(path)
+
+        return paths
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic onion corpus')
+    parser.add_argument('directory', help='Output directory')
+    parser.add_argument('-n', '--count', type=int, default=10, help='Documents per kind')
+    parser.add_argument('-s', '--size', type=int, default=20_000, help='Characters per document')
+    parser.add_argument('--seed', type=int, default=1337, help='Random seed')
+    parser.add_argument('-k', '--kind', action='append', choices=KINDS, help='Kinds to generate')
+    args = parser.parse_args()
+
+    written = SyntheticCorpus(args.seed).write(args.directory, args.count, args.size, args.kind)
+    print(f"Wrote {len(written)} documents to {args.directory}")
@@ -0,0 +1,504 @@
+"""
+Alert Outbox module
+Durable alert outbox with batched, retried dispatch to webhook, syslog and
+file targets
+"""
+
+import os
+import json
+import time
+import socket
+import random
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable, Tuple
+from urllib.parse import urlsplit
+from config import get_config
+from logger import get_logger
+from metrics import get_metrics
+from retry_queue import RetryPolicy
+from watchlist import watchlist_regex
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    finding TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    occurrences INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    alert_id INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    delivered REAL,
+    dead INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    PRIMARY KEY (alert_id, target)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_alerts_key ON alerts(key, created);
+CREATE INDEX IF NOT EXISTS idx_deliveries_pending ON deliveries(target, delivered, dead, next_attempt);
+"""
+
+HIGH = 'high'
+NORMAL = 'normal'
+
+
+class AlertDeliveryError(Exception):
+    """Raised by a target when a batch could not be delivered"""
+
+
+class AlertRules:
+    """Which findings raise alerts, and how severe they are
+
+    A finding whose matched text or context contains a watchlist term is a
+    high-severity watchlist hit. Otherwise findings of ALERT_HIGH_PATTERNS
+    are high severity and findings of ALERT_PATTERNS ('*' = all) normal
+    severity; other findings raise no alert.
+    """
+
+    def __init__(self, patterns: Optional[Iterable[str]] = None,
+                 high_patterns: Optional[Iterable[str]] = None,
+                 watchlist: Optional[Iterable[str]] = None):
+        config = get_config()
+        self.patterns = set(config.ALERT_PATTERNS if patterns is None else patterns)
+        self.high_patterns = set(config.ALERT_HIGH_PATTERNS if high_patterns is None else high_patterns)
+        self._watchlist = watchlist_regex(watchlist)
+
+    def match(self, finding: Dict) -> Optional[Tuple[str, str]]:
+        """(rule, severity) of a finding, or None if it raises no alert"""
+        if self._watchlist is not None:
+            hit = (self._watchlist.search(finding.get('matched_text') or '')
+                   or self._watchlist.search(finding.get('context') or ''))
+            if hit:
+                return f"watchlist:{hit.group().lower()}", HIGH
+        pattern = finding.get('pattern')
+        if pattern in self.high_patterns:
+            return f"pattern:{pattern}", HIGH
+        if '*' in self.patterns or pattern in self.patterns:
+            return f"pattern:{pattern}", NORMAL
+        return None
+
+
+class WebhookTarget:
+    """POSTs each batch as {"source": "darkwalker", "alerts": [...]}"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts: List[Dict]):
+        import urllib.request
+        body = json.dumps({'source': 'darkwalker', 'alerts': alerts}).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=body, method='POST', headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as e:  # URLError, HTTPError and socket timeouts
+            raise AlertDeliveryError(str(e)) from e
+
+
+class SyslogTarget:
+    """Sends one RFC 5424 message per alert over UDP or a local datagram socket"""
+
+    FACILITY = 1  # user-level
+
+    def __init__(self, address, timeout: float):
+        self.address = address
+        self.timeout = timeout
+        self.hostname = socket.gethostname()
+
+    def send(self, alerts: List[Dict]):
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        try:
+            with socket.socket(family, socket.SOCK_DGRAM) as sock:
+                sock.settimeout(self.timeout)
+                for alert in alerts:
+                    level = 2 if alert['severity'] == HIGH else 5  # critical, notice
+                    timestamp = datetime.now().astimezone().isoformat(timespec='seconds')
+                    message = (f"<{self.FACILITY * 8 + level}>1 {timestamp} {self.hostname} "
+                               f"darkwalker - alert - {json.dumps(alert)}")
+                    sock.sendto(message.encode('utf-8'), self.address)
+        except OSError as e:
+            raise AlertDeliveryError(str(e)) from e
+
+
+class FileTarget:
+    """Appends one JSON line per alert and syncs the file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, alerts: List[Dict]):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(alert) + '\n' for alert in alerts)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            raise AlertDeliveryError(str(e)) from e
+
+
+def create_target(spec: str, timeout: Optional[float] = None):
+    """Build a target from http(s)://..., syslog://host[:port], syslog:///socket or file:///path"""
+    timeout = timeout or get_config().ALERT_TIMEOUT
+    parts = urlsplit(spec)
+    if parts.scheme in ('http', 'https'):
+        return WebhookTarget(spec, timeout)
+    if parts.scheme == 'syslog':
+        if parts.hostname:
+            return SyslogTarget((parts.hostname, parts.port or 514), timeout)
+        return SyslogTarget(parts.path or '/dev/log', timeout)
+    if parts.scheme == 'file':
+        return FileTarget(parts.path)
+    if not parts.scheme:
+        return FileTarget(spec)
+    raise ValueError(f"Unknown alert target: {spec}")
+
+
+def target_label(spec: str) -> str:
+    """Target spec without credentials or query string, for display"""
+    parts = urlsplit(spec)
+    if not parts.scheme:
+        return spec
+    return f"{parts.scheme}://{parts.hostname or ''}{':%d' % parts.port if parts.port else ''}{parts.path}"
+
+
+class AlertOutbox:
+    """Durable queue of alerts, dispatched in the background
+
+    submit() matches findings against the rules and writes new alerts, with
+    one delivery row per target, to SQLite before it returns; that is all
+    the crawl waits for. An alert whose rule, pattern and matched text were
+    already alerted within ALERT_COALESCE_SECONDS is merged into that alert
+    (its occurrence count goes up) instead of being sent again.
+
+    Each target has its own dispatcher thread, so a slow or unreachable
+    target only delays its own deliveries. Normal alerts are sent in batches
+    of up to ALERT_BATCH_SIZE once the oldest has waited ALERT_BATCH_SECONDS
+    or the batch is full; high-severity alerts are due at once and wake the
+    dispatchers, taking whatever else is pending along. Failed batches are
+    retried after ALERT_RETRY_DELAY, doubling up to ALERT_RETRY_MAX, until
+    ALERT_MAX_ATTEMPTS is reached and the deliveries are marked dead.
+    Pending deliveries survive restarts and are sent by the next process.
+    """
+
+    def __init__(self, path: Optional[str] = None, targets: Optional[Iterable[str]] = None,
+                 rules: Optional[AlertRules] = None):
+        """Initialize outbox"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.metrics = get_metrics()
+        self.path = path or self.config.ALERT_OUTBOX_DB
+        specs = list(self.config.ALERT_TARGETS if targets is None else targets)
+        self.targets = {spec: create_target(spec) for spec in specs}
+        self.rules = rules or AlertRules()
+        self.batch_size = self.config.ALERT_BATCH_SIZE
+        self.batch_seconds = self.config.ALERT_BATCH_SECONDS
+        self.coalesce_seconds = self.config.ALERT_COALESCE_SECONDS
+        self.retry_policy = RetryPolicy(attempts=self.config.ALERT_MAX_ATTEMPTS,
+                                        delay=self.config.ALERT_RETRY_DELAY)
+        self.retry_max = self.config.ALERT_RETRY_MAX
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._wake = {spec: threading.Event() for spec in self.targets}
+        self._idle = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._draining = 0
+        self.counts = {'submitted': 0, 'alerts': 0, 'coalesced': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+        return self.conn
+
+    @staticmethod
+    def _key(rule: str, finding: Dict) -> str:
+        text = (finding.get('matched_text') or '').strip().lower()
+        return hashlib.sha1(f"{rule}\0{finding.get('pattern')}\0{text}".encode('utf-8')).hexdigest()
+
+    def submit(self, findings: Iterable[Dict], now: Optional[float] = None) -> int:
+        """Queue alerts for matching findings; returns the number of new alerts"""
+        now = now or time.time()
+        matched: Dict[str, List] = {}
+        for finding in findings:
+            match = self.rules.match(finding)
+            if match is None:
+                continue
+            rule, severity = match
+            key = self._key(rule, finding)
+            if key in matched:
+                matched[key][3] += 1
+            else:
+                matched[key] = [rule, severity, finding, 1]
+        if not matched:
+            return 0
+
+        created, coalesced = 0, 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for key, (rule, severity, finding, occurrences) in matched.items():
+                    row = conn.execute(
+                        'SELECT id FROM alerts WHERE key = ? AND created >= ? ORDER BY id DESC LIMIT 1',
+                        (key, now - self.coalesce_seconds)
+                    ).fetchone()
+                    if row:
+                        conn.execute(
+                            'UPDATE alerts SET occurrences = occurrences + ?, last_seen = ? WHERE id = ?',
+                            (occurrences, now, row['id'])
+                        )
+                        coalesced += occurrences
+                        continue
+                    alert_id = conn.execute(
+                        'INSERT INTO alerts (key, rule, severity, finding, created, last_seen, occurrences) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (key, rule, severity, json.dumps(finding), now, now, occurrences)
+                    ).lastrowid
+                    due = now if severity == HIGH else now + self.batch_seconds
+                    conn.executemany(
+                        'INSERT INTO deliveries (alert_id, target, next_attempt) VALUES (?, ?, ?)',
+                        [(alert_id, spec, due) for spec in self.targets]
+                    )
+                    coalesced += occurrences - 1
+                    created += 1
+                    self.metrics.counter(
+                        'darkwalker_alerts_total', 'Alerts queued by severity'
+                    ).inc(severity=severity)
+            self.counts['submitted'] += sum(entry[3] for entry in matched.values())
+            self.counts['alerts'] += created
+            self.counts['coalesced'] += coalesced
+
+        if created:
+            self.start()
+            # Dispatchers look at what is due; fresh normal alerts just set their next wake-up
+            for event in self._wake.values():
+                event.set()
+        return created
+
+    def _pending_first_attempts(self) -> int:
+        with self._lock:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM deliveries WHERE delivered IS NULL AND dead = 0 AND attempts = 0'
+            ).fetchone()[0]
+
+    def _claim(self, spec: str, now: float) -> Tuple[List[sqlite3.Row], Optional[float]]:
+        """Next batch for a target, or ([], time the next delivery falls due)"""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT a.*, d.attempts, d.next_attempt FROM deliveries d JOIN alerts a ON a.id = d.alert_id '
+                'WHERE d.target = ? AND d.delivered IS NULL AND d.dead = 0 '
+                'AND (d.next_attempt <= ? OR d.attempts = 0) '
+                'ORDER BY d.next_attempt, a.id LIMIT ?',
+                (spec, now, self.batch_size)
+            ).fetchall()
+            if not rows:
+                retry = self.conn.execute(
+                    'SELECT MIN(next_attempt) FROM deliveries '
+                    'WHERE target = ? AND delivered IS NULL AND dead = 0', (spec,)
+                ).fetchone()[0]
+                return [], retry
+        # Fresh alerts wait for their batch window unless one is due or the batch is full
+        if rows[0]['next_attempt'] > now and len(rows) < self.batch_size and not self._draining:
+            return [], rows[0]['next_attempt']
+        return rows, None
+
+    @staticmethod
+    def _payload(row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'rule': row['rule'],
+            'severity': row['severity'],
+            'occurrences': row['occurrences'],
+            'first_seen': datetime.fromtimestamp(row['created']).isoformat(timespec='seconds'),
+            'last_seen': datetime.fromtimestamp(row['last_seen']).isoformat(timespec='seconds'),
+            'finding': json.loads(row['finding']),
+        }
+
+    def _dispatch(self, spec: str) -> Optional[float]:
+        """Send one batch to a target; returns seconds to wait, or None to go on at once"""
+        now = time.time()
+        rows, next_due = self._claim(spec, now)
+        if not rows:
+            with self._idle:
+                self._idle.notify_all()
+            return max(0.0, next_due - now) if next_due is not None else self.batch_seconds
+
+        label = target_label(spec)
+        ids = [(row['id'], spec) for row in rows]
+        started = time.monotonic()
+        try:
+            self.targets[spec].send([self._payload(row) for row in rows])
+        except Exception as e:
+            self._record_failure(spec, rows, e)
+            self.metrics.counter(
+                'darkwalker_alert_deliveries_total', 'Alert batches by target and outcome'
+            ).inc(target=label, outcome='failed')
+            return None
+        sent = time.time()
+        with self._lock, self._connect():
+            self.conn.executemany(
+                'UPDATE deliveries SET delivered = ?, attempts = attempts + 1, last_error = NULL '
+                'WHERE alert_id = ? AND target = ?', [(sent,) + key for key in ids]
+            )
+        self.metrics.counter(
+            'darkwalker_alert_deliveries_total', 'Alert batches by target and outcome'
+        ).inc(target=label, outcome='delivered')
+        self.metrics.histogram(
+            'darkwalker_alert_send_seconds', 'Alert batch send time'
+        ).observe(time.monotonic() - started, target=label)
+        delay = self.metrics.histogram(
+            'darkwalker_alert_delay_seconds', 'Time from alert to delivery',
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+        )
+        for row in rows:
+            delay.observe(sent - row['created'], severity=row['severity'])
+        self.logger.debug("Delivered %d alerts to %s", len(rows), label)
+        return None
+
+    def _record_failure(self, spec: str, rows: List[sqlite3.Row], error: Exception):
+        """Schedule the batch's retry with backoff, or mark it dead"""
+        now = time.time()
+        updates, dead = [], 0
+        for row in rows:
+            attempts = row['attempts'] + 1
+            if attempts >= self.retry_policy.attempts:
+                updates.append((attempts, row['next_attempt'], 1, str(error), row['id'], spec))
+                dead += 1
+            else:
+                # Jitter keeps targets that failed together from retrying in lockstep
+                wait = min(self.retry_max, self.retry_policy.delay_for(attempts)) * random.uniform(0.8, 1.0)
+                updates.append((attempts, now + wait, 0, str(error), row['id'], spec))
+        with self._lock, self._connect():
+            self.conn.executemany(
+                'UPDATE deliveries SET attempts = ?, next_attempt = ?, dead = ?, last_error = ? '
+                'WHERE alert_id = ? AND target = ?', updates
+            )
+        log = self.logger.error if dead else self.logger.warning
+        log("Alert delivery to %s failed (%d alerts, %d given up): %s",
+            target_label(spec), len(rows), dead, error)
+
+    def _run(self, spec: str):
+        wake = self._wake[spec]
+        while not self._stopping.is_set():
+            try:
+                wait = self._dispatch(spec)
+            except Exception as e:
+                self.logger.error("Alert dispatcher for %s failed: %s", target_label(spec), e)
+                wait = self.batch_seconds
+            if wait is not None:
+                wake.wait(wait)
+                wake.clear()
+
+    def start(self) -> 'AlertOutbox':
+        """Start one dispatcher thread per target (once)"""
+        with self._lock:
+            if self._threads or not self.targets:
+                return self
+            self._stopping.clear()
+            for spec in self.targets:
+                thread = threading.Thread(target=self._run, args=(spec,),
+                                          name=f"alerts-{target_label(spec)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def pending(self) -> int:
+        """Deliveries neither sent nor given up"""
+        with self._lock:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM deliveries WHERE delivered IS NULL AND dead = 0'
+            ).fetchone()[0]
+
+    def flush(self, timeout: float = 30.0, include_retries: bool = False) -> bool:
+        """Send pending alerts now, without waiting for batch windows
+
+        Waits until no first attempt is pending (with include_retries, until
+        nothing is pending, so retries are sent as soon as their backoff has
+        passed) or the timeout runs out; True if the outbox drained.
+        """
+        self.start()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._draining += 1
+        try:
+            while True:
+                remaining = self.pending() if include_retries else self._pending_first_attempts()
+                if not remaining or not self._threads:
+                    return not remaining
+                if time.monotonic() >= deadline:
+                    return False
+                for event in self._wake.values():
+                    event.set()
+                with self._idle:
+                    self._idle.wait(min(0.05, max(0.0, deadline - time.monotonic())))
+        finally:
+            with self._lock:
+                self._draining -= 1
+
+    def requeue_dead(self) -> int:
+        """Give dead deliveries a fresh set of attempts"""
+        with self._lock, self._connect():
+            count = self.conn.execute(
+                'UPDATE deliveries SET dead = 0, attempts = 0, next_attempt = ? WHERE dead = 1',
+                (time.time(),)
+            ).rowcount
+        for event in self._wake.values():
+            event.set()
+        return count
+
+    def stats(self) -> Dict:
+        """Outbox totals and per-target delivery state"""
+        with self._lock:
+            conn = self._connect()
+            alerts, occurrences = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(occurrences), 0) FROM alerts'
+            ).fetchone()
+            targets = {}
+            for row in conn.execute(
+                'SELECT target, SUM(delivered IS NOT NULL) AS delivered, SUM(dead) AS dead, '
+                'SUM(delivered IS NULL AND dead = 0) AS pending, '
+                'MAX(CASE WHEN delivered IS NULL THEN last_error END) AS last_error '
+                'FROM deliveries GROUP BY target'
+            ):
+                targets[target_label(row['target'])] = {
+                    'delivered': row['delivered'], 'pending': row['pending'],
+                    'dead': row['dead'], 'last_error': row['last_error'],
+                }
+        return dict(self.counts, total_alerts=alerts, total_occurrences=occurrences, targets=targets)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the dispatchers (pending alerts stay queued) and close the database"""
+        self._stopping.set()
+        for event in self._wake.values():
+            event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,126 @@
+"""
+Checkpoint module
+Atomic, throttled checkpoints so interrupted monitoring runs can resume
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+from typing import List, Dict, Optional
+from config import get_config
+from logger import get_logger
+
+
+class CheckpointManager:
+    """Persists run progress to a small state file plus a findings journal
+
+    The state file holds the completed sources, visited URLs and statistics
+    and is replaced atomically on every save. Findings that are not streamed
+    to a sink are appended to a journal; the state records how many journal
+    lines belong to the checkpoint so a torn tail is discarded on resume.
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: Optional[float] = None):
+        """Initialize checkpoint manager"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.path = path or self.config.CHECKPOINT_FILE
+        self.journal_path = os.path.splitext(self.path)[0] + '.findings.ndjson'
+        self.interval = self.config.CHECKPOINT_INTERVAL if interval is None else interval
+        self.journaled = 0
+        self._journal = None
+        self._last_save = 0.0
+
+        checkpoint_dir = os.path.dirname(self.path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def exists(self) -> bool:
+        """Check whether a checkpoint is available"""
+        return os.path.exists(self.path)
+
+    def load(self) -> Optional[Dict]:
+        """Load the last checkpoint, or None if there is none"""
+        if not self.exists():
+            return None
+
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+            return None
+
+        self.journaled = state.get('findings_journaled', 0)
+        self.logger.info(
+            f"Loaded checkpoint from {state.get('saved_at')} "
+            f"({len(state.get('completed_sources', []))} sources completed)"
+        )
+        return state
+
+    def load_findings(self) -> List[Dict]:
+        """Read journaled findings covered by the loaded checkpoint"""
+        findings: List[Dict] = []
+        if not self.journaled or not os.path.exists(self.journal_path):
+            return findings
+
+        with open(self.journal_path) as f:
+            for line in f:
+                if len(findings) >= self.journaled:
+                    break
+                findings.append(json.loads(line))
+
+        # Drop anything written after the checkpoint so it is not duplicated
+        self._rewrite_journal(findings)
+        return findings
+
+    def _rewrite_journal(self, findings: List[Dict]):
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for finding in findings:
+                f.write(json.dumps(finding, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self.journal_path)
+
+    def journal_findings(self, findings: List[Dict]):
+        """Append findings to the journal"""
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        for finding in findings:
+            self._journal.write(json.dumps(finding, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        self.journaled += len(findings)
+
+    def save(self, state: Dict, force: bool = False) -> bool:
+        """Atomically write a checkpoint, at most once per interval unless forced"""
+        now = time.monotonic()
+        if not force and now - self._last_save < self.interval:
+            return False
+
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+
+        state = dict(state)
+        state['version'] = 1
+        state['saved_at'] = datetime.now().isoformat()
+        state['findings_journaled'] = self.journaled
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._last_save = now
+        return True
+
+    def clear(self):
+        """Remove the checkpoint after a completed run"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.journaled = 0
@@ -5,15 +5,43 @@ Provides user-friendly CLI interface
 
 import argparse
 import sys
+import time
+from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List, Dict
-from tabulate import tabulate
-from colorama import init, Fore, Back, Style
-from monitor import DarkWebMonitor
 from config import get_config
 from logger import get_logger
 
-# Initialize colorama for Windows compatibility
-init(autoreset=True)
+# The monitor, crawler (requests, BeautifulSoup), colour and table modules are
+# imported by the commands that use them, so quick commands start fast
+
+
+def tabulate(*args, **kwargs) -> str:
+    """Format a table, importing tabulate on first use"""
+    from tabulate import tabulate as _tabulate
+    return _tabulate(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def _colorama():
+    """colorama, imported and initialized on first use"""
+    import colorama
+    # Initialize colorama for Windows compatibility
+    colorama.init(autoreset=True)
+    return colorama
+
+
+class _Colors:
+    """A colorama namespace (Fore, Style) that imports colorama on first use"""
+    
+    def __init__(self, name: str):
+        self._name = name
+    
+    def __getattr__(self, attr: str) -> str:
+        return getattr(getattr(_colorama(), self._name), attr)
+
+
+Fore, Style = _Colors('Fore'), _Colors('Style')
 
 
 class DarkWebCLI:
@@ -24,6 +52,7 @@ class DarkWebCLI:
         self.config = get_config()
         self.logger = get_logger()
         self.monitor = None
+        self.scanner = None
     
     def print_header(self):
         """Print application header"""
@@ -49,6 +78,7 @@ class DarkWebCLI:
     
     def initialize_monitor(self, patterns: Optional[List[str]] = None):
         """Initialize monitoring tool"""
+        from monitor import DarkWebMonitor
         try:
             self.monitor = DarkWebMonitor(search_patterns=patterns)
             self.print_success("Monitor initialized successfully")
@@ -58,7 +88,10 @@ class DarkWebCLI:
             return False
     
     def monitor_dark_web(self, query: Optional[str] = None, 
-                        engines: Optional[List[str]] = None):
+                        engines: Optional[List[str]] = None,
+                        stream: bool = False, pipeline: Optional[bool] = None,
+                        resume: bool = False, planner: Optional[bool] = None,
+                        scheduled: bool = False):
         """Monitor dark web for patterns"""
         if not self.monitor:
             self.print_error("Monitor not initialized. Use 'init' command first.")
@@ -68,9 +101,30 @@ class DarkWebCLI:
         print("This may take several minutes. Please be patient.\n")
         
         try:
+            if stream:
+                with self.monitor.open_sink() as sink:
+                    results = self.monitor.monitor_dark_web(
+                        search_query=query,
+                        search_engines=engines,
+                        sink=sink,
+                        pipeline=pipeline,
+                        resume=resume,
+                        planner=planner,
+                        scheduled=scheduled
+                    )
+                
+                self.display_results(results)
+                for file_path in results.get('output_files', []):
+                    self.print_success(f"Results streamed to {file_path}")
+                return
+            
             results = self.monitor.monitor_dark_web(
                 search_query=query,
-                search_engines=engines
+                search_engines=engines,
+                pipeline=pipeline,
+                resume=resume,
+                planner=planner,
+                scheduled=scheduled
             )
             
             self.display_results(results)
@@ -82,7 +136,7 @@ class DarkWebCLI:
         except Exception as e:
             self.print_error(f"Monitoring failed: {str(e)}")
     
-    def monitor_specific_site(self, url: str):
+    def monitor_specific_site(self, url: str, timeout: Optional[float] = None):
         """Monitor a specific onion site"""
         if not self.monitor:
             self.print_error("Monitor not initialized. Use 'init' command first.")
@@ -91,7 +145,7 @@ class DarkWebCLI:
         self.print_info(f"Monitoring {url}...")
         
         try:
-            results = self.monitor.monitor_specific_site(url)
+            results = self.monitor.monitor_specific_site(url, max_seconds=timeout)
             
             print(f"\n{Fore.CYAN}{'='*60}")
             print(f"Results for: {url}")
@@ -111,6 +165,71 @@ class DarkWebCLI:
         except Exception as e:
             self.print_error(f"Error monitoring site: {str(e)}")
     
+    def monitor_sites(self, from_file: str, workers: Optional[int] = None,
+                      timeout: Optional[float] = None):
+        """Monitor every onion site listed in a file, several at a time"""
+        if not self.monitor:
+            self.print_error("Monitor not initialized. Use 'init' command first.")
+            return
+        
+        try:
+            with open(from_file) as f:
+                urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        except OSError as e:
+            self.print_error(f"Cannot read {from_file}: {e}")
+            return
+        
+        workers = workers or self.config.SITE_WORKERS
+        self.print_info(f"Monitoring {len(urls)} sites ({workers} at a time)...")
+        counts = {'success': 0, 'timeout': 0, 'skipped': 0, 'failed': 0, 'error': 0}
+        
+        def show_progress(done: int, total: int, site: Dict):
+            counts[site['status']] = counts.get(site['status'], 0) + 1
+            print(
+                f"\r  [{done}/{total}] {Fore.GREEN}ok {counts['success']}{Style.RESET_ALL}  "
+                f"{Fore.YELLOW}timeout {counts['timeout']}{Style.RESET_ALL}  "
+                f"skipped {counts['skipped']}  "
+                f"{Fore.RED}failed {counts['failed'] + counts['error']}{Style.RESET_ALL}",
+                end='', flush=True
+            )
+        
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            with self.monitor.open_sink(f"sites_{timestamp}") as sink:
+                results = self.monitor.monitor_sites(
+                    urls, sink=sink, workers=workers, max_seconds=timeout, progress=show_progress
+                )
+            print()
+        except Exception as e:
+            print()
+            self.print_error(f"Error monitoring sites: {str(e)}")
+            return
+        
+        stats = results['statistics']
+        print(tabulate([
+            ['Sites', len(results['sites'])],
+            ['Fetched', stats['urls_crawled']],
+            ['Timed Out', stats['timeouts']],
+            ['Skipped (failing hosts)', stats['skipped']],
+            ['Failed', stats['errors']],
+            ['Retries (over budget)', f"{results['retries']['scheduled']} ({results['retries']['over_budget']})"],
+            ['Patterns Found', stats['patterns_found']],
+            ['Partial Scans (over budget)', results.get('scan_budget', {}).get('partial_pages', 0)],
+            ['Alerts Queued (coalesced)', self._alert_summary(results.get('alerts'))],
+            ['Peak RSS MB (spilled pages/findings)', self._memory_summary(results['memory'])],
+            ['Seconds', results['seconds']],
+        ], tablefmt="grid"))
+        for file_path in results.get('output_files', []):
+            self.print_success(f"Findings streamed to {file_path}")
+    
+    def _alert_summary(self, alerts: Optional[Dict]) -> str:
+        """Alerts a run queued, with the duplicates merged into earlier alerts"""
+        return f"{alerts['alerts']} ({alerts['coalesced']})" if alerts else 'disabled'
+    
+    def _memory_summary(self, memory: Dict) -> str:
+        """Peak RSS of a run with its spill counters"""
+        return f"{memory['peak_rss_mb']} ({memory['pages_spilled']}/{memory['findings_spilled']})"
+    
     def display_results(self, results: Dict):
         """Display monitoring results"""
         stats = results.get('statistics', {})
@@ -126,13 +245,84 @@ class DarkWebCLI:
             [f"{Fore.WHITE}Patterns Found{Style.RESET_ALL}", stats.get('patterns_found', 0)],
             [f"{Fore.WHITE}Errors{Style.RESET_ALL}", stats.get('errors', 0)],
         ]
+        if results.get('retries'):
+            retries = results['retries']
+            stats_data.append([
+                f"{Fore.WHITE}Retries (over budget){Style.RESET_ALL}",
+                f"{retries['scheduled']} ({retries['over_budget']})"
+            ])
+        if results.get('alerts'):
+            stats_data.append([
+                f"{Fore.WHITE}Alerts Queued (coalesced){Style.RESET_ALL}",
+                self._alert_summary(results['alerts'])
+            ])
+        if results.get('revisits'):
+            revisits = results['revisits']
+            stats_data.append([
+                f"{Fore.WHITE}Revisits/day planned (fixed){Style.RESET_ALL}",
+                f"{revisits['planned_per_day']} ({revisits['fixed_per_day']})"
+            ])
+            stats_data.append([
+                f"{Fore.WHITE}Sources Deferred (not due){Style.RESET_ALL}",
+                len(revisits['deferred'])
+            ])
+        if results.get('memory'):
+            stats_data.append([
+                f"{Fore.WHITE}Peak RSS MB (spilled pages/findings){Style.RESET_ALL}",
+                self._memory_summary(results['memory'])
+            ])
         print(tabulate(stats_data, tablefmt="grid"))
         print()
         
+        # Display pages whose scan ran over budget
+        if results.get('scan_budget'):
+            print(f"{Fore.YELLOW}Partial Scans (over budget):{Style.RESET_ALL}")
+            overrun_rows = [
+                [source, o['strategy'], '+'.join(o['reasons']),
+                 f"{o['chars_sampled']}/{o['chars']}", o['cpu_seconds']]
+                for source, o in results['scan_budget']['sources'].items()
+            ]
+            print(tabulate(
+                overrun_rows,
+                headers=['Source', 'Fallback', 'Budget', 'Chars Sampled', 'CPU Seconds'],
+                tablefmt="grid"
+            ))
+            print()
+        
+        # Display pipeline stage statistics
+        if results.get('pipeline'):
+            print(f"{Fore.YELLOW}Pipeline Stages:{Style.RESET_ALL}")
+            stage_rows = [
+                [name, s['workers'], s['processed'], s['dropped'], s['errors'],
+                 s['throughput'], s['utilization']]
+                for name, s in results['pipeline'].items()
+            ]
+            print(tabulate(
+                stage_rows,
+                headers=['Stage', 'Workers', 'Processed', 'Dropped', 'Errors', 'Items/s', 'Utilization'],
+                tablefmt="grid"
+            ))
+            print()
+        
+        # Display query planner statistics
+        if results.get('planner'):
+            planned = results['planner']
+            print(f"{Fore.YELLOW}Query Planner:{Style.RESET_ALL}")
+            print(tabulate([
+                ['Queries', planned['queries']],
+                ['Searches (failed)', f"{planned['searches']} ({planned['search_failures']})"],
+                ['Distinct Hits', planned['hits']],
+                ['Pages Fetched (failed)', f"{planned['pages_fetched']} ({planned['page_failures']})"],
+                ['Skipped (budget)', planned['skipped']],
+            ], tablefmt="grid"))
+            print()
+        
         # Display findings
         findings = results.get('findings', [])
         if findings:
             self.display_findings(findings)
+        elif results.get('output_files') and stats.get('patterns_found'):
+            self.print_info("Findings were streamed to disk")
         else:
             self.print_warning("No patterns found in this monitoring session")
     
@@ -159,13 +349,422 @@ class DarkWebCLI:
         if len(findings) > 20:
             self.print_info(f"Showing 20 of {len(findings)} findings")
     
-    def list_patterns(self):
-        """List all search patterns"""
+    def query_results(self, pattern: Optional[str] = None, value: Optional[str] = None,
+                      source: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, limit: int = 100,
+                      export: bool = False):
+        """Query the findings store"""
+        if not self.monitor:
+            self.print_error("Monitor not initialized.")
+            return
+        
+        filters = {
+            'pattern': pattern,
+            'value': value,
+            'source': source,
+            'since': since,
+            'until': until,
+            'limit': limit,
+        }
+        
+        try:
+            if export:
+                file_path = self.monitor.export_findings(**filters)
+                self.print_success(f"Findings exported to {file_path}")
+                return
+            
+            findings = self.monitor.query_findings(**filters)
+        except Exception as e:
+            self.print_error(f"Query failed: {str(e)}")
+            return
+        
+        if findings:
+            self.display_findings(findings)
+        else:
+            self.print_info("No stored findings match the query")
+    
+    def compact_results(self, include_today: bool = False):
+        """Compact the results directory"""
+        from compaction import ResultsCompactor
+        try:
+            stats = ResultsCompactor(self.config.RESULTS_DIR).compact(include_today=include_today)
+        except Exception as e:
+            self.print_error(f"Compaction failed: {str(e)}")
+            return
+        
+        rows = [[key.replace('_', ' ').title(), value] for key, value in stats.items()]
+        print(tabulate(rows, tablefmt="grid"))
+        self.print_success("Compaction complete")
+    
+    def run_daemon(self, query: Optional[str] = None, engines: Optional[List[str]] = None,
+                   interval: Optional[int] = None, stream: bool = False):
+        """Run monitoring continuously"""
+        if not self.monitor:
+            self.print_error("Monitor not initialized.")
+            return
+        
+        self.print_info("Starting monitoring daemon (Ctrl+C to stop)...")
+        
+        try:
+            self.monitor.run_daemon(
+                search_query=query,
+                search_engines=engines,
+                interval=interval,
+                stream=stream
+            )
+        except KeyboardInterrupt:
+            self.print_warning("Daemon stopped")
+    
+    def serve(self, host: Optional[str] = None, port: Optional[int] = None,
+              workers: Optional[int] = None, threads: bool = False,
+              patterns: Optional[List[str]] = None):
+        """Run the local scan service until interrupted"""
+        from pattern_scanner import PatternScanner
+        from scan_service import ScanService
+        
+        try:
+            service = ScanService(
+                scanner=PatternScanner(patterns=patterns), host=host, port=port,
+                workers=workers, use_processes=False if threads else None
+            )
+        except OSError as e:
+            self.print_error(f"Cannot start scan service: {str(e)}")
+            return
+        
+        self.print_info(
+            f"Scan service on {service.url} with {len(service.scanner.patterns)} patterns "
+            f"and {service.workers} workers (Ctrl+C to stop)"
+        )
+        print("  POST /scan, /scan/batch, /scan/stream   GET /health, /patterns, /metrics")
+        try:
+            service.start(background=False)
+        except KeyboardInterrupt:
+            self.print_warning("Scan service stopped")
+        finally:
+            service.stop()
+    
+    def enqueue_work(self, from_file: Optional[str] = None, requeue: bool = False,
+                     queue_path: Optional[str] = None):
+        """Add URLs to the shared work queue"""
+        from sharding import WorkQueue
+        if from_file:
+            try:
+                with open(from_file) as f:
+                    urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            except OSError as e:
+                self.print_error(f"Cannot read URL list: {str(e)}")
+                return
+        else:
+            urls = list(self.config.HIDDEN_WIKI_URLS.values())
+        
+        queue = WorkQueue(queue_path)
+        try:
+            if requeue:
+                self.print_info(f"Requeued {queue.requeue_done()} finished tasks")
+            added = queue.enqueue(urls)
+            self.print_success(f"Queued {added} new URLs ({len(urls) - added} already queued)")
+        finally:
+            queue.close()
+    
+    def run_worker(self, worker_id: Optional[str] = None, once: bool = False,
+                   queue_path: Optional[str] = None):
+        """Run a sharded crawl worker"""
+        from sharding import WorkQueue, ShardedWorker
+        if not self.monitor:
+            self.print_error("Monitor not initialized.")
+            return
+        
+        queue = WorkQueue(queue_path)
+        worker = ShardedWorker(self.monitor, queue, worker_id)
+        self.print_info(f"Worker {worker.worker_id} processing {queue.db_path}")
+        
+        try:
+            processed = worker.run(once=once)
+            self.print_success(f"Worker finished {processed} tasks")
+        except KeyboardInterrupt:
+            self.print_warning("Worker stopped")
+        finally:
+            queue.close()
+    
+    def show_work_queue(self, queue_path: Optional[str] = None):
+        """Show work queue status"""
+        from sharding import WorkQueue
+        queue = WorkQueue(queue_path)
+        try:
+            stats = queue.stats()
+        finally:
+            queue.close()
+        
+        rows = [[status, count] for status, count in sorted(stats['tasks'].items())]
+        print(tabulate(rows, headers=['Status', 'Tasks'], tablefmt="grid"))
+        rows = [[worker, stats['done_per_worker'].get(worker, 0)] for worker in stats['live_workers']]
+        print(tabulate(rows, headers=['Live Worker', 'Tasks Done'], tablefmt="grid"))
+    
+    def profile_patterns(self, corpus_path: str, extra_patterns: Optional[List[str]] = None,
+                         check_growth: bool = True, top: int = 20):
+        """Rank the active patterns by scan cost over a saved corpus"""
+        from pattern_scanner import PatternScanner
+        from profiler import load_corpus, profile_corpus
+        try:
+            corpus = load_corpus(corpus_path)
+        except OSError as e:
+            self.print_error(f"Cannot load corpus: {str(e)}")
+            return
+        
+        if not corpus:
+            self.print_error("Corpus is empty")
+            return
+        
+        scanner = PatternScanner(patterns=extra_patterns)
+        total_bytes = sum(len(text) for text in corpus.values())
+        self.print_info(
+            f"Profiling {len(scanner.patterns)} patterns over {len(corpus)} documents "
+            f"({total_bytes / 1_000_000:.2f} MB)..."
+        )
+        
+        report = profile_corpus(scanner, corpus, check_growth=check_growth)
+        
+        rows = []
+        for rank, entry in enumerate(report[:top], 1):
+            growth = entry['growth_exponent']
+            flag = f"{Fore.RED}super-linear{Style.RESET_ALL}" if entry['superlinear'] else ''
+            rows.append([
+                rank,
+                f"{Fore.MAGENTA}{entry['pattern'][:40]}{Style.RESET_ALL}",
+                f"{entry['seconds'] * 1000:.1f}",
+                entry['mb_per_second'],
+                entry['matches'],
+                len(entry['outliers']),
+                growth if growth is not None else '-',
+                flag,
+            ])
+        
+        headers = ['#', 'Pattern', 'Total ms', 'MB/s', 'Matches', 'Outliers', 'Growth', '']
+        print(tabulate(rows, headers=headers, tablefmt="grid"))
+        
+        for entry in report[:top]:
+            for outlier in entry['outliers']:
+                self.print_warning(
+                    f"{entry['pattern']}: {outlier['seconds'] * 1000:.1f} ms on "
+                    f"{outlier['source']} ({outlier['slowdown']}x slower than average)"
+                )
+    
+    def replay_archive(self, url: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None, latest_only: bool = False,
+                       only_new: bool = False, stream: bool = False):
+        """Rescan archived pages without network access"""
         if not self.monitor:
             self.print_error("Monitor not initialized.")
             return
         
-        patterns = self.monitor.get_search_patterns()
+        if only_new:
+            custom = set(self.monitor.scanner.custom_patterns)
+            if not custom:
+                self.print_error("--only-new needs at least one --pattern")
+                return
+            self.monitor.scanner.patterns = {
+                name: regex for name, regex in self.monitor.scanner.patterns.items() if name in custom
+            }
+        
+        self.print_info(f"Replaying archived pages with {len(self.monitor.scanner.patterns)} patterns...")
+        
+        try:
+            filters = dict(url=url, since=since, until=until, latest_only=latest_only)
+            if stream:
+                with self.monitor.open_sink(f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}") as sink:
+                    results = self.monitor.replay_archive(sink=sink, **filters)
+                self.display_results(results)
+                for file_path in results.get('output_files', []):
+                    self.print_success(f"Results streamed to {file_path}")
+                return
+            
+            results = self.monitor.replay_archive(**filters)
+            self.display_results(results)
+            
+            file_path = self.monitor.save_results(
+                results, f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+            self.print_success(f"Results saved to {file_path}")
+        except Exception as e:
+            self.print_error(f"Replay failed: {str(e)}")
+    
+    def show_archive(self):
+        """Show page archive statistics"""
+        from page_archive import PageArchive
+        archive = PageArchive(self.config.PAGE_ARCHIVE_DIR)
+        try:
+            stats = archive.stats()
+        finally:
+            archive.close()
+        
+        rows = [[key.replace('_', ' ').title(), value] for key, value in stats.items()]
+        print(tabulate(rows, tablefmt="grid"))
+    
+    def show_hosts(self, state: Optional[str] = None, limit: int = 50,
+                   reset: Optional[str] = None):
+        """Show per-host health, or forget a host's record"""
+        from host_health import HostHealthTracker
+        tracker = HostHealthTracker(self.config.HOST_HEALTH_DB)
+        try:
+            if reset:
+                removed = tracker.reset(None if reset == 'all' else reset)
+                self.print_success(f"Removed {removed} host record(s)")
+                return
+            
+            counts = tracker.stats()
+            records = tracker.hosts(state=state, limit=limit)
+        finally:
+            tracker.close()
+        
+        print(tabulate([[name.title(), count] for name, count in counts.items()], tablefmt="grid"))
+        if not records:
+            self.print_info("No host records")
+            return
+        
+        colors = {'ok': Fore.GREEN, 'failing': Fore.YELLOW, 'open': Fore.RED, 'probing': Fore.CYAN}
+        rows = []
+        for record in records:
+            entry = record.to_dict()
+            rows.append([
+                entry['host'][:40],
+                f"{colors[entry['state']]}{entry['state']}{Style.RESET_ALL}",
+                entry['successes'],
+                entry['failures'],
+                entry['consecutive_failures'],
+                f"{entry['p50']:.2f}" if entry['p50'] is not None else '-',
+                f"{entry['p95']:.2f}" if entry['p95'] is not None else '-',
+                entry['last_success'] or '-',
+                entry['next_probe'] or '-',
+            ])
+        headers = ['Host', 'State', 'OK', 'Failed', 'In a Row', 'p50 s', 'p95 s',
+                   'Last Success', 'Next Probe']
+        print(tabulate(rows, headers=headers, tablefmt="grid"))
+    
+    def show_graph(self, limit: int = 20, new: bool = False,
+                   hours: Optional[float] = None, from_leaks: bool = False):
+        """Show the link graph's top-ranked hosts, or recently discovered hosts"""
+        from link_graph import LinkGraph
+        graph = LinkGraph(self.config.LINK_GRAPH_DB)
+        try:
+            counts = graph.stats()
+            if new:
+                started = time.monotonic()
+                hosts = graph.new_hosts(hours=hours, from_leak_sites=from_leaks, limit=limit)
+                elapsed = (time.monotonic() - started) * 1000
+            else:
+                hosts = graph.top_hosts(limit=limit)
+        finally:
+            graph.close()
+        
+        summary = [['Hosts', counts['hosts']], ['Links', counts['edges']], ['Leak Sites', counts['leak_sites']]]
+        print(tabulate(summary, tablefmt="grid"))
+        if not hosts:
+            self.print_info("No matching hosts")
+            return
+        
+        rows = [[
+            host['host'][:40],
+            f"{host['rank']:.5f}",
+            host.get('in_links', '-'),
+            host['fetches'],
+            host['findings'],
+            datetime.fromtimestamp(host['first_seen']).isoformat(timespec='seconds'),
+        ] for host in hosts]
+        print(tabulate(rows, headers=['Host', 'Rank', 'In Links', 'Fetches', 'Leak Pages', 'First Seen'],
+                       tablefmt="grid"))
+        if new:
+            self.print_info(f"Query took {elapsed:.1f} ms")
+    
+    def show_alerts(self, flush: bool = False, timeout: float = 30.0, requeue_dead: bool = False):
+        """Show the alert outbox, optionally sending pending alerts first"""
+        from alert_outbox import AlertOutbox
+        outbox = AlertOutbox(self.config.ALERT_OUTBOX_DB)
+        try:
+            if requeue_dead:
+                self.print_info(f"Requeued {outbox.requeue_dead()} dead deliveries")
+            if flush:
+                if not outbox.targets:
+                    self.print_warning("No ALERT_TARGETS configured")
+                elif outbox.flush(timeout=timeout, include_retries=True):
+                    self.print_success("All pending alerts delivered")
+                else:
+                    self.print_warning(f"{outbox.pending()} deliveries still pending")
+            stats = outbox.stats()
+        finally:
+            outbox.close()
+        
+        print(tabulate([
+            ['Alerts', stats['total_alerts']],
+            ['Occurrences', stats['total_occurrences']],
+        ], tablefmt="grid"))
+        if not stats['targets']:
+            self.print_info("No deliveries recorded")
+            return
+        rows = [[target, t['delivered'], t['pending'], t['dead'], (t['last_error'] or '')[:60]]
+                for target, t in stats['targets'].items()]
+        print(tabulate(rows, headers=['Target', 'Delivered', 'Pending', 'Dead', 'Last Error'], tablefmt="grid"))
+    
+    def show_revisits(self, limit: int = 50):
+        """Show per-source revisit intervals with planned and actual rates"""
+        from revisit_scheduler import RevisitScheduler
+        scheduler = RevisitScheduler(self.config.REVISIT_DB)
+        try:
+            report = scheduler.report()
+        finally:
+            scheduler.close()
+        
+        print(tabulate([
+            ['Sources', len(report['sources'])],
+            ['Planned Visits/day', report['planned_per_day']],
+            ['Fixed Schedule Visits/day', report['fixed_per_day']],
+            ['Actual Visits/day', report['actual_per_day']],
+        ], tablefmt="grid"))
+        if not report['sources']:
+            self.print_info("No visits recorded")
+            return
+        
+        def rate(value):
+            return f"{value:.2f}" if value is not None else '-'
+        
+        rows = [[
+            entry['source'][:40],
+            f"{entry['interval'] / 3600:.2f}h",
+            rate(entry['planned_per_day']),
+            rate(entry['actual_per_day']),
+            rate(entry['changes_per_day']),
+            entry['visits'],
+            entry['changes'],
+            entry['new_findings'],
+            entry['next_visit'] or '-',
+        ] for entry in report['sources'][:limit]]
+        headers = ['Source', 'Interval', 'Planned/day', 'Actual/day', 'Changes/day',
+                   'Visits', 'Changes', 'New Findings', 'Next Visit']
+        print(tabulate(rows, headers=headers, tablefmt="grid"))
+    
+    def deliver_alerts(self):
+        """Give the alert dispatchers a bounded moment to send what a command queued"""
+        if not self.monitor or not self.monitor.alerts:
+            return
+        if not self.monitor.alerts.flush(timeout=self.config.ALERT_TIMEOUT):
+            self.print_warning("Some alerts are still queued; they are sent on the next run "
+                               "or with 'alerts --flush'")
+        self.monitor.alerts.close()
+    
+    def pattern_scanner(self):
+        """The monitor's scanner, or a standalone one for the offline pattern commands
+        
+        Only the scanner is built: no stores, crawler or databases.
+        """
+        if self.monitor:
+            return self.monitor.scanner
+        if self.scanner is None:
+            from pattern_scanner import PatternScanner
+            self.scanner = PatternScanner()
+        return self.scanner
+    
+    def list_patterns(self):
+        """List all search patterns"""
+        patterns = self.pattern_scanner().get_patterns()
         
         print(f"\n{Fore.CYAN}Search Patterns ({len(patterns)} total):{Style.RESET_ALL}\n")
         
@@ -174,12 +773,8 @@ class DarkWebCLI:
     
     def add_pattern(self, pattern: str, name: Optional[str] = None):
         """Add a custom pattern"""
-        if not self.monitor:
-            self.print_error("Monitor not initialized.")
-            return
-        
         try:
-            self.monitor.add_search_pattern(pattern, name)
+            self.pattern_scanner().add_custom_pattern(pattern, name)
             self.print_success(f"Pattern added successfully")
         except Exception as e:
             self.print_error(f"Failed to add pattern: {str(e)}")
@@ -205,10 +800,40 @@ def main():
         nargs='+',
         help='Search engines to use (e.g., ahmia torch)'
     )
+    monitor_parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream findings to disk (STREAM_FORMAT) as they are found'
+    )
+    monitor_parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        default=None,
+        help='Use the staged fetch/parse/scan pipeline (PIPELINE_* settings)'
+    )
+    monitor_parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue the last interrupted run from its checkpoint'
+    )
+    monitor_parser.add_argument(
+        '--plan',
+        action='store_true',
+        default=None,
+        help='Search keyword groups on all engines at once and scan the top hits (QUERY_* settings)'
+    )
+    monitor_parser.add_argument(
+        '--due',
+        action='store_true',
+        help='Only visit sources whose revisit is due (REVISIT_* settings)'
+    )
     
     # Monitor site command
     site_parser = subparsers.add_parser('site', help='Monitor specific onion site')
-    site_parser.add_argument('url', type=str, help='Onion site URL')
+    site_parser.add_argument('url', type=str, nargs='?', help='Onion site URL')
+    site_parser.add_argument('-f', '--from-file', type=str, help='File with one URL per line')
+    site_parser.add_argument('-w', '--workers', type=int, help='Sites fetched at once (SITE_WORKERS)')
+    site_parser.add_argument('-t', '--timeout', type=float, help='Seconds allowed per site (SITE_TIMEOUT)')
     
     # Pattern commands
     subparsers.add_parser('patterns', help='List all search patterns')
@@ -216,6 +841,122 @@ def main():
     pattern_parser.add_argument('pattern', type=str, help='Regex pattern')
     pattern_parser.add_argument('-n', '--name', type=str, help='Pattern name')
     
+    # Results command
+    results_parser = subparsers.add_parser('results', help='Query stored findings')
+    results_parser.add_argument('-p', '--pattern', type=str, help='Pattern name')
+    results_parser.add_argument('-v', '--value', type=str, help='Exact matched value')
+    results_parser.add_argument('-s', '--source', type=str, help='Source URL (* wildcard)')
+    results_parser.add_argument('--since', type=str, help='ISO date/time lower bound')
+    results_parser.add_argument('--until', type=str, help='ISO date/time upper bound')
+    results_parser.add_argument('-l', '--limit', type=int, default=100, help='Maximum rows')
+    results_parser.add_argument(
+        '--export',
+        action='store_true',
+        help='Export matches using EXPORT_FORMAT instead of displaying them'
+    )
+    
+    # Compact command
+    compact_parser = subparsers.add_parser('compact', help='Compact results into archives')
+    compact_parser.add_argument(
+        '--all',
+        action='store_true',
+        help="Also compact today's run files"
+    )
+    
+    # Daemon command
+    daemon_parser = subparsers.add_parser('daemon', help='Run monitoring continuously')
+    daemon_parser.add_argument('-q', '--query', type=str, help='Search query')
+    daemon_parser.add_argument('-e', '--engines', type=str, nargs='+', help='Search engines to use')
+    daemon_parser.add_argument('-i', '--interval', type=int, help='Seconds between cycles')
+    daemon_parser.add_argument('--stream', action='store_true', help='Stream findings to disk')
+    daemon_parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Port of the local Prometheus metrics endpoint (0 disables it)'
+    )
+    
+    # Sharded worker commands
+    enqueue_parser = subparsers.add_parser('enqueue', help='Queue URLs for sharded workers')
+    enqueue_parser.add_argument('-f', '--from-file', type=str, help='File with one URL per line')
+    enqueue_parser.add_argument('--requeue', action='store_true', help='Reset finished tasks')
+    enqueue_parser.add_argument('--queue', type=str, help='Work queue database path')
+    
+    worker_parser = subparsers.add_parser('worker', help='Run a sharded crawl worker')
+    worker_parser.add_argument('--id', type=str, help='Worker id (default: host-pid)')
+    worker_parser.add_argument('--once', action='store_true', help='Exit when no owned work is left')
+    worker_parser.add_argument('--status', action='store_true', help='Show queue status and exit')
+    worker_parser.add_argument('--queue', type=str, help='Work queue database path')
+    
+    # Profile command
+    profile_parser = subparsers.add_parser('profile', help='Rank patterns by scan cost on a corpus')
+    profile_parser.add_argument('corpus', type=str, help='Corpus file or directory of saved pages')
+    profile_parser.add_argument(
+        '-p', '--pattern',
+        type=str,
+        action='append',
+        help='Extra custom regex to profile (repeatable)'
+    )
+    profile_parser.add_argument('--no-growth', action='store_true', help='Skip the input-size growth check')
+    profile_parser.add_argument('-n', '--top', type=int, default=20, help='Number of patterns to show')
+    
+    # Replay command
+    replay_parser = subparsers.add_parser('replay', help='Rescan archived pages offline')
+    replay_parser.add_argument('-u', '--url', type=str, help='Archived URL (* wildcard)')
+    replay_parser.add_argument('--since', type=str, help='Fetched at or after (ISO, UTC)')
+    replay_parser.add_argument('--until', type=str, help='Fetched at or before (ISO, UTC)')
+    replay_parser.add_argument('--latest', action='store_true', help='Only the newest capture of each URL')
+    replay_parser.add_argument(
+        '-p', '--pattern',
+        type=str,
+        action='append',
+        help='Extra custom regex to scan for (repeatable)'
+    )
+    replay_parser.add_argument('--only-new', action='store_true', help='Scan only the --pattern regexes')
+    replay_parser.add_argument('--stream', action='store_true', help='Stream findings to disk')
+    replay_parser.add_argument('--stats', action='store_true', help='Show archive statistics and exit')
+    
+    # Hosts command
+    hosts_parser = subparsers.add_parser('hosts', help='Show host health and circuit state')
+    hosts_parser.add_argument(
+        '-s', '--state',
+        choices=['ok', 'failing', 'open', 'probing'],
+        help='Only hosts in this state'
+    )
+    hosts_parser.add_argument('-n', '--limit', type=int, default=50, help='Maximum rows')
+    hosts_parser.add_argument('--reset', type=str, metavar='HOST', help="Forget a host ('all' for every host)")
+    
+    # Serve command
+    serve_parser = subparsers.add_parser('serve', help='Run the local HTTP scan service')
+    serve_parser.add_argument('--host', type=str, help='Bind address (default SCAN_SERVICE_HOST)')
+    serve_parser.add_argument('--port', type=int, help='Port (default SCAN_SERVICE_PORT)')
+    serve_parser.add_argument('-w', '--workers', type=int, help='Scan workers (default SCAN_SERVICE_WORKERS)')
+    serve_parser.add_argument('--threads', action='store_true', help='Scan in threads instead of processes')
+    serve_parser.add_argument(
+        '-p', '--pattern',
+        type=str,
+        action='append',
+        help='Extra custom regex to scan for (repeatable)'
+    )
+    
+    # Graph command
+    graph_parser = subparsers.add_parser('graph', help='Show the onion link graph and new hosts')
+    graph_parser.add_argument('-n', '--limit', type=int, default=20, help='Maximum rows')
+    graph_parser.add_argument('--new', action='store_true', help='List recently discovered hosts')
+    graph_parser.add_argument('--hours', type=float, help='How recent --new hosts are (default LINK_NEW_HOST_HOURS)')
+    graph_parser.add_argument('--from-leaks', action='store_true',
+                              help='Only new hosts linked from sites with findings (implies --new)')
+    
+    # Alerts command
+    alerts_parser = subparsers.add_parser('alerts', help='Show and deliver the alert outbox')
+    alerts_parser.add_argument('--flush', action='store_true', help='Send pending alerts now and wait')
+    alerts_parser.add_argument('--timeout', type=float, default=30.0, help='Seconds --flush may wait')
+    alerts_parser.add_argument('--requeue-dead', action='store_true',
+                               help='Retry deliveries that ran out of attempts')
+    
+    # Revisits command
+    revisits_parser = subparsers.add_parser('revisits', help='Show per-source revisit schedule')
+    revisits_parser.add_argument('-n', '--limit', type=int, default=50, help='Maximum rows')
+    
     # Info command
     subparsers.add_parser('info', help='Show configuration info')
     
@@ -230,20 +971,104 @@ def main():
     
     elif args.command == 'monitor':
         if cli.initialize_monitor():
-            cli.monitor_dark_web(query=args.query, engines=args.engines)
+            cli.monitor_dark_web(
+                query=args.query,
+                engines=args.engines,
+                stream=args.stream,
+                pipeline=args.pipeline,
+                resume=args.resume,
+                planner=args.plan,
+                scheduled=args.due
+            )
     
     elif args.command == 'site':
+        if not args.url and not args.from_file:
+            site_parser.error('give a URL or --from-file')
         if cli.initialize_monitor():
-            cli.monitor_specific_site(args.url)
+            if args.from_file:
+                cli.monitor_sites(args.from_file, workers=args.workers, timeout=args.timeout)
+            else:
+                cli.monitor_specific_site(args.url, timeout=args.timeout)
     
     elif args.command == 'patterns':
-        cli.initialize_monitor()
         cli.list_patterns()
     
     elif args.command == 'add-pattern':
-        cli.initialize_monitor()
         cli.add_pattern(args.pattern, args.name)
     
+    elif args.command == 'results':
+        if cli.initialize_monitor():
+            cli.query_results(
+                pattern=args.pattern,
+                value=args.value,
+                source=args.source,
+                since=args.since,
+                until=args.until,
+                limit=args.limit,
+                export=args.export
+            )
+    
+    elif args.command == 'compact':
+        cli.compact_results(include_today=args.all)
+    
+    elif args.command == 'daemon':
+        if cli.initialize_monitor():
+            if args.metrics_port is not None:
+                cli.monitor.config.METRICS_PORT = args.metrics_port
+            cli.run_daemon(
+                query=args.query,
+                engines=args.engines,
+                interval=args.interval,
+                stream=args.stream
+            )
+    
+    elif args.command == 'enqueue':
+        cli.enqueue_work(from_file=args.from_file, requeue=args.requeue, queue_path=args.queue)
+    
+    elif args.command == 'worker':
+        if args.status:
+            cli.show_work_queue(queue_path=args.queue)
+        elif cli.initialize_monitor():
+            cli.run_worker(worker_id=args.id, once=args.once, queue_path=args.queue)
+    
+    elif args.command == 'profile':
+        cli.profile_patterns(
+            args.corpus,
+            extra_patterns=args.pattern,
+            check_growth=not args.no_growth,
+            top=args.top
+        )
+    
+    elif args.command == 'replay':
+        if args.stats:
+            cli.show_archive()
+        elif cli.initialize_monitor(patterns=args.pattern):
+            cli.replay_archive(
+                url=args.url,
+                since=args.since,
+                until=args.until,
+                latest_only=args.latest,
+                only_new=args.only_new,
+                stream=args.stream
+            )
+    
+    elif args.command == 'hosts':
+        cli.show_hosts(state=args.state, limit=args.limit, reset=args.reset)
+    
+    elif args.command == 'serve':
+        cli.serve(host=args.host, port=args.port, workers=args.workers,
+                  threads=args.threads, patterns=args.pattern)
+    
+    elif args.command == 'graph':
+        cli.show_graph(limit=args.limit, new=args.new or args.from_leaks,
+                       hours=args.hours, from_leaks=args.from_leaks)
+    
+    elif args.command == 'alerts':
+        cli.show_alerts(flush=args.flush, timeout=args.timeout, requeue_dead=args.requeue_dead)
+    
+    elif args.command == 'revisits':
+        cli.show_revisits(limit=args.limit)
+    
     elif args.command == 'info':
         cli.print_info("Configuration Information:")
         print(f"  TOR Enabled: {cli.config.TOR_ENABLED}")
@@ -251,9 +1076,19 @@ def main():
         print(f"  Search Engines: {', '.join(cli.config.DARK_WEB_SEARCH_ENGINES.keys())}")
         print(f"  Results Directory: {cli.config.RESULTS_DIR}")
         print(f"  Export Format: {cli.config.EXPORT_FORMAT}")
+        print(f"  Findings Store: {cli.config.FINDINGS_DB if cli.config.STORE_FINDINGS else 'disabled'}")
+        print(f"  Page Archive: {cli.config.PAGE_ARCHIVE_DIR if cli.config.ARCHIVE_PAGES else 'disabled'}")
+        print(f"  Host Health: {cli.config.HOST_HEALTH_DB if cli.config.HOST_HEALTH_ENABLED else 'disabled'}")
+        print(f"  Link Graph: {cli.config.LINK_GRAPH_DB if cli.config.LINK_GRAPH_ENABLED else 'disabled'}")
+        print(f"  Alerts: {cli.config.ALERT_OUTBOX_DB} ({len(cli.config.ALERT_TARGETS)} targets)"
+              if cli.config.ALERTS_ENABLED else "  Alerts: disabled")
+        print(f"  Revisits: {cli.config.REVISIT_DB if cli.config.REVISIT_ENABLED else 'disabled'}")
     
     else:
         parser.print_help()
+    
+    if args.command in ('monitor', 'site', 'replay'):
+        cli.deliver_alerts()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,379 @@
+"""
+Compaction module
+Merges per-run result files into deduplicated, compressed archives
+"""
+
+import os
+import re
+import csv
+import gzip
+import json
+import math
+import base64
+import hashlib
+import itertools
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Iterable, Set, Tuple
+from config import get_config
+from logger import get_logger
+from findings_store import CASE_SENSITIVE_PATTERNS
+
+
+# monitor/daemon runs, single sites, site batches and replays; exports the user
+# asked for with `results --export` are left alone
+RUN_FILE_PREFIXES = ('monitor_', 'site_', 'sites_', 'replay_')
+RUN_FILE_SUFFIXES = ('.json', '.csv', '.ndjson', '.ndjson.gz', '.csv.gz')
+DATE_IN_NAME_RE = re.compile(r'_(\d{8})_\d{6}')
+
+
+def comparable_value(pattern: Optional[str], matched_text: str) -> str:
+    """Matched value as compared for equality, lowercased unless case-sensitive"""
+    value = matched_text.strip()
+    return value if pattern in CASE_SENSITIVE_PATTERNS else value.lower()
+
+
+def finding_fingerprint(finding: Dict) -> str:
+    """Stable fingerprint used to deduplicate findings across runs"""
+    key = '|'.join([
+        finding.get('pattern', ''),
+        comparable_value(finding.get('pattern'), finding.get('matched_text', '')),
+        finding.get('source_url', ''),
+    ])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+class BloomFilter:
+    """Small Bloom filter used to skip archives during value lookups"""
+
+    def __init__(self, size_bits: int, hashes: int = 4, bits: Optional[bytearray] = None):
+        self.size_bits = max(64, size_bits)
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray(math.ceil(self.size_bits / 8))
+
+    @classmethod
+    def for_capacity(cls, capacity: int, bits_per_item: int = 10) -> 'BloomFilter':
+        """Create a filter sized for the given number of items"""
+        return cls(capacity * bits_per_item)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.sha1(value.strip().lower().encode('utf-8')).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], 'big') % self.size_bits
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos // 8] |= 1 << (pos % 8)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(value))
+
+    def to_dict(self) -> Dict:
+        return {
+            'size_bits': self.size_bits,
+            'hashes': self.hashes,
+            'bits': base64.b64encode(bytes(self.bits)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BloomFilter':
+        return cls(data['size_bits'], data['hashes'], bytearray(base64.b64decode(data['bits'])))
+
+
+class ResultsCompactor:
+    """Compacts RESULTS_DIR into daily/weekly archives with a manifest index"""
+
+    def __init__(self, results_dir: Optional[str] = None):
+        """Initialize compactor"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.results_dir = results_dir or self.config.RESULTS_DIR
+        self.archive_dir = os.path.join(self.results_dir, 'archive')
+        self.manifest_path = os.path.join(self.archive_dir, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        """Load manifest index from disk"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'version': 1, 'archives': {}}
+
+    def _save_manifest(self):
+        """Atomically write the manifest index"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_path)
+
+    # ------------------------------------------------------------------
+    # Input discovery and parsing
+    # ------------------------------------------------------------------
+
+    def _run_file_day(self, path: str) -> date:
+        """Determine which day a run file belongs to"""
+        match = DATE_IN_NAME_RE.search(os.path.basename(path))
+        if match:
+            return datetime.strptime(match.group(1), '%Y%m%d').date()
+        return datetime.fromtimestamp(os.path.getmtime(path)).date()
+
+    def find_run_files(self, include_today: bool = False) -> Dict[date, List[str]]:
+        """Find per-run files grouped by day, skipping the still-open day"""
+        grouped: Dict[date, List[str]] = {}
+        today = date.today()
+        settle_before = datetime.now().timestamp() - 60
+
+        if not os.path.isdir(self.results_dir):
+            return grouped
+
+        for entry in os.scandir(self.results_dir):
+            if not entry.is_file():
+                continue
+            if not (entry.name.startswith(RUN_FILE_PREFIXES)
+                    and entry.name.endswith(RUN_FILE_SUFFIXES)):
+                continue
+            day = self._run_file_day(entry.path)
+            if day >= today and not include_today:
+                continue
+            if entry.stat().st_mtime > settle_before:
+                continue  # may still be written by a streaming sink
+            grouped.setdefault(day, []).append(entry.path)
+
+        return grouped
+
+    @staticmethod
+    def read_findings(path: str) -> Iterable[Dict]:
+        """Read findings from a result file of any supported format"""
+        opener = gzip.open if path.endswith('.gz') else open
+        name = path[:-3] if path.endswith('.gz') else path
+
+        with opener(path, 'rt', newline='') as f:
+            if name.endswith('.ndjson'):
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # truncated tail of an interrupted run
+                    if record.get('type') != 'trailer':
+                        yield record
+            elif name.endswith('.csv'):
+                for row in csv.DictReader(f):
+                    if row.get('pattern') != '__trailer__':
+                        yield row
+            else:
+                try:
+                    data = json.load(f)
+                except ValueError:
+                    return
+                for finding in data.get('findings', []):
+                    yield finding
+
+    # ------------------------------------------------------------------
+    # Archive writing
+    # ------------------------------------------------------------------
+
+    def _archive_path(self, kind: str, period: str) -> str:
+        return os.path.join(self.archive_dir, kind, f"{period}.ndjson.gz")
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.archive_dir)
+
+    def _read_archive(self, path: str) -> Iterable[Dict]:
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _write_archive(self, kind: str, period: str, start: date, end: date,
+                       findings: Iterable[Dict]) -> int:
+        """Append deduplicated findings to an archive and index it in the manifest"""
+        path = self._archive_path(kind, period)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rel = self._rel(path)
+        entry = self.manifest['archives'].get(rel)
+        if entry and not os.path.exists(path):
+            entry = None
+        if entry is None and os.path.exists(path):
+            # Left by a pass that stopped before saving the manifest: rewrite it with its records
+            findings = itertools.chain(list(self._read_archive(path)), findings)
+
+        seen: Set[str] = set()
+        if entry:
+            seen = {r['fingerprint'] for r in self._read_archive(path)}
+
+        new_records = []
+        for finding in findings:
+            fingerprint = finding.get('fingerprint') or finding_fingerprint(finding)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            record = dict(finding)
+            record['fingerprint'] = fingerprint
+            new_records.append(record)
+
+        if not new_records:
+            return 0
+
+        # Each append adds a new gzip member; readers see one continuous stream
+        with open(path, 'ab' if entry else 'wb') as raw, \
+                gzip.GzipFile(fileobj=raw, mode='ab') as gz:
+            for record in new_records:
+                gz.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+
+        self._index_archive(rel, kind, period, start, end, new_records, entry)
+        return len(new_records)
+
+    def _index_archive(self, rel: str, kind: str, period: str, start: date, end: date,
+                       new_records: List[Dict], entry: Optional[Dict]):
+        """Update the manifest entry for an archive"""
+        patterns: Dict[str, int] = dict(entry['patterns']) if entry else {}
+        for record in new_records:
+            name = record.get('pattern', '')
+            patterns[name] = patterns.get(name, 0) + 1
+
+        total = (entry['records'] if entry else 0) + len(new_records)
+        bloom = BloomFilter.from_dict(entry['values']) if entry else None
+
+        if bloom is None or bloom.size_bits < total * 5:
+            # Resize once the filter is too full to stay selective
+            bloom = BloomFilter.for_capacity(total)
+            records = self._read_archive(os.path.join(self.archive_dir, rel)) if entry else new_records
+        else:
+            records = new_records
+        for record in records:
+            bloom.add(record.get('matched_text', ''))
+
+        self.manifest['archives'][rel] = {
+            'kind': kind,
+            'period': period,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'records': total,
+            'patterns': patterns,
+            'values': bloom.to_dict(),
+        }
+
+    # ------------------------------------------------------------------
+    # Compaction, rollup and retention
+    # ------------------------------------------------------------------
+
+    def compact(self, include_today: bool = False) -> Dict:
+        """Run one incremental compaction pass"""
+        stats = {'files_compacted': 0, 'records_archived': 0,
+                 'weekly_rollups': 0, 'archives_expired': 0}
+
+        for day, paths in sorted(self.find_run_files(include_today).items()):
+            findings = (f for path in paths for f in self.read_findings(path))
+            stats['records_archived'] += self._write_archive(
+                'daily', day.isoformat(), day, day, findings
+            )
+            self._save_manifest()
+
+            for path in paths:
+                os.remove(path)
+            stats['files_compacted'] += len(paths)
+
+        stats['weekly_rollups'] = self._rollup_weekly()
+        stats['archives_expired'] = self._apply_retention()
+
+        if any(stats.values()):
+            self._save_manifest()
+            self.logger.info(
+                f"Compaction: {stats['files_compacted']} files, "
+                f"{stats['records_archived']} records, "
+                f"{stats['weekly_rollups']} weekly rollups, "
+                f"{stats['archives_expired']} expired archives"
+            )
+
+        return stats
+
+    def _rollup_weekly(self) -> int:
+        """Merge daily archives older than COMPACT_DAILY_DAYS into weekly archives"""
+        cutoff = date.today() - timedelta(days=self.config.COMPACT_DAILY_DAYS)
+        weeks: Dict[Tuple[int, int], List[str]] = {}
+
+        for rel, entry in self.manifest['archives'].items():
+            if entry['kind'] != 'daily':
+                continue
+            day = date.fromisoformat(entry['start'])
+            if day < cutoff:
+                weeks.setdefault(day.isocalendar()[:2], []).append(rel)
+
+        for (year, week), rels in weeks.items():
+            start = date.fromisocalendar(year, week, 1)
+            end = start + timedelta(days=6)
+            period = f"{year}-W{week:02d}"
+            paths = [os.path.join(self.archive_dir, rel) for rel in sorted(rels)]
+            # A daily may be gone already if an earlier pass stopped halfway through its deletes
+            findings = (r for path in paths if os.path.exists(path) for r in self._read_archive(path))
+            self._write_archive('weekly', period, start, end, findings)
+            # The weekly entry is on disk before any daily goes; a rerun merges them again
+            self._save_manifest()
+
+            for rel, path in zip(sorted(rels), paths):
+                if os.path.exists(path):
+                    os.remove(path)
+                del self.manifest['archives'][rel]
+            self._save_manifest()
+
+        return len(weeks)
+
+    def _apply_retention(self) -> int:
+        """Delete archives whose period ended before the retention window"""
+        if self.config.COMPACT_RETENTION_DAYS <= 0:
+            return 0
+
+        cutoff = date.today() - timedelta(days=self.config.COMPACT_RETENTION_DAYS)
+        expired = [
+            rel for rel, entry in self.manifest['archives'].items()
+            if date.fromisoformat(entry['end']) < cutoff
+        ]
+
+        for rel in expired:
+            path = os.path.join(self.archive_dir, rel)
+            if os.path.exists(path):
+                os.remove(path)
+            del self.manifest['archives'][rel]
+
+        return len(expired)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def candidate_archives(self, pattern: Optional[str] = None, value: Optional[str] = None,
+                           since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """Select archives that may contain matches using only the manifest"""
+        candidates = []
+
+        for rel, entry in sorted(self.manifest['archives'].items()):
+            if since and entry['end'] < since[:10]:
+                continue
+            if until and entry['start'] > until[:10]:
+                continue
+            if pattern and pattern not in entry['patterns']:
+                continue
+            if value and value not in BloomFilter.from_dict(entry['values']):
+                continue
+            candidates.append(rel)
+
+        return candidates
+
+    def query(self, pattern: Optional[str] = None, value: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """Query archived findings, decompressing only candidate archives"""
+        results = []
+
+        for rel in self.candidate_archives(pattern, value, since, until):
+            for record in self._read_archive(os.path.join(self.archive_dir, rel)):
+                if pattern and record.get('pattern') != pattern:
+                    continue
+                if value and (comparable_value(record.get('pattern'), record.get('matched_text', ''))
+                              != comparable_value(record.get('pattern'), value)):
+                    continue
+                results.append(record)
+
+        return results
@@ -10,6 +10,15 @@ from typing import Dict, List
 # Load environment variables
 load_dotenv()
 
+
+def _map_from_env(name: str, default: Dict[str, str]) -> Dict[str, str]:
+    """Read a 'name=value,name=value' override, e.g. engine URLs of a local mock server"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return dict(item.strip().split('=', 1) for item in value.split(',') if '=' in item)
+
+
 class Config:
     """Main configuration class"""
     
@@ -22,32 +31,46 @@ class Config:
     
     # Proxy Configuration
     USE_PROXY = os.getenv('USE_PROXY', 'True').lower() == 'true'
-    PROXY_URL = f'socks5://{TOR_HOST}:{TOR_PORT}'
+    PROXY_URL = f'socks5h://{TOR_HOST}:{TOR_PORT}'  # socks5h: .onion names resolve in the proxy
     
     # Request Configuration
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
     RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
-    RETRY_DELAY = int(os.getenv('RETRY_DELAY', '5'))
+    RETRY_DELAY = int(os.getenv('RETRY_DELAY', '5'))  # seconds before the first retry, then doubling
+    # Retries per error class (timeout, connection, http, other); unlisted classes and
+    # client errors (http_client, 4xx other than 429) are not retried
+    RETRY_POLICIES: Dict[str, int] = {
+        name: int(attempts) for name, attempts in _map_from_env('RETRY_POLICIES', {
+            'connection': str(RETRY_ATTEMPTS),
+            'http': str(RETRY_ATTEMPTS),
+            'timeout': '1',
+        }).items()
+    }
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))  # retries per first attempt
+    RETRY_BUDGET_MIN = int(os.getenv('RETRY_BUDGET_MIN', '10'))
     
     # Search Engines (Onion URLs)
-    DARK_WEB_SEARCH_ENGINES: Dict[str, str] = {
+    DARK_WEB_SEARCH_ENGINES: Dict[str, str] = _map_from_env('DARK_WEB_SEARCH_ENGINES', {
         'ahmia': 'http://juhanurmihxlp77nfq6owps5p7eixxinewsvyat7yppk5as5rjohnq.onion',
         'torch': 'http://torchdeepdotnqzio3nl.onion',
         'darkweb_link': 'http://darkweblink.onion',
         'notevil': 'http://notevil.onion',
-    }
+    })
     
     # Hidden Wiki URLs
-    HIDDEN_WIKI_URLS: Dict[str, str] = {
+    HIDDEN_WIKI_URLS: Dict[str, str] = _map_from_env('HIDDEN_WIKI_URLS', {
         'main': 'http://thehiddenwiki.onion',
         'mirror1': 'http://3g2upl4pq6kufc4m.onion',  # DuckDuckGo
         'mirror2': 'http://zqktlwi4fd.onion',  # The Tor Project
-    }
+    })
     
     # Monitoring Configuration
     MONITORING_INTERVAL = int(os.getenv('MONITORING_INTERVAL', '3600'))  # 1 hour
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', './logs/darkweb_monitor.log')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # text, json (applies to LOG_FILE)
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '20'))  # warnings+ per call site and window; 0 = off
+    LOG_RATE_WINDOW = float(os.getenv('LOG_RATE_WINDOW', '60'))  # seconds
     
     # Patterns and Keywords to Monitor
     MONITORED_PATTERNS: List[str] = [
@@ -63,10 +86,143 @@ class Config:
         'bitcoin',
     ]
     
+    # Normalization Configuration (one pass per document before the patterns run)
+    NORMALIZE_TEXT = os.getenv('NORMALIZE_TEXT', 'True').lower() == 'true'  # NFKC, zero-width, [at]/[dot]
+    
+    # Scan Budget Configuration (per page; 0 = unlimited)
+    SCAN_BUDGET_BYTES = int(os.getenv('SCAN_BUDGET_BYTES', '4194304'))  # characters scanned in full
+    SCAN_BUDGET_SECONDS = float(os.getenv('SCAN_BUDGET_SECONDS', '10'))  # CPU seconds
+    SCAN_SAMPLE_WINDOW = int(os.getenv('SCAN_SAMPLE_WINDOW', '65536'))  # characters per window over the byte budget
+    
+    # Validation Configuration (post-match checks and confidence for built-in patterns)
+    VALIDATION_ENABLED = os.getenv('VALIDATION_ENABLED', 'True').lower() == 'true'
+    VALIDATION_MIN_CONFIDENCE = float(os.getenv('VALIDATION_MIN_CONFIDENCE', '0.3'))  # lower is dropped
+    VALIDATION_TLD_FILE = os.getenv('VALIDATION_TLD_FILE', '')  # IANA tlds-alpha-by-domain.txt; default: built-in list
+    
+    # Pipeline Configuration (fetch -> parse -> scan -> sink)
+    PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'False').lower() == 'true'
+    PIPELINE_FETCH_WORKERS = int(os.getenv('PIPELINE_FETCH_WORKERS', '4'))
+    PIPELINE_PARSE_WORKERS = int(os.getenv('PIPELINE_PARSE_WORKERS', '2'))
+    PIPELINE_SCAN_WORKERS = int(os.getenv('PIPELINE_SCAN_WORKERS', '2'))
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))
+    PIPELINE_USE_PROCESSES = os.getenv('PIPELINE_USE_PROCESSES', 'True').lower() == 'true'
+    
+    # Query Planner Configuration (fan-out searches and result follow-through)
+    QUERY_PLANNER_ENABLED = os.getenv('QUERY_PLANNER_ENABLED', 'False').lower() == 'true'
+    QUERY_GROUP_SIZE = int(os.getenv('QUERY_GROUP_SIZE', '3'))  # keywords per query
+    QUERY_TOP_K = int(os.getenv('QUERY_TOP_K', '25'))  # result pages fetched, 0 = all
+    QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', '8'))
+    QUERY_BUDGET_SECONDS = float(os.getenv('QUERY_BUDGET_SECONDS', '900'))  # 0 = unbounded
+    
+    # Batch Site Configuration (site --from-file)
+    SITE_WORKERS = int(os.getenv('SITE_WORKERS', '8'))
+    SITE_TIMEOUT = float(os.getenv('SITE_TIMEOUT', '90'))  # seconds per site, including the body
+    
+    # Memory Configuration (per-run RSS budget; 0 disables spilling and throttling)
+    MEMORY_BUDGET_MB = float(os.getenv('MEMORY_BUDGET_MB', '1024'))
+    MEMORY_PRESSURE_RATIO = float(os.getenv('MEMORY_PRESSURE_RATIO', '0.8'))  # share of the budget
+    MEMORY_PRESSURE_FETCHES = int(os.getenv('MEMORY_PRESSURE_FETCHES', '1'))  # in-flight fetches under pressure
+    MEMORY_MAX_FETCHES = int(os.getenv('MEMORY_MAX_FETCHES', '0'))  # in-flight fetches otherwise, 0 = unlimited
+    MEMORY_SPILL_MIN_BYTES = int(os.getenv('MEMORY_SPILL_MIN_BYTES', '262144'))  # smaller pages stay in memory
+    MEMORY_SPILL_DIR = os.getenv('MEMORY_SPILL_DIR', '')  # default: system temp dir
+    MEMORY_SAMPLE_SECONDS = float(os.getenv('MEMORY_SAMPLE_SECONDS', '0.25'))
+    MEMORY_PRESSURE_CONTEXT = int(os.getenv('MEMORY_PRESSURE_CONTEXT', '40'))  # context chars per finding
+    
+    # Sharded Worker Configuration
+    WORKER_HEARTBEAT_TTL = int(os.getenv('WORKER_HEARTBEAT_TTL', '60'))
+    WORKER_LEASE_SECONDS = int(os.getenv('WORKER_LEASE_SECONDS', '600'))
+    WORKER_POLL_INTERVAL = int(os.getenv('WORKER_POLL_INTERVAL', '5'))
+    WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', '10'))
+    
+    # Metrics Configuration (daemon mode endpoint; 0 disables it)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+    METRICS_MAX_HOSTS = int(os.getenv('METRICS_MAX_HOSTS', '200'))  # later hosts are labelled 'other'
+    
+    # Scan Service Configuration (local HTTP scan API, see the serve command)
+    SCAN_SERVICE_HOST = os.getenv('SCAN_SERVICE_HOST', '127.0.0.1')
+    SCAN_SERVICE_PORT = int(os.getenv('SCAN_SERVICE_PORT', '8765'))
+    SCAN_SERVICE_WORKERS = int(os.getenv('SCAN_SERVICE_WORKERS', '4'))
+    SCAN_SERVICE_USE_PROCESSES = os.getenv('SCAN_SERVICE_USE_PROCESSES', 'True').lower() == 'true'
+    SCAN_SERVICE_MAX_BODY = int(os.getenv('SCAN_SERVICE_MAX_BODY', '16777216'))  # bytes per request
+    SCAN_SERVICE_MAX_BATCH = int(os.getenv('SCAN_SERVICE_MAX_BATCH', '1000'))  # items per batch request
+    
     # Output Configuration
     RESULTS_DIR = os.getenv('RESULTS_DIR', './results')
     EXPORT_FORMAT = os.getenv('EXPORT_FORMAT', 'json')  # json, csv, txt
     
+    # Findings Store Configuration
+    STORE_FINDINGS = os.getenv('STORE_FINDINGS', 'True').lower() == 'true'
+    FINDINGS_DB = os.getenv('FINDINGS_DB', os.path.join(RESULTS_DIR, 'findings.db'))
+    WORK_QUEUE_DB = os.getenv('WORK_QUEUE_DB', os.path.join(RESULTS_DIR, 'work_queue.db'))
+    
+    # Checkpoint Configuration
+    CHECKPOINT_ENABLED = os.getenv('CHECKPOINT_ENABLED', 'True').lower() == 'true'
+    CHECKPOINT_FILE = os.getenv('CHECKPOINT_FILE', os.path.join(RESULTS_DIR, 'checkpoint.json'))
+    CHECKPOINT_INTERVAL = float(os.getenv('CHECKPOINT_INTERVAL', '5'))  # seconds
+    
+    # Streaming Results Configuration
+    STREAM_FORMAT = os.getenv('STREAM_FORMAT', 'ndjson')  # ndjson, csv
+    STREAM_COMPRESS = os.getenv('STREAM_COMPRESS', 'False').lower() == 'true'
+    STREAM_ROTATE_BYTES = int(os.getenv('STREAM_ROTATE_BYTES', '0'))  # 0 = no size rotation
+    STREAM_ROTATE_SECONDS = int(os.getenv('STREAM_ROTATE_SECONDS', '0'))  # 0 = no time rotation
+    
+    # Compaction and Retention Configuration
+    COMPACT_EVERY_CYCLE = os.getenv('COMPACT_EVERY_CYCLE', 'True').lower() == 'true'
+    COMPACT_DAILY_DAYS = int(os.getenv('COMPACT_DAILY_DAYS', '7'))  # then rolled up weekly
+    COMPACT_RETENTION_DAYS = int(os.getenv('COMPACT_RETENTION_DAYS', '365'))  # 0 = keep forever
+    
+    # Host Health Configuration (adaptive timeouts and circuit breaking)
+    HOST_HEALTH_ENABLED = os.getenv('HOST_HEALTH_ENABLED', 'True').lower() == 'true'
+    HOST_HEALTH_DB = os.getenv('HOST_HEALTH_DB', os.path.join(RESULTS_DIR, 'host_health.db'))
+    HOST_FAILURE_THRESHOLD = int(os.getenv('HOST_FAILURE_THRESHOLD', '3'))  # consecutive failures
+    HOST_PROBE_BASE = float(os.getenv('HOST_PROBE_BASE', '600'))  # first wait before a probe, seconds
+    HOST_PROBE_MAX = float(os.getenv('HOST_PROBE_MAX', '86400'))  # wait doubles up to this
+    HOST_LATENCY_WINDOW = int(os.getenv('HOST_LATENCY_WINDOW', '32'))  # latencies kept per host
+    HOST_MIN_SAMPLES = int(os.getenv('HOST_MIN_SAMPLES', '3'))  # before timeouts adapt
+    HOST_TIMEOUT_FACTOR = float(os.getenv('HOST_TIMEOUT_FACTOR', '4'))  # timeout = factor x p95
+    HOST_TIMEOUT_MIN = float(os.getenv('HOST_TIMEOUT_MIN', '10'))
+    
+    # Link Graph Configuration (host-to-host onion links and ranking)
+    LINK_GRAPH_ENABLED = os.getenv('LINK_GRAPH_ENABLED', 'True').lower() == 'true'
+    LINK_GRAPH_DB = os.getenv('LINK_GRAPH_DB', os.path.join(RESULTS_DIR, 'link_graph.db'))
+    LINK_GRAPH_BATCH = int(os.getenv('LINK_GRAPH_BATCH', '200'))  # pages per write
+    LINK_RANK_DAMPING = float(os.getenv('LINK_RANK_DAMPING', '0.85'))
+    LINK_RANK_ITERATIONS = int(os.getenv('LINK_RANK_ITERATIONS', '50'))  # upper bound per update
+    LINK_RANK_TOLERANCE = float(os.getenv('LINK_RANK_TOLERANCE', '1e-6'))
+    LINK_NEW_HOST_HOURS = float(os.getenv('LINK_NEW_HOST_HOURS', '24'))  # hosts this recent count as new
+    
+    # Alert Configuration (durable outbox dispatched to webhook, syslog and file targets)
+    ALERTS_ENABLED = os.getenv('ALERTS_ENABLED', 'False').lower() == 'true'
+    ALERT_OUTBOX_DB = os.getenv('ALERT_OUTBOX_DB', os.path.join(RESULTS_DIR, 'alerts.db'))
+    # http(s)://... webhook, syslog://host:port or syslog:///dev/log, file:///path.ndjson
+    ALERT_TARGETS: List[str] = [t.strip() for t in os.getenv('ALERT_TARGETS', '').split(',') if t.strip()]
+    ALERT_PATTERNS: List[str] = [p.strip() for p in os.getenv('ALERT_PATTERNS', '*').split(',') if p.strip()]
+    ALERT_HIGH_PATTERNS: List[str] = [p.strip() for p in os.getenv('ALERT_HIGH_PATTERNS', '').split(',') if p.strip()]
+    ALERT_WATCHLIST: List[str] = [w.strip() for w in os.getenv('ALERT_WATCHLIST', '').split(',') if w.strip()]
+    ALERT_WATCHLIST_FILE = os.getenv('ALERT_WATCHLIST_FILE', '')  # one term per line, # comments
+    ALERT_BATCH_SIZE = int(os.getenv('ALERT_BATCH_SIZE', '100'))
+    ALERT_BATCH_SECONDS = float(os.getenv('ALERT_BATCH_SECONDS', '10'))  # high severity skips the wait
+    ALERT_COALESCE_SECONDS = float(os.getenv('ALERT_COALESCE_SECONDS', '3600'))  # duplicates merged
+    ALERT_RETRY_DELAY = float(os.getenv('ALERT_RETRY_DELAY', '5'))  # then doubling
+    ALERT_RETRY_MAX = float(os.getenv('ALERT_RETRY_MAX', '600'))
+    ALERT_MAX_ATTEMPTS = int(os.getenv('ALERT_MAX_ATTEMPTS', '8'))  # then the delivery is dead
+    ALERT_TIMEOUT = float(os.getenv('ALERT_TIMEOUT', '10'))  # seconds per delivery request
+    
+    # Revisit Scheduler Configuration (per-source intervals from observed change rates)
+    REVISIT_ENABLED = os.getenv('REVISIT_ENABLED', 'False').lower() == 'true'
+    REVISIT_DB = os.getenv('REVISIT_DB', os.path.join(RESULTS_DIR, 'revisits.db'))
+    REVISIT_MIN_INTERVAL = float(os.getenv('REVISIT_MIN_INTERVAL', '900'))  # seconds
+    REVISIT_MAX_INTERVAL = float(os.getenv('REVISIT_MAX_INTERVAL', '604800'))  # 1 week
+    REVISIT_HISTORY = int(os.getenv('REVISIT_HISTORY', '20'))  # visits kept per source
+    REVISIT_MIN_VISITS = int(os.getenv('REVISIT_MIN_VISITS', '3'))  # before the interval adapts
+    REVISIT_YIELD_WEIGHT = float(os.getenv('REVISIT_YIELD_WEIGHT', '1.0'))  # 0 = change rate only
+    
+    # Page Archive Configuration (raw responses for offline replay)
+    ARCHIVE_PAGES = os.getenv('ARCHIVE_PAGES', 'False').lower() == 'true'
+    PAGE_ARCHIVE_DIR = os.getenv('PAGE_ARCHIVE_DIR', os.path.join(RESULTS_DIR, 'pages'))
+    PAGE_ARCHIVE_SEGMENT_BYTES = int(os.getenv('PAGE_ARCHIVE_SEGMENT_BYTES', '268435456'))  # 256 MB
+    
     # User Agent
     USER_AGENTS: List[str] = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
@@ -6,27 +6,99 @@ Handles crawling and fetching content from dark web sites
 import requests
 import time
 import random
-from typing import Optional, Dict, List
+import socket
+import threading
+from contextlib import nullcontext
+from typing import Optional, Dict, List, Callable
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from config import get_config
 from logger import get_logger
+from metrics import get_metrics, LabelLimiter
+from page_archive import PageArchive
+from host_health import HostHealthTracker, CircuitOpenError
+from memory_governor import MemoryGovernor
+from retry_queue import RetryQueue
+
+
+def extract_text(html_content: str) -> str:
+    """Extract visible text from HTML (picklable for process pools)"""
+    return BeautifulSoup(html_content, 'html.parser').get_text()
+
+
+def classify_error(error: Optional[BaseException]) -> Optional[str]:
+    """Name the class of a fetch error: circuit, timeout, http, http_client, connection or other
+
+    Client errors (4xx other than 429 Too Many Requests) are 'http_client':
+    asking again will get the same answer.
+    """
+    if error is None:
+        return None
+    if isinstance(error, CircuitOpenError):
+        return 'circuit'
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = getattr(error.response, 'status_code', None)
+        if status is not None and 400 <= status < 500 and status != 429:
+            return 'http_client'
+        return 'http'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'connection'
+    return 'other'
+
+
+def _abort_response(response: requests.Response):
+    """Unblock a read in progress on another thread by shutting the socket down"""
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    response.close()
+
 
 class DarkWebCrawler:
     """Crawls dark web sites and retrieves content"""
     
-    def __init__(self, use_tor: bool = True):
-        """Initialize crawler"""
+    def __init__(self, use_tor: bool = True, archive: Optional[PageArchive] = None,
+                 health: Optional[HostHealthTracker] = None,
+                 governor: Optional[MemoryGovernor] = None):
+        """Initialize crawler
+        
+        Successful responses are recorded into the page archive when one is
+        given or ARCHIVE_PAGES is enabled. Per-host health (adaptive timeouts
+        and circuit breaking) is tracked when a tracker is given or
+        HOST_HEALTH_ENABLED is set. With a memory governor, each request
+        holds one of its fetch slots, so fewer bodies are in flight while
+        the run is under memory pressure.
+        """
         self.config = get_config()
         self.logger = get_logger()
+        self.metrics = get_metrics()
+        self._host_label = LabelLimiter(self.config.METRICS_MAX_HOSTS)
         self.use_tor = use_tor and self.config.TOR_ENABLED
         self.session = self._create_session()
         self.visited_urls: List[str] = []
+        self._local = threading.local()
+        
+        if archive is None and self.config.ARCHIVE_PAGES:
+            archive = PageArchive(self.config.PAGE_ARCHIVE_DIR)
+        self.archive = archive
+        
+        if health is None and self.config.HOST_HEALTH_ENABLED:
+            health = HostHealthTracker()
+        self.health = health
+        self.governor = governor
+    
+    def _fetch_slot(self):
+        """Fetch slot of the memory governor, if any"""
+        return self.governor.fetch_slot() if self.governor is not None else nullcontext()
     
     def _create_session(self) -> requests.Session:
-        """Create requests session with retry strategy"""
+        """Create requests session"""
         session = requests.Session()
         
         # Configure proxy if Tor is enabled
@@ -38,29 +110,137 @@ class DarkWebCrawler:
             session.proxies.update(proxies)
             self.logger.info(f"Using Tor proxy: {self.config.PROXY_URL}")
         
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=self.config.RETRY_ATTEMPTS,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"]
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # No adapter retries: a failed request returns at once and sweeps
+        # reschedule it on their RetryQueue, so backoff never blocks a worker;
+        # other callers ask fetch_url for in-line retries
+        adapter = HTTPAdapter(max_retries=0)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         
         return session
     
-    def fetch_url(self, url: str, timeout: Optional[int] = None) -> Optional[str]:
-        """Fetch content from a URL"""
+    def _record_fetch(self, url: str, started: float, response: Optional[requests.Response] = None):
+        """Record latency and size of a fetch, or an error when no response"""
+        host = self._host_label(urlparse(url).hostname or 'unknown')
+        
+        if response is None:
+            self.metrics.counter(
+                'darkwalker_fetch_errors_total', 'Failed fetches per host'
+            ).inc(host=host)
+            return
+        
+        self.metrics.histogram(
+            'darkwalker_fetch_seconds', 'Fetch latency per host'
+        ).observe(time.monotonic() - started, host=host)
+        self.metrics.counter(
+            'darkwalker_bytes_downloaded_total', 'Response bytes downloaded per host'
+        ).inc(len(response.content), host=host)
+    
+    def _check_health(self, url: str) -> Optional[str]:
+        """Return the host of url, raising CircuitOpenError while it is skipped"""
+        host = urlparse(url).hostname or 'unknown'
+        if self.health is not None and not self.health.allow(host):
+            raise CircuitOpenError(f"Skipping {host}: circuit open after repeated failures")
+        return host
+    
+    def _record_health(self, host: str, started: float, error: Optional[BaseException] = None):
+        """Update the host's health record after a request"""
+        if self.health is None:
+            return
+        
+        response = getattr(error, 'response', None)
+        if error is None or (response is not None and response.status_code < 500):
+            # A client error still proves the host is up
+            self.health.record_success(host, time.monotonic() - started)
+        else:
+            self.health.record_failure(host, classify_error(error))
+    
+    def _archive_response(self, response: requests.Response):
+        """Record a fetched response in the page archive, if enabled"""
+        if self.archive is None:
+            return
+        
+        try:
+            self.archive.record(
+                response.url,
+                response.text,
+                status=response.status_code,
+                headers=dict(response.headers)
+            )
+        except Exception as e:
+            self.logger.error("Error archiving %s: %s", response.url, e)
+    
+    def _read_body(self, response: requests.Response, deadline: float):
+        """Read a streamed response body, closing it once the deadline passes"""
+        # A slow-drip body never trips the per-read timeout, so a timer closes
+        # the connection from outside instead
+        watchdog = threading.Timer(max(deadline - time.monotonic(), 0), _abort_response, (response,))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            response.content
+        except Exception:
+            if time.monotonic() < deadline:
+                raise
+        finally:
+            watchdog.cancel()
+        if time.monotonic() >= deadline:
+            raise requests.exceptions.Timeout(f"Body of {response.url} not received in time")
+    
+    def _retrying(self, fetch: Callable[[Optional[float]], Optional[str]], label: str,
+                  max_seconds: Optional[float] = None) -> Optional[str]:
+        """Call fetch(max_seconds), retrying failures in-line under RETRY_POLICIES
+        
+        For callers that are not part of a sweep with its own RetryQueue; the
+        delay blocks the calling thread. max_seconds bounds all attempts
+        together, and no retry is started once its delay would run past it.
+        """
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        retries = RetryQueue(first_attempts=1)
+        item = {'url': label}
+        while True:
+            error = None
+            try:
+                content = fetch(None if deadline is None else deadline - time.monotonic())
+                error_class = self.last_error() if content is None else None
+            except Exception as e:
+                content, error, error_class = None, e, classify_error(e)
+            
+            if error_class is not None and retries.schedule(item, error_class):
+                delay = retries.seconds_until_due() or 0
+                if deadline is None or time.monotonic() + delay < deadline:
+                    time.sleep(delay)
+                    retries.pop_due()
+                    continue
+            if error is not None:
+                raise error
+            return content
+    
+    def fetch_url(self, url: str, timeout: Optional[int] = None,
+                  max_seconds: Optional[float] = None, retry: bool = False) -> Optional[str]:
+        """Fetch content from a URL
+        
+        timeout bounds each connect and read; max_seconds additionally bounds
+        the whole request, so a host that drips its body byte by byte cannot
+        hold the caller indefinitely. With retry, failures are retried in-line
+        (see _retrying) and max_seconds bounds all attempts together.
+        """
+        if retry:
+            return self._retrying(
+                lambda left: self.fetch_url(url, timeout, left), url, max_seconds
+            )
+        self._local.error = None
         if url in self.visited_urls:
-            self.logger.debug(f"URL already visited: {url}")
+            self.logger.debug("URL already visited: %s", url)
             return None
         
-        timeout = timeout or self.config.REQUEST_TIMEOUT
-        
         try:
+            host = self._check_health(url)
+            if timeout is None:
+                timeout = self.health.timeout_for(host) if self.health else self.config.REQUEST_TIMEOUT
+            if max_seconds:
+                timeout = min(timeout, max_seconds)
+            
             # Random delay to avoid detection
             time.sleep(random.uniform(1, 3))
             
@@ -74,23 +254,52 @@ class DarkWebCrawler:
                 'Upgrade-Insecure-Requests': '1'
             }
             
-            response = self.session.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status()
+            started = time.monotonic()
+            try:
+                with self._fetch_slot():
+                    response = self.session.get(
+                        url, headers=headers, timeout=timeout, stream=bool(max_seconds)
+                    )
+                    response.raise_for_status()
+                    if max_seconds:
+                        self._read_body(response, started + max_seconds)
+            except Exception as e:
+                self._record_fetch(url, started)
+                self._record_health(host, started, e)
+                raise
+            self._record_fetch(url, started, response)
+            self._record_health(host, started)
+            self._archive_response(response)
             
             self.visited_urls.append(url)
-            self.logger.info(f"Successfully fetched: {url}")
+            self.logger.info("Successfully fetched: %s", url)
             
             return response.text
         
+        except CircuitOpenError as e:
+            self._local.error = e
+            self.logger.debug("%s", e)
+            return None
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error fetching {url}: {str(e)}")
+            self._local.error = e
+            self.logger.error("Error fetching %s: %s", url, e)
             return None
         except Exception as e:
-            self.logger.error(f"Unexpected error fetching {url}: {str(e)}")
+            self._local.error = e
+            self.logger.error("Unexpected error fetching %s: %s", url, e)
             return None
     
-    def parse_html(self, html_content: str) -> Dict:
-        """Parse HTML content"""
+    def last_error(self) -> Optional[str]:
+        """Class of the error that failed this thread's last fetch_url, if any"""
+        return classify_error(getattr(self._local, 'error', None))
+    
+    def parse_html(self, html_content: str, sections: bool = True) -> Dict:
+        """Parse HTML content
+        
+        sections=False leaves out the paragraphs and headings lists, which
+        repeat most of the text; callers that only scan the text skip them.
+        """
+        started = time.monotonic()
         try:
             soup = BeautifulSoup(html_content, 'html.parser')
             
@@ -98,13 +307,17 @@ class DarkWebCrawler:
                 'title': soup.title.string if soup.title else 'No title',
                 'text': soup.get_text(),
                 'links': [link.get('href') for link in soup.find_all('a', href=True)],
-                'paragraphs': [p.get_text() for p in soup.find_all('p')],
-                'headings': [h.get_text() for h in soup.find_all(['h1', 'h2', 'h3'])],
             }
+            if sections:
+                parsed_data['paragraphs'] = [p.get_text() for p in soup.find_all('p')]
+                parsed_data['headings'] = [h.get_text() for h in soup.find_all(['h1', 'h2', 'h3'])]
             
+            self.metrics.histogram(
+                'darkwalker_parse_seconds', 'HTML parse time'
+            ).observe(time.monotonic() - started)
             return parsed_data
         except Exception as e:
-            self.logger.error(f"Error parsing HTML: {str(e)}")
+            self.logger.error("Error parsing HTML: %s", e)
             return {}
     
     def crawl_hidden_wiki(self) -> Dict[str, str]:
@@ -114,45 +327,87 @@ class DarkWebCrawler:
         for wiki_name, wiki_url in self.config.HIDDEN_WIKI_URLS.items():
             self.logger.info(f"Crawling Hidden Wiki: {wiki_name}")
             
-            content = self.fetch_url(wiki_url)
+            content = self.fetch_url(wiki_url, retry=True)
             if content:
-                parsed = self.parse_html(content)
+                parsed = self.parse_html(content, sections=False)
                 wiki_content[wiki_name] = parsed.get('text', '')
         
         return wiki_content
     
-    def search_dark_web(self, query: str, search_engine: str = 'ahmia') -> Dict:
+    def fetch_search_page(self, query: str, search_engine: str = 'ahmia',
+                          max_seconds: Optional[float] = None, retry: bool = False) -> str:
+        """Fetch the raw results page of a search engine (raises on failure)
+        
+        max_seconds and retry work as in fetch_url.
+        """
+        if retry:
+            return self._retrying(
+                lambda left: self.fetch_search_page(query, search_engine, left),
+                f"search:{search_engine}:{query}", max_seconds
+            )
+        if search_engine not in self.config.DARK_WEB_SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine: {search_engine}")
+        
+        search_url = self.config.DARK_WEB_SEARCH_ENGINES[search_engine]
+        
+        # Search engine specific parameters
+        search_params = {
+            'ahmia': {'q': query},
+            'torch': {'q': query},
+        }
+        
+        params = search_params.get(search_engine, {'q': query})
+        
+        self.logger.info("Searching %s for: %s", search_engine, query)
+        
+        headers = {
+            'User-Agent': random.choice(self.config.USER_AGENTS),
+        }
+        
+        self._local.error = None
+        try:
+            host = self._check_health(search_url)
+        except CircuitOpenError as e:
+            self._local.error = e
+            raise
+        timeout = self.health.timeout_for(host) if self.health else self.config.REQUEST_TIMEOUT
+        if max_seconds:
+            timeout = min(timeout, max_seconds)
+        
+        started = time.monotonic()
+        try:
+            with self._fetch_slot():
+                response = self.session.get(
+                    search_url,
+                    params=params,
+                    headers=headers,
+                    timeout=timeout,
+                    stream=bool(max_seconds)
+                )
+                response.raise_for_status()
+                if max_seconds:
+                    self._read_body(response, started + max_seconds)
+        except Exception as e:
+            self._local.error = e
+            self._record_fetch(search_url, started)
+            self._record_health(host, started, e)
+            raise
+        self._record_fetch(search_url, started, response)
+        self._record_health(host, started)
+        self._archive_response(response)
+        
+        return response.text
+    
+    def search_dark_web(self, query: str, search_engine: str = 'ahmia',
+                        sections: bool = True) -> Dict:
         """Search dark web using specified search engine"""
         if search_engine not in self.config.DARK_WEB_SEARCH_ENGINES:
             self.logger.error(f"Unknown search engine: {search_engine}")
             return {}
         
-        search_url = self.config.DARK_WEB_SEARCH_ENGINES[search_engine]
-        
         try:
-            # Search engine specific parameters
-            search_params = {
-                'ahmia': {'q': query},
-                'torch': {'q': query},
-            }
-            
-            params = search_params.get(search_engine, {'q': query})
-            
-            self.logger.info(f"Searching {search_engine} for: {query}")
-            
-            headers = {
-                'User-Agent': random.choice(self.config.USER_AGENTS),
-            }
-            
-            response = self.session.get(
-                search_url,
-                params=params,
-                headers=headers,
-                timeout=self.config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            
-            parsed = self.parse_html(response.text)
+            html_content = self.fetch_search_page(query, search_engine)
+            parsed = self.parse_html(html_content, sections=sections)
             return {
                 'search_engine': search_engine,
                 'query': query,
@@ -161,7 +416,7 @@ class DarkWebCrawler:
             }
         
         except Exception as e:
-            self.logger.error(f"Search error on {search_engine}: {str(e)}")
+            self.logger.error("Search error on %s: %s", search_engine, e)
             return {'status': 'error', 'error': str(e)}
     
     def extract_onion_links(self, html_content: str) -> List[str]:
@@ -183,4 +438,4 @@ class DarkWebCrawler:
     def clear_visited(self):
         """Clear visited URLs list"""
         self.visited_urls = []
-        self.logger.info("Cleared visited URLs")
+        self.logger.debug("Cleared visited URLs")
@@ -0,0 +1,171 @@
+"""
+Findings Store module
+Indexed SQLite storage for scan findings across monitoring runs
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable
+from config import get_config
+from logger import get_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    search_query TEXT,
+    kind TEXT NOT NULL DEFAULT 'monitor'
+);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER REFERENCES runs(id),
+    pattern TEXT NOT NULL,
+    matched_text TEXT NOT NULL,
+    value_hash TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    context TEXT,
+    timestamp TEXT NOT NULL,
+    confidence REAL NOT NULL DEFAULT 1.0
+);
+
+CREATE INDEX IF NOT EXISTS idx_findings_pattern_time ON findings(pattern, timestamp);
+CREATE INDEX IF NOT EXISTS idx_findings_value_hash ON findings(value_hash);
+CREATE INDEX IF NOT EXISTS idx_findings_source_time ON findings(source_url, timestamp);
+CREATE INDEX IF NOT EXISTS idx_findings_time ON findings(timestamp);
+"""
+
+FINDING_FIELDS = ['pattern', 'matched_text', 'source_url', 'context', 'timestamp', 'confidence']
+
+# Built-in patterns whose values differ by letter case (Base58 addresses, keys);
+# all other matches are compared case-insensitively
+CASE_SENSITIVE_PATTERNS = ('bitcoin', 'api_key')
+
+
+def value_hash(matched_text: str) -> str:
+    """Hash a matched value for indexed equality lookups
+
+    The hash ignores case; lookups also compare the text of values from
+    CASE_SENSITIVE_PATTERNS.
+    """
+    return hashlib.sha1(matched_text.strip().lower().encode('utf-8')).hexdigest()
+
+
+class FindingsStore:
+    """Embedded SQLite store for findings with indexed lookups"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize store and create schema"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.db_path = db_path or self.config.FINDINGS_DB
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def start_run(self, search_query: Optional[str] = None, kind: str = 'monitor') -> int:
+        """Register a monitoring run and return its id"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (started_at, search_query, kind) VALUES (?, ?, ?)',
+                (datetime.now().isoformat(), search_query, kind)
+            )
+        return cursor.lastrowid
+
+    def add_findings(self, findings: Iterable[Dict], run_id: Optional[int] = None) -> int:
+        """Insert a batch of findings in a single transaction"""
+        rows = [
+            (
+                run_id,
+                f['pattern'],
+                f['matched_text'],
+                value_hash(f['matched_text']),
+                f['source_url'],
+                f.get('context'),
+                f['timestamp'],
+                f.get('confidence', 1.0),
+            )
+            for f in findings
+        ]
+
+        if not rows:
+            return 0
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO findings '
+                '(run_id, pattern, matched_text, value_hash, source_url, context, timestamp, confidence) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+        self.logger.debug("Stored %d findings", len(rows))
+        return len(rows)
+
+    def query(self, pattern: Optional[str] = None, value: Optional[str] = None,
+              source: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict]:
+        """Query findings by pattern, value, source and date range"""
+        clauses = []
+        params: List = []
+
+        if pattern:
+            clauses.append('pattern = ?')
+            params.append(pattern)
+        if value:
+            sensitive = ', '.join('?' * len(CASE_SENSITIVE_PATTERNS))
+            clauses.append(f'value_hash = ? AND (pattern NOT IN ({sensitive}) OR matched_text = ?)')
+            params.extend([value_hash(value), *CASE_SENSITIVE_PATTERNS, value.strip()])
+        if source:
+            if '*' in source or '%' in source:
+                clauses.append('source_url LIKE ?')
+                params.append(source.replace('*', '%'))
+            else:
+                clauses.append('source_url = ?')
+                params.append(source)
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('timestamp < ?')
+            params.append(until)
+
+        sql = f"SELECT {', '.join(FINDING_FIELDS)} FROM findings"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY timestamp DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def has_seen(self, value: str, pattern: Optional[str] = None) -> bool:
+        """Check whether a value has been seen in any previous run"""
+        return bool(self.query(pattern=pattern, value=value, limit=1))
+
+    def count(self) -> int:
+        """Get total number of stored findings"""
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM findings').fetchone()[0]
+
+    def close(self):
+        """Close database connection"""
+        with self._lock:
+            self.conn.close()
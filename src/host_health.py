@@ -0,0 +1,262 @@
+"""
+Host Health module
+Per-host latency and failure records, adaptive timeouts and circuit breaking
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Optional
+from config import get_config
+from logger import get_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    successes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    last_success REAL,
+    last_failure REAL,
+    last_error TEXT,
+    latencies TEXT NOT NULL DEFAULT '[]',
+    next_probe REAL,
+    backoff REAL NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_hosts_next_probe ON hosts(next_probe);
+"""
+
+COLUMNS = ('host', 'successes', 'failures', 'consecutive_failures', 'last_success',
+           'last_failure', 'last_error', 'latencies', 'next_probe', 'backoff')
+
+
+class CircuitOpenError(Exception):
+    """Raised or recorded when a host is skipped because its circuit is open"""
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, or None without samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class HostHealth:
+    """Health record of one host"""
+    host: str
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_success: Optional[float] = None
+    last_failure: Optional[float] = None
+    last_error: Optional[str] = None
+    latencies: List[float] = field(default_factory=list)
+    next_probe: Optional[float] = None
+    backoff: float = 0.0
+
+    @property
+    def p50(self) -> Optional[float]:
+        return percentile(self.latencies, 0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return percentile(self.latencies, 0.95)
+
+    def state(self, now: Optional[float] = None) -> str:
+        """ok, failing (below the threshold), open (skipped) or probing (due for a probe)"""
+        if self.next_probe is None:
+            return 'failing' if self.consecutive_failures else 'ok'
+        return 'open' if (now or time.time()) < self.next_probe else 'probing'
+
+    def to_dict(self) -> Dict:
+        return {
+            'host': self.host,
+            'state': self.state(),
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'p50': self.p50,
+            'p95': self.p95,
+            'last_success': _iso(self.last_success),
+            'last_failure': _iso(self.last_failure),
+            'last_error': self.last_error,
+            'next_probe': _iso(self.next_probe),
+        }
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class HostHealthTracker:
+    """Persistent per-host health with adaptive timeouts and a circuit breaker
+
+    Each host keeps its last HOST_LATENCY_WINDOW successful fetch latencies.
+    Once HOST_MIN_SAMPLES are known, its timeout is HOST_TIMEOUT_FACTOR times
+    the p95 latency, kept between HOST_TIMEOUT_MIN and REQUEST_TIMEOUT.
+
+    After HOST_FAILURE_THRESHOLD consecutive failures the circuit opens: the
+    host is skipped until its next probe time. A due probe lets one request
+    through; if it fails the wait doubles, from HOST_PROBE_BASE up to
+    HOST_PROBE_MAX, and a success closes the circuit. Records live in memory
+    and are written through to SQLite, so they carry over to the next run.
+    The database is only opened on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize tracker"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.path = path or self.config.HOST_HEALTH_DB
+        self.conn: Optional[sqlite3.Connection] = None
+        self._hosts: Dict[str, HostHealth] = {}
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+        return self.conn
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> HostHealth:
+        values = dict(row)
+        values['latencies'] = json.loads(values['latencies'])
+        return HostHealth(**values)
+
+    def get(self, host: str) -> HostHealth:
+        """Get the record of a host (a fresh one if it was never seen)"""
+        with self._lock:
+            record = self._hosts.get(host)
+            if record is None:
+                row = self._connect().execute('SELECT * FROM hosts WHERE host = ?', (host,)).fetchone()
+                record = self._from_row(row) if row else HostHealth(host)
+                self._hosts[host] = record
+            return record
+
+    def _save(self, record: HostHealth):
+        values = [getattr(record, column) for column in COLUMNS]
+        values[COLUMNS.index('latencies')] = json.dumps([round(x, 3) for x in record.latencies])
+        with self._connect():
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO hosts ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                values
+            )
+
+    def allow(self, host: str) -> bool:
+        """Check whether a request to host may go out now
+
+        While the circuit is open this is False. When a probe is due, the
+        first caller is let through and the probe time moves on, so
+        concurrent callers do not all probe the same dead host.
+        """
+        with self._lock:
+            record = self.get(host)
+            if record.next_probe is None:
+                return True
+            now = time.time()
+            if now < record.next_probe:
+                return False
+            record.next_probe = now + max(record.backoff, self.config.HOST_PROBE_BASE)
+            return True
+
+    def timeout_for(self, host: str, default: Optional[float] = None) -> float:
+        """Timeout adapted to the host's observed latency"""
+        default = default or self.config.REQUEST_TIMEOUT
+        record = self.get(host)
+        if len(record.latencies) < self.config.HOST_MIN_SAMPLES:
+            return default
+        adaptive = record.p95 * self.config.HOST_TIMEOUT_FACTOR
+        return min(default, max(self.config.HOST_TIMEOUT_MIN, adaptive))
+
+    def record_success(self, host: str, seconds: float):
+        """Record a completed request and close the host's circuit"""
+        with self._lock:
+            record = self.get(host)
+            record.successes += 1
+            record.consecutive_failures = 0
+            record.last_success = time.time()
+            record.latencies.append(seconds)
+            del record.latencies[:-self.config.HOST_LATENCY_WINDOW]
+            if record.next_probe is not None:
+                self.logger.info("Host %s is reachable again", host)
+            record.next_probe = None
+            record.backoff = 0.0
+            self._save(record)
+
+    def record_failure(self, host: str, error: Optional[str] = None):
+        """Record a failed request, opening or extending the circuit"""
+        with self._lock:
+            record = self.get(host)
+            record.failures += 1
+            record.consecutive_failures += 1
+            record.last_failure = time.time()
+            record.last_error = error
+            if record.consecutive_failures >= self.config.HOST_FAILURE_THRESHOLD:
+                if record.backoff:
+                    record.backoff = min(record.backoff * 2, self.config.HOST_PROBE_MAX)
+                else:
+                    record.backoff = self.config.HOST_PROBE_BASE
+                    self.logger.warning(
+                        "Host %s failed %d times in a row, skipping it for %ss",
+                        host, record.consecutive_failures, record.backoff
+                    )
+                record.next_probe = record.last_failure + record.backoff
+            self._save(record)
+
+    def reset(self, host: Optional[str] = None) -> int:
+        """Forget one host (or all hosts) and return the number of records removed"""
+        with self._lock:
+            with self._connect():
+                if host:
+                    self._hosts.pop(host, None)
+                    cursor = self.conn.execute('DELETE FROM hosts WHERE host = ?', (host,))
+                else:
+                    self._hosts.clear()
+                    cursor = self.conn.execute('DELETE FROM hosts')
+            return cursor.rowcount
+
+    def hosts(self, state: Optional[str] = None, limit: Optional[int] = None) -> List[HostHealth]:
+        """List host records, most consecutive failures first"""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT * FROM hosts ORDER BY consecutive_failures DESC, host'
+            ).fetchall()
+            records = [self._hosts.get(row['host']) or self._from_row(row) for row in rows]
+        now = time.time()
+        if state:
+            records = [r for r in records if r.state(now) == state]
+        return records[:limit] if limit else records
+
+    def stats(self) -> Dict[str, int]:
+        """Count hosts per state"""
+        counts = {'ok': 0, 'failing': 0, 'open': 0, 'probing': 0}
+        now = time.time()
+        for record in self.hosts():
+            counts[record.state(now)] += 1
+        return counts
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,310 @@
+"""
+Link Graph module
+Persistent host-to-host onion link graph with incremental ranking
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Optional, Iterable, Set
+from config import get_config
+from logger import get_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_fetched REAL,
+    fetches INTEGER NOT NULL DEFAULT 0,
+    findings INTEGER NOT NULL DEFAULT 0,
+    rank REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS edges (
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (src, dst)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_hosts_first_seen ON hosts(first_seen);
+CREATE INDEX IF NOT EXISTS idx_hosts_rank ON hosts(rank);
+CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges(dst);
+"""
+
+# v2 (16 chars) and v3 (56 chars) onion names, with or without subdomains
+ONION_HOST = re.compile(r'(?<![a-z2-7])((?:[a-z2-7]{56}|[a-z2-7]{16})\.onion)\b', re.IGNORECASE)
+
+
+def onion_hosts(html: str) -> List[str]:
+    """Distinct onion hosts mentioned in a page, in order of first mention
+
+    A regex pass over the raw HTML, so it costs far less than walking the
+    parsed tree and also catches hosts written out in plain text.
+    """
+    return list(dict.fromkeys(host.lower() for host in ONION_HOST.findall(html or '')))
+
+
+def host_of(url: str) -> Optional[str]:
+    """Onion host of a URL, or None if it does not name one"""
+    match = ONION_HOST.search(url or '')
+    return match.group(1).lower() if match else None
+
+
+class LinkGraph:
+    """Host-level onion link graph stored in SQLite
+
+    add_page() records the hosts a fetched page links to. Updates are kept
+    in memory and written in one transaction every LINK_GRAPH_BATCH pages
+    (or on flush()), so recording a page costs a few dictionary updates.
+    Every host and edge keeps its first and last sighting; hosts also count
+    fetches and pages with findings, which marks them as leak sites.
+
+    update_ranks() runs PageRank power iterations starting from the stored
+    ranks, so after a sweep adds a few edges it converges in a handful of
+    iterations instead of starting over. Newly discovered hosts that were
+    never fetched are put first by order(), then hosts by rank. The database
+    is only opened on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: Optional[int] = None):
+        """Initialize graph"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.path = path or self.config.LINK_GRAPH_DB
+        self.batch_size = max(1, batch_size or self.config.LINK_GRAPH_BATCH)
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._seen: Dict[str, List[float]] = {}
+        self._edges: Dict[tuple, List[float]] = {}
+        self._fetched: Dict[str, List] = {}
+        self._pages = 0
+        self._dirty = False
+        self.counts = {'pages': 0, 'new_hosts': 0, 'new_edges': 0, 'flushes': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+        return self.conn
+
+    def add_page(self, url: str, linked_hosts: Iterable[str], findings: int = 0,
+                 fetched: bool = True, now: Optional[float] = None):
+        """Record the hosts linked from one page of url"""
+        src = host_of(url)
+        if src is None:
+            return
+        now = now or time.time()
+        with self._lock:
+            self._sighting(self._seen, src, now)
+            if fetched:
+                entry = self._fetched.setdefault(src, [now, 0, 0])
+                entry[0] = now
+                entry[1] += 1
+                entry[2] += 1 if findings else 0
+            for dst in linked_hosts:
+                if dst != src:
+                    self._sighting(self._seen, dst, now)
+                    self._sighting(self._edges, (src, dst), now)
+            self._pages += 1
+            self.counts['pages'] += 1
+            if self._pages >= self.batch_size:
+                self.flush()
+
+    @staticmethod
+    def _sighting(buffer: Dict, key, now: float):
+        span = buffer.get(key)
+        if span is None:
+            buffer[key] = [now, now]
+        else:
+            span[0] = min(span[0], now)
+            span[1] = max(span[1], now)
+
+    def flush(self):
+        """Write buffered hosts and edges in one transaction"""
+        with self._lock:
+            if not self._pages:
+                return
+            seen, edges, fetched = self._seen, self._edges, self._fetched
+            self._seen, self._edges, self._fetched, self._pages = {}, {}, {}, 0
+
+            with self._connect():
+                new_hosts = self.conn.executemany(
+                    'INSERT OR IGNORE INTO hosts (host, first_seen, last_seen) VALUES (?, ?, ?)',
+                    [(host, first, last) for host, (first, last) in seen.items()]
+                ).rowcount
+                self.conn.executemany(
+                    'UPDATE hosts SET last_seen = MAX(last_seen, ?) WHERE host = ?',
+                    [(last, host) for host, (first, last) in seen.items()]
+                )
+                self.conn.executemany(
+                    'UPDATE hosts SET last_fetched = ?, fetches = fetches + ?, findings = findings + ? '
+                    'WHERE host = ?',
+                    [(ts, fetches, hits, host) for host, (ts, fetches, hits) in fetched.items()]
+                )
+                new_edges = self.conn.executemany(
+                    'INSERT OR IGNORE INTO edges (src, dst, first_seen, last_seen) VALUES (?, ?, ?, ?)',
+                    [(src, dst, first, last) for (src, dst), (first, last) in edges.items()]
+                ).rowcount
+                self.conn.executemany(
+                    'UPDATE edges SET last_seen = MAX(last_seen, ?) WHERE src = ? AND dst = ?',
+                    [(last, src, dst) for (src, dst), (first, last) in edges.items()]
+                )
+
+            self.counts['new_hosts'] += max(new_hosts, 0)
+            self.counts['new_edges'] += max(new_edges, 0)
+            self.counts['flushes'] += 1
+            self._dirty = self._dirty or bool(new_hosts or new_edges)
+            if new_hosts:
+                self.logger.info("Link graph: %d new hosts, %d new links", new_hosts, new_edges)
+
+    def update_ranks(self, force: bool = False) -> int:
+        """Bring PageRank up to date; return the number of iterations run
+
+        Nothing is done unless hosts or links were added since the last
+        update (or force is set).
+        """
+        self.flush()
+        with self._lock:
+            if not (self._dirty or force):
+                return 0
+            conn = self._connect()
+            ranks = {row['host']: row['rank'] for row in conn.execute('SELECT host, rank FROM hosts')}
+            if not ranks:
+                return 0
+            out_links: Dict[str, List[str]] = {}
+            for row in conn.execute('SELECT src, dst FROM edges'):
+                out_links.setdefault(row['src'], []).append(row['dst'])
+
+            count = len(ranks)
+            damping = self.config.LINK_RANK_DAMPING
+            # Warm start from the stored ranks; new hosts start at the rank of
+            # a host nothing links to, which is close to where most of them end up
+            if sum(ranks.values()) <= 0:
+                ranks = dict.fromkeys(ranks, 1.0 / count)
+            else:
+                ranks = {host: rank or (1.0 - damping) / count for host, rank in ranks.items()}
+                total = sum(ranks.values())
+                ranks = {host: rank / total for host, rank in ranks.items()}
+
+            iterations = 0
+            for iterations in range(1, self.config.LINK_RANK_ITERATIONS + 1):
+                dangling = sum(rank for host, rank in ranks.items() if host not in out_links)
+                base = (1.0 - damping) / count + damping * dangling / count
+                updated = dict.fromkeys(ranks, base)
+                for src, targets in out_links.items():
+                    share = damping * ranks[src] / len(targets)
+                    for dst in targets:
+                        updated[dst] += share
+                delta = sum(abs(updated[host] - ranks[host]) for host in ranks)
+                ranks = updated
+                if delta < self.config.LINK_RANK_TOLERANCE:
+                    break
+
+            with conn:
+                conn.executemany('UPDATE hosts SET rank = ? WHERE host = ?',
+                                 [(rank, host) for host, rank in ranks.items()])
+            self._dirty = False
+            self.logger.debug("Link graph ranks updated for %d hosts in %d iterations", count, iterations)
+            return iterations
+
+    def order(self, urls: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """Sort URLs into fetch order: new unfetched hosts first, then by rank
+
+        URLs whose host is not in the graph keep their relative order after
+        the new hosts, as if their rank were zero.
+        """
+        urls = list(urls)
+        self.flush()
+        hosts = {url: host_of(url) for url in urls}
+        known = self._host_rows(set(filter(None, hosts.values())))
+        since = (now or time.time()) - self.config.LINK_NEW_HOST_HOURS * 3600
+
+        def key(url: str):
+            row = known.get(hosts[url])
+            if row is None:
+                return (1, 0.0)
+            is_new = row['last_fetched'] is None and row['first_seen'] >= since
+            return (0 if is_new else 1, -row['rank'])
+
+        return sorted(urls, key=key)
+
+    def _host_rows(self, hosts: Set[str]) -> Dict[str, sqlite3.Row]:
+        rows = {}
+        hosts = list(hosts)
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(hosts), 500):
+                chunk = hosts[i:i + 500]
+                for row in conn.execute(
+                    f"SELECT * FROM hosts WHERE host IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    rows[row['host']] = row
+        return rows
+
+    def new_hosts(self, hours: Optional[float] = None, from_leak_sites: bool = False,
+                  limit: int = 100, now: Optional[float] = None) -> List[Dict]:
+        """Hosts first seen in the last `hours` (default LINK_NEW_HOST_HOURS)
+
+        With from_leak_sites, only hosts linked from a host where findings
+        were made. Newest first.
+        """
+        hours = self.config.LINK_NEW_HOST_HOURS if hours is None else hours
+        since = (now or time.time()) - hours * 3600
+        query = 'SELECT h.* FROM hosts h WHERE h.first_seen >= ?'
+        if from_leak_sites:
+            query += (' AND EXISTS (SELECT 1 FROM edges e JOIN hosts s ON s.host = e.src'
+                      ' WHERE e.dst = h.host AND s.findings > 0)')
+        query += ' ORDER BY h.first_seen DESC LIMIT ?'
+        self.flush()
+        with self._lock:
+            rows = self._connect().execute(query, (since, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def top_hosts(self, limit: int = 20) -> List[Dict]:
+        """Highest-ranked hosts with their in-link counts"""
+        self.flush()
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT h.*, (SELECT COUNT(*) FROM edges e WHERE e.dst = h.host) AS in_links '
+                'FROM hosts h ORDER BY h.rank DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def linked_from(self, host: str) -> List[str]:
+        """Hosts linking to host"""
+        self.flush()
+        with self._lock:
+            rows = self._connect().execute('SELECT src FROM edges WHERE dst = ? ORDER BY src', (host,))
+            return [row['src'] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Host and edge totals plus this instance's update counters"""
+        self.flush()
+        with self._lock:
+            conn = self._connect()
+            hosts = conn.execute('SELECT COUNT(*) FROM hosts').fetchone()[0]
+            edges = conn.execute('SELECT COUNT(*) FROM edges').fetchone()[0]
+            leak_sites = conn.execute('SELECT COUNT(*) FROM hosts WHERE findings > 0').fetchone()[0]
+        return dict(self.counts, hosts=hosts, edges=edges, leak_sites=leak_sites)
+
+    def close(self):
+        """Write pending updates and close the database"""
+        with self._lock:
+            if self._pages:
+                self.flush()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
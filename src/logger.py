@@ -3,14 +3,108 @@ Logging module for Dark Web Monitoring Tool
 Handles all logging operations
 """
 
-import logging
 import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Tuple
 from config import get_config
 
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits records per call site, so error storms cannot flood the log
+
+    At most `limit` records at or above `min_level` pass per call site in each
+    `window` seconds. The first record of the next window reports how many
+    were dropped. Keying on the call site rather than the text keeps the limit
+    effective for messages that embed URLs or error details.
+    """
+
+    def __init__(self, limit: int, window: float, min_level: int = logging.WARNING):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.min_level = min_level
+        self._lock = threading.Lock()
+        self._sites: Dict[Tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.limit or record.levelno < self.min_level:
+            return True
+
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.limit:
+                site[1] += 1
+                return True
+            else:
+                site[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class _ForkSafeQueueHandler(QueueHandler):
+    """Queue handler that writes directly when used from a forked child
+
+    The listener thread only exists in the process that created it, so
+    records from forked worker processes go straight to the target handlers.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, listener: QueueListener):
+        super().__init__(log_queue)
+        self.listener = listener
+        self._pid = os.getpid()
+
+    def emit(self, record: logging.LogRecord):
+        if os.getpid() == self._pid:
+            super().emit(record)
+            return
+        for handler in self.listener.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
 class DarkWebLogger:
-    """Custom logger for dark web monitoring"""
+    """Custom logger for dark web monitoring
+    
+    Records are put on an in-memory queue and written to the file and console
+    by a background thread, so logging never blocks the crawl on disk or
+    terminal I/O. Messages accept %-style arguments, which are only formatted
+    when the level is enabled.
+    """
     
     _instance = None
     
@@ -25,6 +119,7 @@ class DarkWebLogger:
             return
         
         self.config = get_config()
+        self.listener: Optional[QueueListener] = None
         self._setup_logger()
         self._initialized = True
     
@@ -35,53 +130,80 @@ class DarkWebLogger:
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir)
         
+        level = getattr(logging, self.config.LOG_LEVEL)
+        
         # Create logger
         self.logger = logging.getLogger('DarkWebMonitor')
-        self.logger.setLevel(getattr(logging, self.config.LOG_LEVEL))
+        self.logger.setLevel(level)
         
         # Remove existing handlers
         self.logger.handlers = []
         
         # Create formatters
-        detailed_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if self.config.LOG_FORMAT == 'json':
+            file_formatter = JsonFormatter()
+        else:
+            file_formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
         
         # File handler
         file_handler = logging.FileHandler(self.config.LOG_FILE)
-        file_handler.setLevel(getattr(logging, self.config.LOG_LEVEL))
-        file_handler.setFormatter(detailed_formatter)
-        self.logger.addHandler(file_handler)
+        file_handler.setLevel(level)
+        file_handler.setFormatter(file_formatter)
         
         # Console handler
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(getattr(logging, self.config.LOG_LEVEL))
+        console_handler.setLevel(level)
         console_formatter = logging.Formatter(
             '[%(levelname)s] %(message)s'
         )
         console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
+        
+        # Both handlers are driven by a background writer thread
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        queue_handler = _ForkSafeQueueHandler(log_queue, self.listener)
+        queue_handler.addFilter(RateLimitFilter(self.config.LOG_RATE_LIMIT, self.config.LOG_RATE_WINDOW))
+        self.logger.addHandler(queue_handler)
+        
+        self.listener.start()
+        atexit.register(self.shutdown)
     
-    def info(self, message: str):
+    def is_enabled_for(self, level: int) -> bool:
+        """Check whether a level is logged, to skip building costly messages"""
+        return self.logger.isEnabledFor(level)
+    
+    def info(self, message: str, *args):
         """Log info message"""
-        self.logger.info(message)
+        self.logger.info(message, *args, stacklevel=2)
     
-    def warning(self, message: str):
+    def warning(self, message: str, *args):
         """Log warning message"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args, stacklevel=2)
     
-    def error(self, message: str):
+    def error(self, message: str, *args):
         """Log error message"""
-        self.logger.error(message)
+        self.logger.error(message, *args, stacklevel=2)
     
-    def debug(self, message: str):
+    def debug(self, message: str, *args):
         """Log debug message"""
-        self.logger.debug(message)
+        self.logger.debug(message, *args, stacklevel=2)
     
-    def critical(self, message: str):
+    def critical(self, message: str, *args):
         """Log critical message"""
-        self.logger.critical(message)
+        self.logger.critical(message, *args, stacklevel=2)
+    
+    def flush(self):
+        """Block until all queued records have been written"""
+        self.shutdown()
+        self.listener.start()
+    
+    def shutdown(self):
+        """Write out queued records and stop the writer thread"""
+        if self.listener._thread is not None:
+            self.listener.stop()
 
 
 def get_logger() -> DarkWebLogger:
@@ -0,0 +1,272 @@
+"""
+Match Validator module
+Post-match checks for the built-in patterns: checksums, address classes,
+TLDs and token entropy, turned into a confidence per match
+"""
+
+import math
+import hashlib
+import ipaddress
+from collections import Counter
+from functools import lru_cache
+from typing import Optional, FrozenSet, Callable, Dict
+from config import get_config
+from logger import get_logger
+
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_BASE58_INDEX = {c: i for i, c in enumerate(BASE58_ALPHABET)}
+BECH32_ALPHABET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+_BECH32_INDEX = {c: i for i, c in enumerate(BECH32_ALPHABET)}
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2bc830a3
+
+# Every ISO 3166 country-code TLD plus the generic TLDs seen in practice;
+# VALIDATION_TLD_FILE swaps in the full IANA list
+COUNTRY_TLDS = frozenset("""
+ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo
+br bs bt bw by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm
+do dz ec ee eg er es et eu fi fj fk fm fo fr ga gb gd ge gf gg gh gi gl gm gn gp gq gr
+gs gt gu gw gy hk hm hn hr ht hu id ie il im in io iq ir is it je jm jo jp ke kg kh ki
+km kn kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk ml mm mn mo
+mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph
+pk pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh si sk sl sm sn so sr
+ss st su sv sx sy sz tc td tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy uz
+va vc ve vg vi vn vu wf ws ye yt za zm zw
+""".split())
+
+GENERIC_TLDS = frozenset("""
+com net org edu gov mil int arpa info biz name pro mobi asia tel travel jobs museum aero
+coop cat onion app dev io ai xyz online site top club shop store tech website space live
+life world today news blog email link click cloud digital network systems solutions
+services company agency group center media host hosting server support security
+finance money bank market trade exchange crypto wallet global zone one pw win bid vip
+fun icu buzz work guru expert tools land city lol ninja rocks social chat page help
+""".split())
+
+# RFC 2606 / 6761 names that never belong to a real person or service
+RESERVED_TLDS = frozenset(['test', 'example', 'invalid', 'localhost', 'local'])
+RESERVED_DOMAINS = frozenset(['example.com', 'example.net', 'example.org'])
+
+_SHARED_ADDRESS_SPACE = ipaddress.IPv4Network('100.64.0.0/10')
+_DOCUMENTATION_NETWORKS = tuple(ipaddress.IPv4Network(n) for n in
+                                ('192.0.2.0/24', '198.51.100.0/24', '203.0.113.0/24'))
+
+# Image and asset names that the email pattern picks up (logo@2x.png)
+FILE_SUFFIXES = frozenset(['png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'css', 'js', 'ico', 'bmp'])
+
+PLACEHOLDER_WORDS = ('example', 'placeholder', 'your', 'xxxx', 'changeme', 'redacted', 'dummy',
+                     'sample', 'insert', 'todo', '****')
+
+
+@lru_cache(maxsize=8)
+def load_tld_file(path: str) -> FrozenSet[str]:
+    """TLDs from an IANA tlds-alpha-by-domain.txt style file"""
+    with open(path, encoding='utf-8') as f:
+        return frozenset(line.strip().lower() for line in f
+                         if line.strip() and not line.startswith('#'))
+
+
+def base58check_version(address: str) -> Optional[int]:
+    """Version byte of a valid 25-byte Base58Check address, or None"""
+    number = 0
+    for char in address:
+        digit = _BASE58_INDEX.get(char)
+        if digit is None:
+            return None
+        number = number * 58 + digit
+    leading = len(address) - len(address.lstrip('1'))
+    try:
+        payload = b'\x00' * leading + number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    except OverflowError:
+        return None
+    if len(payload) != 25:
+        return None
+    digest = hashlib.sha256(hashlib.sha256(payload[:21]).digest()).digest()
+    if digest[:4] != payload[21:]:
+        return None
+    return payload[0]
+
+
+def _bech32_polymod(values) -> int:
+    generator = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            if (top >> i) & 1:
+                checksum ^= generator[i]
+    return checksum
+
+
+def bech32_segwit_ok(address: str) -> bool:
+    """True for a segwit address with a valid Bech32 (v0) or Bech32m (v1+) checksum"""
+    address = address.lower()
+    hrp, _, data_part = address.rpartition('1')
+    if hrp != 'bc' or len(data_part) < 7:
+        return False
+    data = [_BECH32_INDEX.get(c) for c in data_part]
+    if None in data:
+        return False
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    constant = _bech32_polymod(expanded + data)
+    version = data[0]
+    if version > 16 or constant != (_BECH32_CONST if version == 0 else _BECH32M_CONST):
+        return False
+    program_bits = (len(data) - 7) * 5
+    program_length = program_bits // 8
+    if program_bits % 8 > 4 or not 2 <= program_length <= 40:
+        return False
+    return version != 0 or program_length in (20, 32)
+
+
+def luhn_ok(digits: str) -> bool:
+    """Luhn checksum of a digit string"""
+    total = 0
+    for i, char in enumerate(reversed(digits)):
+        digit = ord(char) - 48
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def shannon_entropy(token: str) -> float:
+    """Bits per character of a token"""
+    if not token:
+        return 0.0
+    length = len(token)
+    return -sum(n / length * math.log2(n / length) for n in Counter(token).values())
+
+
+class MatchValidator:
+    """Confidence for matches of the built-in patterns
+
+    validate() returns a confidence between 0 and 1, or None when the match
+    should be dropped. Each pattern's checks run cheapest first (length and
+    alphabet before hashing, string tests before parsing), and a match stops
+    at the first check that decides it:
+
+    - bitcoin: Base58Check or Bech32/Bech32m checksum; a well-formed address
+      with a bad checksum is kept at low confidence
+    - ip_address: 0.0.0.0 is dropped, loopback, reserved, link-local and
+      multicast ranges are low, private ranges medium
+    - email: unknown TLDs and file names are dropped, reserved test domains
+      are low
+    - api_key: placeholder and low-entropy tokens are dropped, tokens
+      without digits are medium
+    - credit_card: numbers failing the Luhn check are dropped
+
+    Matches under VALIDATION_MIN_CONFIDENCE are dropped too. Patterns
+    without a validator keep a confidence of 1.0.
+    """
+
+    BAD_CHECKSUM = 0.4
+    PRIVATE_ADDRESS = 0.6
+    RESERVED_ADDRESS = 0.3
+    RESERVED_DOMAIN = 0.5
+    WORDY_TOKEN = 0.6
+    MIN_TOKEN_ENTROPY = 3.0
+
+    def __init__(self, min_confidence: Optional[float] = None, tld_file: Optional[str] = None):
+        """Initialize validator"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.enabled = self.config.VALIDATION_ENABLED
+        self.min_confidence = (self.config.VALIDATION_MIN_CONFIDENCE
+                               if min_confidence is None else min_confidence)
+        tld_file = self.config.VALIDATION_TLD_FILE if tld_file is None else tld_file
+        self.tlds = COUNTRY_TLDS | GENERIC_TLDS
+        if tld_file:
+            try:
+                self.tlds = load_tld_file(tld_file) | {'onion'}
+            except OSError as e:
+                self.logger.warning("Could not read TLD file %s, using built-in list: %s", tld_file, e)
+        self.checks: Dict[str, Callable[[str], Optional[float]]] = {
+            'bitcoin': self.check_bitcoin,
+            'ip_address': self.check_ip_address,
+            'email': self.check_email,
+            'api_key': self.check_api_key,
+            'credit_card': self.check_credit_card,
+        }
+
+    def validate(self, pattern: str, matched_text: str) -> Optional[float]:
+        """Confidence of a match, or None to drop it"""
+        check = self.checks.get(pattern) if self.enabled else None
+        if check is None:
+            return 1.0
+        confidence = check(matched_text)
+        if confidence is None or confidence < self.min_confidence:
+            return None
+        return confidence
+
+    def check_bitcoin(self, text: str) -> Optional[float]:
+        if text[:3].lower() == 'bc1':
+            if not 14 <= len(text) <= 74 or (text != text.lower() and text != text.upper()):
+                return None
+            if any(c not in _BECH32_INDEX for c in text[3:].lower()):
+                return None
+            return 1.0 if bech32_segwit_ok(text) else self.BAD_CHECKSUM
+        if not 26 <= len(text) <= 35 or any(c not in _BASE58_INDEX for c in text):
+            return None
+        version = base58check_version(text)
+        if version is None:
+            return self.BAD_CHECKSUM
+        # 0x00 is pay-to-pubkey-hash (1...), 0x05 pay-to-script-hash (3...)
+        return 1.0 if version in (0x00, 0x05) else self.BAD_CHECKSUM
+
+    def check_ip_address(self, text: str) -> Optional[float]:
+        try:
+            address = ipaddress.IPv4Address(text)
+        except ValueError:
+            return None
+        if address.is_unspecified:
+            return None
+        if address.is_loopback or address.is_link_local or address.is_multicast or address.is_reserved:
+            return self.RESERVED_ADDRESS
+        if address.is_private or address in _SHARED_ADDRESS_SPACE:
+            # Documentation ranges (192.0.2.0/24 ...) are private to ipaddress too
+            if any(address in network for network in _DOCUMENTATION_NETWORKS):
+                return self.RESERVED_ADDRESS
+            return self.PRIVATE_ADDRESS
+        return 1.0
+
+    def check_email(self, text: str) -> Optional[float]:
+        local, _, domain = text.rpartition('@')
+        domain = domain.lower()
+        tld = domain.rsplit('.', 1)[-1]
+        if tld in FILE_SUFFIXES:
+            return None
+        if not local or local[0] == '.' or local[-1] == '.' or '..' in local:
+            return None
+        labels = domain.split('.')
+        if any(not label or label[0] == '-' or label[-1] == '-' for label in labels):
+            return None
+        if tld in RESERVED_TLDS:
+            return self.RESERVED_ADDRESS
+        if tld not in self.tlds:
+            return None
+        if '.'.join(labels[-2:]) in RESERVED_DOMAINS:
+            return self.RESERVED_DOMAIN
+        return 1.0
+
+    def check_api_key(self, text: str) -> Optional[float]:
+        separator = max(text.rfind(':'), text.rfind('='))
+        token = text[separator + 1:].strip().strip('"\'')
+        lowered = token.lower()
+        if any(word in lowered for word in PLACEHOLDER_WORDS):
+            return None
+        if shannon_entropy(token) < self.MIN_TOKEN_ENTROPY:
+            return None
+        if not any(c.isdigit() for c in token):
+            return self.WORDY_TOKEN
+        return 1.0
+
+    def check_credit_card(self, text: str) -> Optional[float]:
+        digits = ''.join(c for c in text if c.isdigit())
+        if not 13 <= len(digits) <= 19 or len(set(digits)) == 1:
+            return None
+        return 1.0 if luhn_ok(digits) else None
@@ -0,0 +1,329 @@
+"""
+Memory Governor module
+Run-wide memory budget: RSS tracking, fetch throttling and spilling page
+text and findings to temp files under pressure
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import weakref
+import threading
+import itertools
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Union, Iterable, Iterator
+from config import get_config
+from logger import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return max_rss_bytes()
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size over the life of this process (0 if unknown)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+@dataclass
+class SpilledText:
+    """Handle to page text parked in a temp file (picklable for process pools)"""
+    path: str
+    length: int
+
+
+def park_text(text: str, directory: str) -> SpilledText:
+    """Write text to a temp file in directory and return its handle"""
+    fd, path = tempfile.mkstemp(suffix='.txt', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogatepass') as f:
+        f.write(text)
+    return SpilledText(path, len(text))
+
+
+def load_text(value: Union[str, SpilledText, None]) -> Optional[str]:
+    """Text of a value that may have been parked; the temp file is removed"""
+    if not isinstance(value, SpilledText):
+        return value
+    with open(value.path, encoding='utf-8', errors='surrogatepass') as f:
+        text = f.read()
+    os.unlink(value.path)
+    return text
+
+
+class MemoryGovernor:
+    """Memory budget shared by the crawler, scanner and monitor of one run
+
+    With a budget (MEMORY_BUDGET_MB, 0 = none), the process is under
+    pressure once its RSS reaches MEMORY_PRESSURE_RATIO of the budget.
+    Under pressure:
+
+    - fetch_slot() lets only MEMORY_PRESSURE_FETCHES fetches run at once
+      (otherwise MEMORY_MAX_FETCHES, 0 = unlimited), so new page bodies stop
+      piling up while queued ones are processed;
+    - spill_text() parks page text of MEMORY_SPILL_MIN_BYTES or more in a
+      temp file until the next stage needs it;
+    - findings lists from findings_buffer() append to a temp NDJSON file;
+    - the scanner keeps MEMORY_PRESSURE_CONTEXT characters of context per
+      finding instead of its default.
+
+    RSS is sampled every MEMORY_SAMPLE_SECONDS between start_run() and
+    stop_run() and at each of these checks; report() gives the run's peak.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None):
+        """Initialize governor"""
+        self.config = get_config()
+        self.logger = get_logger()
+        budget_mb = self.config.MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget = int(budget_mb * MB)
+        self.threshold = int(self.budget * self.config.MEMORY_PRESSURE_RATIO)
+        self.max_fetches = self.config.MEMORY_MAX_FETCHES
+        self.pressure_fetches = max(1, self.config.MEMORY_PRESSURE_FETCHES)
+        self.spill_min_bytes = self.config.MEMORY_SPILL_MIN_BYTES
+        self.pressure_context = self.config.MEMORY_PRESSURE_CONTEXT
+        self.sample_seconds = self.config.MEMORY_SAMPLE_SECONDS
+        self.spill_parent = self.config.MEMORY_SPILL_DIR or None
+        self._in_flight = 0
+        self._slots = threading.Condition()
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._spill_dir: Optional[str] = None
+        self._cleanup = None
+        self._reset()
+
+    def _reset(self):
+        self.start_rss = rss_bytes()
+        self.peak = self.start_rss
+        self.counts = {'pages_spilled': 0, 'bytes_spilled': 0, 'findings_spilled': 0,
+                       'fetch_waits': 0, 'pressure_samples': 0}
+
+    def sample(self) -> int:
+        """Read RSS and update the run's peak"""
+        current = rss_bytes()
+        with self._lock:
+            if current > self.peak:
+                self.peak = current
+        return current
+
+    def under_pressure(self) -> bool:
+        """True when a budget is set and RSS is at or over its pressure threshold"""
+        if not self.budget:
+            return False
+        pressured = self.sample() >= self.threshold
+        if pressured:
+            with self._lock:
+                self.counts['pressure_samples'] += 1
+        return pressured
+
+    @property
+    def spill_dir(self) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='darkwalker-spill-', dir=self.spill_parent)
+            # Removed on close(), or when the governor is collected or the process exits
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def _fetch_limit(self) -> int:
+        if self.under_pressure():
+            return self.pressure_fetches
+        return self.max_fetches or 0
+
+    @contextmanager
+    def fetch_slot(self):
+        """Hold one of the in-flight fetch slots for the duration of a fetch"""
+        with self._slots:
+            waited = False
+            while True:
+                limit = self._fetch_limit()
+                if not limit or self._in_flight < limit:
+                    break
+                waited = True
+                self._slots.wait(timeout=self.sample_seconds)
+            if waited:
+                with self._lock:
+                    self.counts['fetch_waits'] += 1
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._slots:
+                self._in_flight -= 1
+                self._slots.notify()
+
+    def spill_text(self, text: str) -> Union[str, SpilledText]:
+        """Park text in a temp file when under pressure and it is large enough"""
+        if not text or len(text) < self.spill_min_bytes or not self.under_pressure():
+            return text
+        spilled = park_text(text, self.spill_dir)
+        with self._lock:
+            self.counts['pages_spilled'] += 1
+            self.counts['bytes_spilled'] += len(text)
+        return spilled
+
+    def context_length(self, default: int) -> int:
+        """Context kept around each finding"""
+        return min(default, self.pressure_context) if self.under_pressure() else default
+
+    def findings_buffer(self, findings: Iterable[Dict] = ()) -> 'SpillList':
+        """Findings list that moves to disk under pressure"""
+        buffer = SpillList(self)
+        buffer.extend(findings)
+        return buffer
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_seconds):
+            self.sample()
+
+    def start_run(self):
+        """Reset counters and the peak and start background sampling"""
+        self.stop_run()
+        self._reset()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name='memory-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop_run(self):
+        """Stop background sampling"""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.sample()
+
+    def report(self) -> Dict:
+        """Peak RSS and spill counters of the run"""
+        self.sample()
+        with self._lock:
+            counts = dict(self.counts)
+            peak = self.peak
+        report = {
+            'budget_mb': round(self.budget / MB, 1) if self.budget else None,
+            'start_rss_mb': round(self.start_rss / MB, 1),
+            'peak_rss_mb': round(peak / MB, 1),
+            'process_max_rss_mb': round(max_rss_bytes() / MB, 1),
+        }
+        report.update(counts)
+        return report
+
+    def close(self):
+        """Stop sampling and remove spilled files"""
+        self.stop_run()
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self._spill_dir = None
+
+
+def _remove_spill_file(spill_file):
+    spill_file.close()
+    try:
+        os.unlink(spill_file.name)
+    except OSError:
+        pass
+
+
+class SpillList:
+    """Append-only findings list that overflows to a temp NDJSON file
+
+    Findings stay in memory until the governor reports pressure; from then
+    on they are appended to a file. Iteration, len() and indexing cover
+    both parts in insertion order, so callers use it like a list.
+    """
+
+    def __init__(self, governor: MemoryGovernor):
+        self.governor = governor
+        self._memory: List[Dict] = []
+        self._file = None
+        self._finalizer = None
+        self._spilled = 0
+
+    def append(self, finding: Dict):
+        self.extend([finding])
+
+    def extend(self, findings: Iterable[Dict]):
+        findings = list(findings)
+        if not findings:
+            return
+        if self._file is None and not self.governor.under_pressure():
+            self._memory.extend(findings)
+            return
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(
+                'w+', suffix='.ndjson', dir=self.governor.spill_dir, delete=False, encoding='utf-8'
+            )
+            self._finalizer = weakref.finalize(self, _remove_spill_file, self._file)
+            self.governor.logger.warning("Memory budget reached, spilling findings to %s", self._file.name)
+        self._file.seek(0, os.SEEK_END)
+        self._file.writelines(json.dumps(finding) + '\n' for finding in findings)
+        self._spilled += len(findings)
+        with self.governor._lock:
+            self.governor.counts['findings_spilled'] += len(findings)
+
+    @property
+    def spilled(self) -> int:
+        return self._spilled
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._file.name if self._file else None
+
+    def __len__(self) -> int:
+        return len(self._memory) + self._spilled
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        yield from self._memory
+        if self._file is not None:
+            self._file.flush()
+            with open(self._file.name, encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return list(itertools.islice(iter(self), start, stop, step))
+        if index < 0:
+            index += len(self)
+        if 0 <= index < len(self._memory):
+            return self._memory[index]
+        if not 0 <= index < len(self):
+            raise IndexError('findings index out of range')
+        return next(itertools.islice(iter(self), index, None))
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"SpillList({len(self._memory)} in memory, {self._spilled} spilled)"
+
+    def close(self):
+        """Remove the spill file"""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._file = None
+            self._spilled = 0
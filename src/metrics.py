@@ -0,0 +1,329 @@
+"""
+Metrics module
+Counters, gauges and histograms with a Prometheus text endpoint
+"""
+
+import copy
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple, Sequence
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+OTHER_LABEL = 'other'
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = list(key) + (list(extra) if extra else [])
+    if not pairs:
+        return ''
+    escaped = [
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metric:
+    """Base class for labelled metrics"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, description: str = ''):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def render(self) -> List[str]:
+        """Render in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+    def export(self) -> Dict:
+        """Copy of the raw values, for merge() or snapshot(since=...)"""
+        with self._lock:
+            return {'type': self.metric_type, 'description': self.description,
+                    'values': copy.deepcopy(self._values)}
+
+    def merge(self, values: Dict[Tuple, object]):
+        """Add exported values, e.g. those recorded in a worker process"""
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def snapshot(self, since: Optional[Dict[Tuple, object]] = None) -> List[Dict]:
+        """Get current values as plain data, or their change since an export"""
+        with self._lock:
+            items = sorted(self._values.items())
+        if since is None:
+            return [{'labels': dict(key), 'value': value} for key, value in items]
+        return [{'labels': dict(key), 'value': value - since.get(key, 0)}
+                for key, value in items if value != since.get(key, 0)]
+
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def merge(self, values: Dict[Tuple, object]):
+        with self._lock:
+            self._values.update(values)
+
+    def snapshot(self, since: Optional[Dict[Tuple, object]] = None) -> List[Dict]:
+        # A gauge is a level, not a total: its change means nothing on its own
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, description: str = '', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {state['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+    def export(self) -> Dict:
+        exported = super().export()
+        exported['buckets'] = self.buckets
+        return exported
+
+    def merge(self, values: Dict[Tuple, object]):
+        with self._lock:
+            for key, other in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    self._values[key] = copy.deepcopy(other)
+                    continue
+                state['counts'] = [a + b for a, b in zip(state['counts'], other['counts'])]
+                state['sum'] += other['sum']
+                state['count'] += other['count']
+
+    def snapshot(self, since: Optional[Dict[Tuple, object]] = None) -> List[Dict]:
+        with self._lock:
+            items = [(key, copy.deepcopy(state)) for key, state in sorted(self._values.items())]
+        values = []
+        for key, state in items:
+            base = (since or {}).get(key)
+            if base is not None:
+                if state['count'] == base['count']:
+                    continue
+                state['counts'] = [a - b for a, b in zip(state['counts'], base['counts'])]
+                state['sum'] -= base['sum']
+                state['count'] -= base['count']
+            values.append({
+                'labels': dict(key),
+                'count': state['count'],
+                'sum': round(state['sum'], 6),
+                'buckets': {
+                    ('+Inf' if b == float('inf') else repr(b)): c
+                    for b, c in zip(self.buckets + (float('inf'),), state['counts']) if c
+                },
+            })
+        return values
+
+
+class MetricsRegistry:
+    """Registry of named metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, description, **kwargs)
+        return metric
+
+    def counter(self, name: str, description: str = '') -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = '') -> Gauge:
+        """Get or create a gauge"""
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = '',
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self, since: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """Get all metric values as plain data
+
+        With since (an export()), counters and histograms report what was
+        added after it and metrics without changes are left out; this is
+        how a single run reports its own numbers in a long-lived process.
+        """
+        snapshot = {}
+        for name, metric in sorted(self._metrics.items()):
+            if since is None:
+                snapshot[name] = {'type': metric.metric_type, 'values': metric.snapshot()}
+                continue
+            values = metric.snapshot(since.get(name, {}).get('values', {}))
+            if values:
+                snapshot[name] = {'type': metric.metric_type, 'values': values}
+        return snapshot
+
+    def export(self) -> Dict[str, Dict]:
+        """Copy of all raw metric values"""
+        return {name: metric.export() for name, metric in list(self._metrics.items())}
+
+    def drain(self) -> Dict[str, Dict]:
+        """Export all metrics and start over, e.g. after each item in a worker process"""
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+        return {name: metric.export() for name, metric in metrics.items()}
+
+    def merge(self, exported: Dict[str, Dict]):
+        """Add the values of another registry's export()"""
+        kinds = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+        for name, data in exported.items():
+            kwargs = {'buckets': data['buckets']} if data['type'] == 'histogram' else {}
+            metric = self._get_or_create(kinds[data['type']], name, data['description'], **kwargs)
+            metric.merge(data['values'])
+
+    def reset(self):
+        """Remove all metrics"""
+        with self._lock:
+            self._metrics = {}
+
+
+class LabelLimiter:
+    """Keeps the first `limit` values of a label and folds later ones into 'other'
+
+    Label values such as onion hosts are unbounded; every value is a series
+    kept for the life of the process.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        with self._lock:
+            if len(self._seen) < self.limit:
+                self._seen.add(value)
+                return value
+        return OTHER_LABEL
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    return _registry
+
+
+class MetricsServer:
+    """Serves the registry on a local HTTP endpoint in Prometheus format"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464,
+                 registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or get_metrics()
+        registry_ref = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry_ref.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        """Start serving in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
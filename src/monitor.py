@@ -4,17 +4,82 @@ Main monitoring orchestration and scheduling
 """
 
 import os
+import re
 import json
-import asyncio
-from typing import List, Dict, Optional
+import time
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Callable, Tuple, Iterable
 from datetime import datetime
 from pathlib import Path
-from dark_web_crawler import DarkWebCrawler
 from pattern_scanner import PatternScanner, ScanResult
+from pipeline import Pipeline, Stage
+from findings_store import FindingsStore
+from result_sink import ResultSink, create_sink
+from checkpoint import CheckpointManager
+from retry_queue import RetryQueue
+from link_graph import LinkGraph, onion_hosts, host_of
+from alert_outbox import AlertOutbox
+from revisit_scheduler import RevisitScheduler, content_hash
+from page_archive import PageArchive
+from memory_governor import MemoryGovernor, SpillList, load_text, park_text
+from metrics import get_metrics, MetricsServer
 from config import get_config
 from logger import get_logger
 
 
+_worker_scanner: Optional[PatternScanner] = None
+
+
+def _init_scan_worker(pattern_specs: Dict[str, Tuple[str, int]]):
+    """Build the scanner used by a scan worker process"""
+    global _worker_scanner
+    # A forked worker starts with a copy of the parent's metrics; only its own are shipped back
+    get_metrics().reset()
+    _worker_scanner = PatternScanner()
+    _worker_scanner.patterns = {
+        name: re.compile(pattern, flags) for name, (pattern, flags) in pattern_specs.items()
+    }
+
+
+def _parse_source(item: Dict) -> Dict:
+    """Pipeline parse stage: replace fetched HTML with its text and linked hosts
+    
+    HTML the fetch stage spilled to disk is read back here, and its text is
+    spilled again for the scan stage.
+    """
+    from dark_web_crawler import extract_text
+    started = time.monotonic()
+    html = load_text(item.pop('html'))
+    item['linked_hosts'] = onion_hosts(html)
+    text = extract_text(html)
+    del html
+    item['content_hash'] = content_hash(text)
+    item['text'] = park_text(text, item['spill']) if item.get('spill') else text
+    item['parse_seconds'] = time.monotonic() - started
+    return item
+
+
+def _scan_source_in_worker(item: Dict) -> Dict:
+    """Pipeline scan stage run inside a worker process
+    
+    Metrics recorded by the scan travel back with the item, since the
+    worker's registry is not the one the run reports or serves.
+    """
+    item = _scan_source(_worker_scanner, item)
+    item['metrics'] = get_metrics().drain()
+    return item
+
+
+def _scan_source(scanner: PatternScanner, item: Dict) -> Dict:
+    """Pipeline scan stage: scan page text and keep only the findings"""
+    scan_results = scanner.scan_text(load_text(item.pop('text')), item['source'])
+    item['findings'] = [r.to_dict() for r in scan_results]
+    item['scan_budget'] = scanner.last_overrun()
+    return item
+
+
 class DarkWebMonitor:
     """Main dark web monitoring orchestrator"""
     
@@ -22,25 +87,122 @@ class DarkWebMonitor:
         """Initialize monitor"""
         self.config = get_config()
         self.logger = get_logger()
-        self.crawler = DarkWebCrawler(use_tor=self.config.TOR_ENABLED)
-        self.scanner = PatternScanner(patterns=search_patterns)
+        self.metrics = get_metrics()
+        self._crawler = None
+        self._crawler_lock = threading.Lock()
+        self.governor = MemoryGovernor()
+        self.scanner = PatternScanner(patterns=search_patterns, governor=self.governor)
         self.results: List[ScanResult] = []
         self._ensure_results_dir()
+        self.store: Optional[FindingsStore] = (
+            FindingsStore() if self.config.STORE_FINDINGS else None
+        )
+        self.run_id: Optional[int] = None
+        self.link_graph: Optional[LinkGraph] = (
+            LinkGraph() if self.config.LINK_GRAPH_ENABLED else None
+        )
+        self.alerts: Optional[AlertOutbox] = (
+            AlertOutbox() if self.config.ALERTS_ENABLED else None
+        )
+        self.revisits: Optional[RevisitScheduler] = (
+            RevisitScheduler() if self.config.REVISIT_ENABLED else None
+        )
+        self._sink: Optional[ResultSink] = None
+        self._retries: Optional[RetryQueue] = None
+        self.checkpoint: Optional[CheckpointManager] = (
+            CheckpointManager() if self.config.CHECKPOINT_ENABLED else None
+        )
+        self._completed_sources = set()
+        self._run_args = (None, None)
+        self.cycle_tasks: List[Callable[[], None]] = []
+        if self.config.COMPACT_EVERY_CYCLE:
+            self.cycle_tasks.append(self.compact_results)
+    
+    @property
+    def crawler(self):
+        """Crawler, built on first use so offline commands skip requests and bs4"""
+        if self._crawler is None:
+            # Site workers may ask at once; they must all share one crawler
+            with self._crawler_lock:
+                if self._crawler is None:
+                    from dark_web_crawler import DarkWebCrawler
+                    self._crawler = DarkWebCrawler(use_tor=self.config.TOR_ENABLED, governor=self.governor)
+        return self._crawler
+    
+    @crawler.setter
+    def crawler(self, crawler):
+        self._crawler = crawler
     
     def _ensure_results_dir(self):
         """Ensure results directory exists"""
         os.makedirs(self.config.RESULTS_DIR, exist_ok=True)
     
+    def open_sink(self, filename: Optional[str] = None) -> ResultSink:
+        """Open a streaming sink in the results directory"""
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"monitor_{timestamp}"
+        
+        return create_sink(
+            os.path.join(self.config.RESULTS_DIR, filename),
+            fmt=self.config.STREAM_FORMAT,
+            compress=self.config.STREAM_COMPRESS,
+            max_bytes=self.config.STREAM_ROTATE_BYTES,
+            max_seconds=self.config.STREAM_ROTATE_SECONDS
+        )
+    
     def monitor_dark_web(self, search_query: str = None, 
-                        search_engines: List[str] = None) -> Dict:
-        """Monitor dark web for patterns"""
+                        search_engines: List[str] = None,
+                        sink: Optional[ResultSink] = None,
+                        pipeline: Optional[bool] = None,
+                        resume: bool = False,
+                        planner: Optional[bool] = None,
+                        scheduled: bool = False) -> Dict:
+        """Monitor dark web for patterns
+        
+        When a sink is given, findings are streamed to it as they are produced
+        instead of being collected in the returned dictionary. With pipeline
+        enabled (default PIPELINE_ENABLED), sources are processed by the staged
+        fetch/parse/scan/sink pipeline instead of one at a time. With resume,
+        the run continues from the last checkpoint, reusing its query and
+        engines and skipping sources it already completed. With planner
+        enabled (default QUERY_PLANNER_ENABLED), keyword groups are searched
+        on all engines at once and the top-ranked hits are fetched and
+        scanned as well; such sweeps are bounded by QUERY_BUDGET_SECONDS
+        instead of being checkpointed. Findings and page text move to temp
+        files once the run nears MEMORY_BUDGET_MB, and the run's peak RSS is
+        reported under 'memory'. With scheduled (and REVISIT_ENABLED), only
+        sources whose revisit is due are visited; the others are listed under
+        'revisits' with the planned and actual revisit rates. Planner sweeps
+        ignore scheduled and report 'scheduled': False.
+        """
         self.logger.info("Starting dark web monitoring")
+        self._sink = sink
+        run_started = time.monotonic()
+        self.governor.start_run()
+        # The registry lives as long as the process; a run reports only its own part
+        metrics_since = self.metrics.export()
+        
+        state = None
+        if resume:
+            state = self.checkpoint.load() if self.checkpoint else None
+            if state is None:
+                self.logger.warning("No checkpoint to resume from, starting a new run")
+        elif self.checkpoint:
+            self.checkpoint.clear()
+        
+        if state:
+            search_query = state['search_query']
+            search_engines = state['search_engines']
+        
+        self._run_args = (search_query, search_engines)
+        self._completed_sources = set()
         
         monitoring_results = {
             'timestamp': datetime.now().isoformat(),
             'search_query': search_query,
             'search_engines': search_engines or list(self.config.DARK_WEB_SEARCH_ENGINES.keys()),
-            'findings': [],
+            'findings': self.governor.findings_buffer(),
             'statistics': {
                 'urls_crawled': 0,
                 'patterns_found': 0,
@@ -48,83 +210,689 @@ class DarkWebMonitor:
             }
         }
         
-        # Crawl Hidden Wiki
-        if search_query or not search_engines:
-            self.logger.info("Crawling Hidden Wiki")
-            wiki_content = self.crawler.crawl_hidden_wiki()
+        sources = self._plan_sources(search_query, search_engines)
+        
+        if state:
+            self._restore_checkpoint(state, monitoring_results, sources)
+            sources = [s for s in sources if s['source'] not in self._completed_sources]
+            self.logger.info(f"Resuming run: {len(sources)} sources left")
+        else:
+            # Every run visits its sources afresh; the list only dedupes within a run
+            self.crawler.clear_visited()
+            if self.store:
+                self.run_id = self.store.start_run(search_query)
+        
+        if pipeline is None:
+            pipeline = self.config.PIPELINE_ENABLED
+        if planner is None:
+            planner = self.config.QUERY_PLANNER_ENABLED
+        
+        # Planner sweeps choose their pages per sweep, so they are never scheduled
+        scheduled = bool(scheduled and self.revisits and not planner)
+        deferred = []
+        if scheduled:
+            due = set(self.revisits.due([s['source'] for s in sources]))
+            deferred = [s['source'] for s in sources if s['source'] not in due]
+            sources = [s for s in sources if s['source'] in due]
+            self.logger.info(f"{len(sources)} sources due for a visit, {len(deferred)} deferred")
+        
+        if planner:
+            self._monitor_with_planner(monitoring_results, search_query, search_engines)
+        else:
+            retries = RetryQueue(first_attempts=len(sources))
+            if pipeline:
+                self._monitor_with_pipeline(monitoring_results, sources, retries=retries)
+            else:
+                self._monitor_sequential(monitoring_results, sources, retries)
+            monitoring_results['retries'] = retries.stats()
+        
+        monitoring_results['statistics']['urls_crawled'] = len(self.crawler.get_visited_urls())
+        self._update_link_graph(monitoring_results)
+        self._alert_stats(monitoring_results)
+        self._revisit_stats(monitoring_results, scheduled, deferred)
+        self.governor.stop_run()
+        monitoring_results['memory'] = self.governor.report()
+        
+        self.metrics.histogram(
+            'darkwalker_run_seconds', 'Monitoring run duration',
+            buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+        ).observe(time.monotonic() - run_started)
+        monitoring_results['metrics'] = self.metrics.snapshot(since=metrics_since)
+        
+        if sink:
+            sink.write_trailer(monitoring_results['statistics'], metrics=monitoring_results['metrics'])
+            monitoring_results['output_files'] = (
+                monitoring_results.get('output_files', []) + sink.get_paths()
+            )
+            self._sink = None
+        
+        if self.checkpoint:
+            self.checkpoint.clear()
+        
+        self.logger.info(
+            f"Monitoring complete. Found {monitoring_results['statistics']['patterns_found']} patterns"
+        )
+        
+        return monitoring_results
+    
+    def _restore_checkpoint(self, state: Dict, monitoring_results: Dict, sources: List[Dict]):
+        """Restore run progress from a checkpoint"""
+        self._completed_sources = set(state.get('completed_sources', []))
+        self.run_id = state.get('run_id')
+        monitoring_results['timestamp'] = state.get('timestamp', monitoring_results['timestamp'])
+        monitoring_results['statistics'].update(state.get('statistics', {}))
+        monitoring_results['findings'].extend(self.checkpoint.load_findings())
+        if state.get('output_files'):
+            monitoring_results['output_files'] = list(state['output_files'])
+        
+        # URLs of unfinished sources must be fetched again
+        pending_urls = {
+            s.get('url') for s in sources if s['source'] not in self._completed_sources
+        }
+        self.crawler.visited_urls = [
+            url for url in state.get('visited_urls', []) if url not in pending_urls
+        ]
+    
+    def _complete_source(self, monitoring_results: Dict, item: Dict):
+        """Mark a source as done and checkpoint progress"""
+        self._completed_sources.add(item['source'])
+        self.metrics.counter(
+            'darkwalker_sources_completed_total', 'Sources fetched and scanned'
+        ).inc(kind=item['kind'])
+        
+        if not self.checkpoint:
+            return
+        
+        output_files = list(monitoring_results.get('output_files', []))
+        if self._sink:
+            output_files += self._sink.get_paths()
+        
+        self.checkpoint.save({
+            'timestamp': monitoring_results['timestamp'],
+            'search_query': self._run_args[0],
+            'search_engines': self._run_args[1],
+            'run_id': self.run_id,
+            'completed_sources': sorted(self._completed_sources),
+            'visited_urls': self.crawler.get_visited_urls(),
+            'statistics': monitoring_results['statistics'],
+            'output_files': output_files,
+        })
+    
+    def _monitor_sequential(self, monitoring_results: Dict, sources: List[Dict],
+                            retries: RetryQueue):
+        """Fetch, parse and scan each source in turn, then any retries still waiting"""
+        pending = deque(sources)
+        while pending or len(retries):
+            if not pending:
+                time.sleep(retries.seconds_until_due() or 0)
+            pending.extend(retries.pop_due())
+            if pending:
+                self._process_source(monitoring_results, pending.popleft(), retries)
+    
+    def _process_source(self, monitoring_results: Dict, item: Dict, retries: RetryQueue):
+        """Fetch, parse and scan one source, queueing a retry if the fetch fails"""
+        try:
+            if item['kind'] == 'search':
+                self.logger.info("Searching %s", item['engine'])
+                search_results = self.crawler.search_dark_web(item['query'], item['engine'], sections=False)
+                if search_results.get('status') != 'success':
+                    retries.schedule(item, self.crawler.last_error())
+                    return
+                content = search_results.get('results', {}).get('text', '')
+                url = item.get('url')
+                links = list(dict.fromkeys(filter(None, map(
+                    host_of, search_results.get('results', {}).get('links', [])
+                ))))
+            else:
+                self.logger.info("Crawling Hidden Wiki: %s", item['source'])
+                html_content = self.crawler.fetch_url(item['url'])
+                if not html_content:
+                    retries.schedule(item, self.crawler.last_error())
+                    return
+                url = item['url']
+                links = onion_hosts(html_content)
+                content = self.crawler.parse_html(html_content, sections=False).get('text', '')
+                del html_content
+            
+            scan_results = []
+            if content:
+                scan_results = self.scanner.scan_text(content, item['source'])
+                self._record_overrun(monitoring_results, item['source'], self.scanner.last_overrun())
+            findings = [r.to_dict() for r in scan_results]
+            self._emit_findings(monitoring_results, findings)
+            self._record_visit(item['source'], content_hash(content), findings)
+            self._record_links(url, links, len(scan_results))
             
-            for wiki_name, content in wiki_content.items():
-                if content:
-                    scan_results = self.scanner.scan_text(content, f"hidden_wiki:{wiki_name}")
-                    if scan_results:
-                        monitoring_results['findings'].extend(
-                            [r.to_dict() for r in scan_results]
-                        )
-                        monitoring_results['statistics']['patterns_found'] += len(scan_results)
-        
-        # Search dark web search engines
+            self._complete_source(monitoring_results, item)
+        except Exception as e:
+            self.logger.error("Error processing %s: %s", item['source'], e)
+            monitoring_results['statistics']['errors'] += 1
+    
+    def _plan_sources(self, search_query: Optional[str],
+                      search_engines: Optional[List[str]]) -> List[Dict]:
+        """List the sources visited by one monitoring run"""
+        sources = []
+        
+        if search_query or not search_engines:
+            for wiki_name, wiki_url in self.config.HIDDEN_WIKI_URLS.items():
+                sources.append({
+                    'source': f"hidden_wiki:{wiki_name}",
+                    'kind': 'wiki',
+                    'url': wiki_url,
+                })
+        
         engines_to_search = search_engines or list(self.config.DARK_WEB_SEARCH_ENGINES.keys())
         query = search_query or ' '.join(self.config.MONITORED_PATTERNS)
         
         for engine in engines_to_search:
+            sources.append({
+                'source': f"search:{engine}:{query}",
+                'kind': 'search',
+                'engine': engine,
+                'query': query,
+                'url': self.config.DARK_WEB_SEARCH_ENGINES.get(engine),
+            })
+        
+        return sources
+    
+    def _fetch_source(self, item: Dict) -> Optional[Dict]:
+        """Pipeline fetch stage
+        
+        A failed fetch that is queued for a retry is dropped without counting
+        as a stage error; the retry is fed back into the pipeline later.
+        """
+        try:
+            if item['kind'] == 'search':
+                html_content = self.crawler.fetch_search_page(item['query'], item['engine'])
+            else:
+                html_content = self.crawler.fetch_url(item['url'])
+        except Exception:
+            if self._retries is not None and self._retries.schedule(item, self.crawler.last_error()):
+                return None
+            raise
+        
+        if not html_content:
+            if self._retries is not None:
+                self._retries.schedule(item, self.crawler.last_error())
+            return None
+        return self._hold_html(item, html_content)
+    
+    def _hold_html(self, item: Dict, html: str) -> Dict:
+        """Attach fetched HTML to a pipeline item, spilled to disk under memory pressure"""
+        item['html'] = self.governor.spill_text(html)
+        if not isinstance(item['html'], str):
+            item['spill'] = self.governor.spill_dir
+        return item
+    
+    def build_pipeline(self, monitoring_results: Dict,
+                       executors: List[ProcessPoolExecutor],
+                       fetch: Optional[Callable[[Dict], Optional[Dict]]] = None) -> Pipeline:
+        """Build the fetch -> parse -> scan -> sink pipeline for a run
+        
+        fetch replaces the network fetch stage, e.g. to read archived pages.
+        """
+        parse_executor = None
+        scan_executor = None
+        
+        if self.config.PIPELINE_USE_PROCESSES:
+            pattern_specs = {
+                name: (regex.pattern, regex.flags) for name, regex in self.scanner.patterns.items()
+            }
+            parse_executor = ProcessPoolExecutor(max_workers=self.config.PIPELINE_PARSE_WORKERS)
+            scan_executor = ProcessPoolExecutor(
+                max_workers=self.config.PIPELINE_SCAN_WORKERS,
+                initializer=_init_scan_worker,
+                initargs=(pattern_specs,)
+            )
+            executors.extend([parse_executor, scan_executor])
+            scan_func = _scan_source_in_worker
+        else:
+            scan_func = lambda item: _scan_source(self.scanner, item)
+        
+        queue_size = self.config.PIPELINE_QUEUE_SIZE
+        
+        return Pipeline([
+            Stage('fetch', fetch or self._fetch_source,
+                  workers=self.config.PIPELINE_FETCH_WORKERS, queue_size=queue_size),
+            Stage('parse', _parse_source, workers=self.config.PIPELINE_PARSE_WORKERS,
+                  queue_size=queue_size, executor=parse_executor),
+            Stage('scan', scan_func, workers=self.config.PIPELINE_SCAN_WORKERS,
+                  queue_size=queue_size, executor=scan_executor),
+            Stage('sink', lambda item: self._sink_source(monitoring_results, item),
+                  workers=1, queue_size=queue_size),
+        ])
+    
+    def _sink_source(self, monitoring_results: Dict, item: Dict):
+        """Pipeline sink stage"""
+        # Parse timings are measured in the (possibly separate) worker process
+        self.metrics.histogram(
+            'darkwalker_parse_seconds', 'HTML parse time'
+        ).observe(item.get('parse_seconds', 0.0))
+        if item.get('metrics'):
+            self.metrics.merge(item.pop('metrics'))
+        self._emit_findings(monitoring_results, item['findings'])
+        self._record_overrun(monitoring_results, item['source'], item.get('scan_budget'))
+        if item['kind'] != 'replay':
+            self._record_links(item.get('url'), item.get('linked_hosts', []), len(item['findings']))
+            self._record_visit(item['source'], item.get('content_hash'), item['findings'])
+        self._complete_source(monitoring_results, item)
+    
+    def _monitor_with_pipeline(self, monitoring_results: Dict, sources: List[Dict],
+                               fetch: Optional[Callable[[Dict], Optional[Dict]]] = None,
+                               retries: Optional[RetryQueue] = None):
+        """Process all sources through the staged pipeline
+        
+        Retries that fall due are submitted between first attempts; once
+        those are all in, the pipeline stays open until it is idle and no
+        retry is waiting.
+        """
+        executors: List[ProcessPoolExecutor] = []
+        
+        self._retries = retries
+        try:
+            pipeline = self.build_pipeline(monitoring_results, executors, fetch=fetch)
+            with pipeline:
+                for item in sources:
+                    pipeline.submit(item)
+                    for retry in retries.pop_due() if retries is not None else ():
+                        pipeline.submit(retry)
+                # Idle is checked first: an item still in flight may queue a retry
+                while retries is not None and not (pipeline.pending() == 0 and len(retries) == 0):
+                    for retry in retries.pop_due():
+                        pipeline.submit(retry)
+                    time.sleep(min(0.05, retries.seconds_until_due() or 0.05))
+        finally:
+            self._retries = None
+            for executor in executors:
+                executor.shutdown()
+        
+        stage_stats = pipeline.stats()
+        monitoring_results['pipeline'] = stage_stats
+        monitoring_results['statistics']['errors'] += sum(
+            stats['errors'] for stats in stage_stats.values()
+        )
+    
+    def _monitor_with_planner(self, monitoring_results: Dict, search_query: Optional[str],
+                              search_engines: Optional[List[str]]):
+        """Fan keyword searches out to all engines and follow the top-ranked hits"""
+        from query_planner import QueryPlanner
+        
+        engines = {
+            name: self.config.DARK_WEB_SEARCH_ENGINES[name]
+            for name in search_engines or self.config.DARK_WEB_SEARCH_ENGINES
+        }
+        keywords = [search_query] if search_query else self.config.MONITORED_PATTERNS
+        seeds = {}
+        if search_query or not search_engines:
+            seeds = {f"hidden_wiki:{name}": url for name, url in self.config.HIDDEN_WIKI_URLS.items()}
+        
+        planner = QueryPlanner(
+            search=lambda query, engine, max_seconds: self.crawler.fetch_search_page(
+                query, engine, max_seconds=max_seconds, retry=True
+            ),
+            fetch=lambda url, max_seconds: self.crawler.fetch_url(
+                url, max_seconds=max_seconds, retry=True
+            ),
+            engines=engines
+        )
+        
+        def scan_page(item: Dict) -> Dict:
+            item = _parse_source(item)
+            return _scan_source(self.scanner, item)
+        
+        def record_page(item: Dict):
+            self._emit_findings(monitoring_results, item['findings'])
+            self._record_overrun(monitoring_results, item['source'], item.get('scan_budget'))
+            self._record_links(item['url'], item.get('linked_hosts', []), len(item['findings']))
+            self.metrics.counter(
+                'darkwalker_sources_completed_total', 'Sources fetched and scanned'
+            ).inc(kind=item['kind'])
+        
+        checkpoint, self.checkpoint = self.checkpoint, None
+        try:
+            stats = planner.run(keywords, record_page, seeds=seeds, prepare=scan_page)
+        finally:
+            self.checkpoint = checkpoint
+        
+        monitoring_results['planner'] = stats
+        monitoring_results['statistics']['errors'] += stats['search_failures'] + stats['page_failures']
+    
+    def _record_overrun(self, monitoring_results: Dict, source: str, overrun: Optional[Dict]):
+        """Note a page whose scan ran over the scan budget and was partial"""
+        if not overrun:
+            return
+        budget = monitoring_results.setdefault('scan_budget', {'partial_pages': 0, 'sources': {}})
+        budget['partial_pages'] += 1
+        budget['sources'][source] = overrun
+    
+    def _emit_findings(self, monitoring_results: Dict, findings: List[Dict]):
+        """Write finding dictionaries to the sink or results, and the store"""
+        if not findings:
+            return
+        
+        monitoring_results['statistics']['patterns_found'] += len(findings)
+        
+        if self._sink:
+            self._sink.write_many(findings)
+        else:
+            monitoring_results['findings'].extend(findings)
+            if self.checkpoint:
+                self.checkpoint.journal_findings(findings)
+        
+        if self.store:
             try:
-                self.logger.info(f"Searching {engine}")
-                search_results = self.crawler.search_dark_web(query, engine)
-                
-                if search_results.get('status') == 'success':
-                    content = search_results.get('results', {}).get('text', '')
-                    if content:
-                        scan_results = self.scanner.scan_text(
-                            content, 
-                            f"search:{engine}:{query}"
-                        )
-                        if scan_results:
-                            monitoring_results['findings'].extend(
-                                [r.to_dict() for r in scan_results]
-                            )
-                            monitoring_results['statistics']['patterns_found'] += len(scan_results)
+                self.store.add_findings(findings, run_id=self.run_id)
             except Exception as e:
-                self.logger.error(f"Error searching {engine}: {str(e)}")
-                monitoring_results['statistics']['errors'] += 1
+                self.logger.error("Error storing findings: %s", e)
         
-        monitoring_results['statistics']['urls_crawled'] = len(self.crawler.get_visited_urls())
+        self._queue_alerts(findings)
+    
+    def _queue_alerts(self, findings: List[Dict]):
+        """Put alerts for matching findings in the outbox; dispatch happens in the background"""
+        if self.alerts and findings:
+            try:
+                self.alerts.submit(findings)
+            except Exception as e:
+                self.logger.error("Error queueing alerts: %s", e)
+    
+    def _alert_stats(self, results: Dict):
+        """Report the alert outbox state of a run"""
+        if self.alerts:
+            try:
+                results['alerts'] = self.alerts.stats()
+            except Exception as e:
+                self.logger.error("Error reading alert outbox: %s", e)
+    
+    def _record_links(self, url: Optional[str], links: List[str], findings: int):
+        """Add a fetched page's linked hosts to the link graph"""
+        if self.link_graph and url:
+            try:
+                self.link_graph.add_page(url, links, findings=findings)
+            except Exception as e:
+                self.logger.error("Error updating link graph: %s", e)
+    
+    def _record_visit(self, source: str, page_hash: Optional[str], findings: List[Dict]):
+        """Add a visit to the source's change history for revisit scheduling"""
+        if self.revisits and page_hash:
+            try:
+                self.revisits.record_visit(source, page_hash, findings)
+            except Exception as e:
+                self.logger.error("Error recording revisit: %s", e)
+    
+    def _revisit_stats(self, results: Dict, scheduled: bool, deferred: List[str]):
+        """Report planned and actual revisit rates, whether the run was scheduled and what it deferred"""
+        if self.revisits:
+            try:
+                results['revisits'] = dict(self.revisits.report(), scheduled=scheduled, deferred=deferred)
+            except Exception as e:
+                self.logger.error("Error reading revisit schedule: %s", e)
+    
+    def _update_link_graph(self, results: Dict):
+        """Write the sweep's links, refresh ranks and report graph counters"""
+        if not self.link_graph:
+            return
+        try:
+            self.link_graph.update_ranks()
+            results['link_graph'] = self.link_graph.stats()
+        except Exception as e:
+            self.logger.error("Error updating link graph: %s", e)
+    
+    def replay_archive(self, archive: Optional[PageArchive] = None,
+                       url: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None, latest_only: bool = False,
+                       sink: Optional[ResultSink] = None) -> Dict:
+        """Rescan archived pages with the current patterns, without network access
+        
+        Matching archive records (default: the crawler's archive or
+        PAGE_ARCHIVE_DIR) replace the fetch stage of the pipeline, so pages are
+        parsed and scanned in parallel exactly as in a live run. Replays are not
+        checkpointed; they can simply be run again.
+        """
+        owns_archive = archive is None and (self._crawler is None or self._crawler.archive is None)
+        if archive is None:
+            archive = (self._crawler and self._crawler.archive) or PageArchive(self.config.PAGE_ARCHIVE_DIR)
+        
+        self.governor.start_run()
+        metrics_since = self.metrics.export()
+        entries = archive.entries(url=url, since=since, until=until, latest_only=latest_only)
+        self.logger.info(f"Replaying {len(entries)} archived pages from {archive.directory}")
+        
+        replay_results = {
+            'timestamp': datetime.now().isoformat(),
+            'search_query': None,
+            'replay': {
+                'archive': archive.directory,
+                'url': url,
+                'since': since,
+                'until': until,
+                'pages': len(entries),
+            },
+            'findings': self.governor.findings_buffer(),
+            'statistics': {
+                'urls_crawled': 0,
+                'patterns_found': 0,
+                'errors': 0
+            }
+        }
+        
+        sources = [{'source': entry['url'], 'kind': 'replay', 'entry': entry} for entry in entries]
+        
+        def load_archived(item: Dict) -> Dict:
+            return self._hold_html(item, archive.read(item.pop('entry')).body)
+        
+        if self.store:
+            self.run_id = self.store.start_run(url, kind='replay')
+        
+        checkpoint, self.checkpoint = self.checkpoint, None
+        self._sink = sink
+        self._completed_sources = set()
+        try:
+            self._monitor_with_pipeline(replay_results, sources, fetch=load_archived)
+        finally:
+            self.checkpoint = checkpoint
+            self._sink = None
+            if owns_archive:
+                archive.close()
+        
+        replay_results['statistics']['urls_crawled'] = len(self._completed_sources)
+        self.governor.stop_run()
+        replay_results['memory'] = self.governor.report()
+        replay_results['metrics'] = self.metrics.snapshot(since=metrics_since)
+        
+        if sink:
+            sink.write_trailer(replay_results['statistics'], metrics=replay_results['metrics'])
+            replay_results['output_files'] = sink.get_paths()
         
         self.logger.info(
-            f"Monitoring complete. Found {monitoring_results['statistics']['patterns_found']} patterns"
+            f"Replay complete. Found {replay_results['statistics']['patterns_found']} patterns"
         )
-        
-        return monitoring_results
+        return replay_results
     
-    def monitor_specific_site(self, url: str) -> Dict:
-        """Monitor a specific onion site"""
-        self.logger.info(f"Monitoring specific site: {url}")
+    def _check_site(self, url: str, max_seconds: Optional[float] = None,
+                    retry: bool = False) -> Dict:
+        """Fetch and scan one site, without storing the findings
         
+        With retry, a failed fetch is retried in-line before the site is
+        reported as failed; batches leave it off and use their RetryQueue.
+        """
         results = {
             'url': url,
             'timestamp': datetime.now().isoformat(),
             'findings': [],
             'status': 'unknown'
         }
+        started = time.monotonic()
         
         try:
-            content = self.crawler.fetch_url(url)
+            content = self.crawler.fetch_url(url, max_seconds=max_seconds, retry=retry)
             
             if content:
                 scan_results = self.scanner.scan_text(content, url)
                 results['findings'] = [r.to_dict() for r in scan_results]
+                if self.scanner.last_overrun():
+                    results['scan_budget'] = self.scanner.last_overrun()
+                results['linked_hosts'] = onion_hosts(content)
                 results['status'] = 'success'
-                self.logger.info(f"Found {len(scan_results)} patterns on {url}")
+                self.logger.info("Found %d patterns on %s", len(scan_results), url)
+            elif self.crawler.last_error() == 'timeout':
+                results['status'] = 'timeout'
+                self.logger.warning("Timed out fetching %s", url)
+            elif self.crawler.last_error() == 'circuit':
+                results['status'] = 'skipped'
+                self.logger.debug("Skipped %s: host is failing", url)
             else:
                 results['status'] = 'failed'
-                self.logger.warning(f"Failed to fetch content from {url}")
+                results['error_class'] = self.crawler.last_error()
+                self.logger.warning("Failed to fetch content from %s", url)
         
         except Exception as e:
-            self.logger.error(f"Error monitoring {url}: {str(e)}")
+            self.logger.error("Error monitoring %s: %s", url, e)
             results['status'] = 'error'
             results['error'] = str(e)
         
+        results['seconds'] = round(time.monotonic() - started, 3)
         return results
     
+    def monitor_specific_site(self, url: str, max_seconds: Optional[float] = None) -> Dict:
+        """Monitor a specific onion site"""
+        self.logger.info(f"Monitoring specific site: {url}")
+        
+        results = self._check_site(url, max_seconds=max_seconds, retry=True)
+        if results['status'] == 'success':
+            self._record_links(url, results.pop('linked_hosts', []), len(results['findings']))
+            if self.link_graph:
+                self.link_graph.flush()
+        if self.store and results['findings']:
+            try:
+                run_id = self.store.start_run(url, kind='site')
+                self.store.add_findings(results['findings'], run_id=run_id)
+            except Exception as e:
+                self.logger.error("Error storing findings: %s", e)
+        self._queue_alerts(results['findings'])
+        
+        return results
+    
+    def monitor_sites(self, urls: Iterable[str], sink: Optional[ResultSink] = None,
+                      workers: Optional[int] = None, max_seconds: Optional[float] = None,
+                      progress: Optional[Callable[[int, int, Dict], None]] = None) -> Dict:
+        """Monitor a list of onion sites concurrently
+        
+        Up to `workers` sites (default SITE_WORKERS) are fetched at once, each
+        bounded by max_seconds (default SITE_TIMEOUT) for the whole request, so
+        a slow host only ties up its own slot. Findings are written to the sink
+        and findings store as each site finishes; progress, when given, is
+        called with (done, total, site_result) after every site. Failed and
+        timed-out sites are retried after a delay under the RETRY_POLICIES and
+        the batch's retry budget, and only reported once they are final.
+        """
+        workers = workers or self.config.SITE_WORKERS
+        max_seconds = max_seconds if max_seconds is not None else self.config.SITE_TIMEOUT
+        urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+        if self.link_graph:
+            urls = self.link_graph.order(urls)
+        
+        self.logger.info("Monitoring %d sites with %d workers", len(urls), workers)
+        # Sites from an earlier batch are fetched again; urls is already deduplicated
+        self.crawler.clear_visited()
+        self.governor.start_run()
+        metrics_since = self.metrics.export()
+        batch_results = {
+            'timestamp': datetime.now().isoformat(),
+            'search_query': None,
+            'sites': [],
+            'findings': self.governor.findings_buffer(),
+            'statistics': {
+                'urls_crawled': 0,
+                'patterns_found': 0,
+                'errors': 0,
+                'timeouts': 0,
+                'skipped': 0,
+            }
+        }
+        
+        if self.store:
+            self.run_id = self.store.start_run(None, kind='sites')
+        
+        # Batches are not checkpointed; sites already written can be filtered out
+        checkpoint, self.checkpoint = self.checkpoint, None
+        self._sink = sink
+        retries = RetryQueue(first_attempts=len(urls))
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='site') as executor:
+                pending = deque({'url': url} for url in urls)
+                running = {}
+                done = 0
+                while pending or running or len(retries):
+                    pending.extend(retries.pop_due())
+                    # Only `workers` sites are submitted at a time, so due retries
+                    # take the next free slot instead of queueing behind the batch
+                    while pending and len(running) < workers:
+                        item = pending.popleft()
+                        running[executor.submit(self._check_site, item['url'], max_seconds)] = item
+                    if not running:
+                        time.sleep(retries.seconds_until_due() or 0)
+                        continue
+                    finished, _ = wait(running, timeout=retries.seconds_until_due(),
+                                       return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        item = running.pop(future)
+                        site = future.result()
+                        error_class = 'timeout' if site['status'] == 'timeout' else site.get('error_class')
+                        if site['status'] in ('timeout', 'failed') and retries.schedule(item, error_class):
+                            continue
+                        site['attempts'] = item.get('attempt', 1)
+                        done += 1
+                        self._record_site(batch_results, site)
+                        if progress:
+                            progress(done, len(urls), site)
+        finally:
+            self.checkpoint = checkpoint
+            self._sink = None
+        
+        batch_results['seconds'] = round(time.monotonic() - started, 3)
+        batch_results['retries'] = retries.stats()
+        self._update_link_graph(batch_results)
+        self._alert_stats(batch_results)
+        self.governor.stop_run()
+        batch_results['memory'] = self.governor.report()
+        batch_results['metrics'] = self.metrics.snapshot(since=metrics_since)
+        
+        if sink:
+            sink.write_trailer(batch_results['statistics'], metrics=batch_results['metrics'])
+            batch_results['output_files'] = sink.get_paths()
+        
+        self.logger.info(
+            "Site batch complete: %d/%d fetched, %d patterns",
+            batch_results['statistics']['urls_crawled'], len(urls),
+            batch_results['statistics']['patterns_found']
+        )
+        return batch_results
+    
+    def _record_site(self, batch_results: Dict, site: Dict):
+        """Add one finished site to a batch run"""
+        statistics = batch_results['statistics']
+        if site['status'] == 'success':
+            statistics['urls_crawled'] += 1
+        elif site['status'] == 'timeout':
+            statistics['timeouts'] += 1
+        elif site['status'] == 'skipped':
+            statistics['skipped'] += 1
+        else:
+            statistics['errors'] += 1
+        
+        findings = site.pop('findings')
+        self._emit_findings(batch_results, findings)
+        self._record_overrun(batch_results, site['url'], site.get('scan_budget'))
+        if site['status'] == 'success':
+            self._record_links(site['url'], site.pop('linked_hosts', []), len(findings))
+        site['finding_count'] = len(findings)
+        batch_results['sites'].append(site)
+        
+        self.metrics.counter(
+            'darkwalker_sites_total', 'Batch-monitored sites by outcome'
+        ).inc(status=site['status'])
+    
     def save_results(self, results: Dict, filename: Optional[str] = None) -> str:
         """Save monitoring results to file"""
         if filename is None:
@@ -137,7 +905,7 @@ class DarkWebMonitor:
             if self.config.EXPORT_FORMAT == 'json':
                 file_path += '.json'
                 with open(file_path, 'w') as f:
-                    json.dump(results, f, indent=2)
+                    self._write_json(results, f)
             
             elif self.config.EXPORT_FORMAT == 'csv':
                 file_path += '.csv'
@@ -154,6 +922,20 @@ class DarkWebMonitor:
             self.logger.error(f"Error saving results: {str(e)}")
             raise
     
+    def _write_json(self, results: Dict, f):
+        """Write results as indented JSON, streaming spilled findings from disk"""
+        findings = results.get('findings')
+        if not isinstance(findings, SpillList):
+            json.dump(results, f, indent=2)
+            return
+        
+        head = json.dumps({k: v for k, v in results.items() if k != 'findings'}, indent=2)
+        f.write(head[:-2] + ',\n  "findings": [')
+        for i, finding in enumerate(findings):
+            f.write(',' if i else '')
+            f.write('\n    ' + json.dumps(finding, indent=2).replace('\n', '\n    '))
+        f.write('\n  ]\n}' if findings else ']\n}')
+    
     def _save_as_csv(self, results: Dict, file_path: str):
         """Save results as CSV"""
         import csv
@@ -193,6 +975,103 @@ class DarkWebMonitor:
                 f.write(f"   Context: {finding.get('context')[:100]}...\n")
                 f.write(f"   Timestamp: {finding.get('timestamp')}\n\n")
     
+    def run_daemon(self, search_query: str = None, search_engines: List[str] = None,
+                   interval: Optional[int] = None, stream: bool = False,
+                   max_cycles: Optional[int] = None):
+        """Run monitoring cycles every MONITORING_INTERVAL seconds
+        
+        With REVISIT_ENABLED, each cycle visits only the sources that are due
+        and the daemon sleeps until the next one is, but at least
+        REVISIT_MIN_INTERVAL between cycle starts.
+        """
+        interval = interval if interval is not None else self.config.MONITORING_INTERVAL
+        
+        self.logger.info(f"Starting monitoring daemon (interval {interval}s)")
+        
+        metrics_server = None
+        if self.config.METRICS_PORT:
+            try:
+                metrics_server = MetricsServer(
+                    self.config.METRICS_HOST, self.config.METRICS_PORT, self.metrics
+                ).start()
+                self.logger.info(
+                    f"Metrics available at http://{self.config.METRICS_HOST}:{metrics_server.port}/metrics"
+                )
+            except OSError as e:
+                self.logger.error(f"Could not start metrics endpoint: {str(e)}")
+        
+        try:
+            self._daemon_loop(search_query, search_engines, interval, stream, max_cycles)
+        finally:
+            if metrics_server:
+                metrics_server.stop()
+    
+    def _daemon_loop(self, search_query: Optional[str], search_engines: Optional[List[str]],
+                     interval: int, stream: bool, max_cycles: Optional[int]):
+        """Run monitoring cycles until max_cycles is reached"""
+        cycle = 0
+        
+        while max_cycles is None or cycle < max_cycles:
+            cycle += 1
+            started = time.monotonic()
+            
+            try:
+                scheduled = self.revisits is not None
+                if stream:
+                    with self.open_sink() as sink:
+                        self.monitor_dark_web(search_query, search_engines, sink=sink, scheduled=scheduled)
+                else:
+                    results = self.monitor_dark_web(search_query, search_engines, scheduled=scheduled)
+                    self.save_results(results)
+            except Exception as e:
+                self.logger.error(f"Monitoring cycle {cycle} failed: {str(e)}")
+            
+            for task in self.cycle_tasks:
+                try:
+                    task()
+                except Exception as e:
+                    self.logger.error(f"Cycle task {getattr(task, '__name__', task)} failed: {str(e)}")
+            
+            if max_cycles is not None and cycle >= max_cycles:
+                break
+            
+            elapsed = time.monotonic() - started
+            time.sleep(max(0, self._next_cycle_wait(search_query, search_engines, interval, elapsed)))
+    
+    def _next_cycle_wait(self, search_query: Optional[str], search_engines: Optional[List[str]],
+                         interval: int, elapsed: float) -> float:
+        """Seconds to sleep after a cycle that took elapsed seconds"""
+        if not self.revisits:
+            return interval - elapsed
+        sources = [s['source'] for s in self._plan_sources(search_query, search_engines)]
+        # Sources whose fetch failed stay due; the floor keeps them from spinning the loop
+        return max(self.revisits.seconds_until_due(sources), self.config.REVISIT_MIN_INTERVAL - elapsed)
+    
+    def compact_results(self, include_today: bool = False) -> Dict:
+        """Compact per-run result files into archives and apply retention"""
+        from compaction import ResultsCompactor
+        return ResultsCompactor(self.config.RESULTS_DIR).compact(include_today=include_today)
+    
+    def query_findings(self, **filters) -> List[Dict]:
+        """Query stored findings (pattern, value, source, since, until, limit)"""
+        if not self.store:
+            raise RuntimeError("Findings store is disabled (STORE_FINDINGS=False)")
+        return self.store.query(**filters)
+    
+    def export_findings(self, filename: Optional[str] = None, **filters) -> str:
+        """Export stored findings using the configured export format"""
+        findings = self.query_findings(**filters)
+        results = {
+            'timestamp': datetime.now().isoformat(),
+            'search_query': None,
+            'filters': {k: v for k, v in filters.items() if v is not None},
+            'findings': findings,
+            'statistics': {'patterns_found': len(findings)},
+        }
+        if filename is None:
+            filename = f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return self.save_results(results, filename)
+    
     def get_results(self) -> List[Dict]:
         """Get current scan results"""
         return [r.to_dict() for r in self.results]
@@ -0,0 +1,301 @@
+"""
+Page Archive module
+Append-only WARC-style archive of raw responses with a URL/time index
+"""
+
+import os
+import gzip
+import uuid
+import sqlite3
+import hashlib
+import threading
+from http import HTTPStatus
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Iterator
+from urllib.parse import urlparse
+from config import get_config
+from logger import get_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_records_url_time ON records(url, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_records_host_time ON records(host, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_records_time ON records(fetched_at);
+"""
+
+SEGMENT_PREFIX = 'pages-'
+SEGMENT_SUFFIX = '.warc.gz'
+
+
+@dataclass
+class ArchivedPage:
+    """One recorded response"""
+    url: str
+    fetched_at: str
+    status: int
+    body: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    record_id: Optional[int] = None
+
+
+def _http_reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+
+def encode_record(page: ArchivedPage) -> bytes:
+    """Serialise a page as a WARC/1.0 response record"""
+    body = page.body.encode('utf-8')
+    http_lines = [f"HTTP/1.1 {page.status} {_http_reason(page.status)}".rstrip()]
+    for name, value in page.headers.items():
+        # Content-Length/Encoding describe the wire format, not the stored body
+        if name.lower() in ('content-length', 'content-encoding', 'transfer-encoding'):
+            continue
+        http_lines.append(f"{name}: {value}")
+    http_lines.append(f"Content-Length: {len(body)}")
+    payload = ('\r\n'.join(http_lines) + '\r\n\r\n').encode('utf-8') + body
+
+    warc_headers = [
+        'WARC/1.0',
+        'WARC-Type: response',
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {page.fetched_at}",
+        f"WARC-Target-URI: {page.url}",
+        'Content-Type: application/http; msgtype=response',
+        f"Content-Length: {len(payload)}",
+    ]
+    return ('\r\n'.join(warc_headers) + '\r\n\r\n').encode('utf-8') + payload + b'\r\n\r\n'
+
+
+def _split_headers(block: bytes) -> Dict[str, str]:
+    headers = {}
+    for line in block.decode('utf-8', errors='replace').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip()] = value.strip()
+    return headers
+
+
+def decode_record(data: bytes) -> ArchivedPage:
+    """Parse a WARC/1.0 response record written by encode_record"""
+    warc_block, _, rest = data.partition(b'\r\n\r\n')
+    warc = _split_headers(warc_block)
+    payload = rest[:int(warc['Content-Length'])]
+
+    http_block, _, body = payload.partition(b'\r\n\r\n')
+    status_line = http_block.split(b'\r\n', 1)[0].decode('ascii', errors='replace')
+    headers = _split_headers(http_block)
+    headers.pop('Content-Length', None)
+
+    return ArchivedPage(
+        url=warc['WARC-Target-URI'],
+        fetched_at=warc['WARC-Date'],
+        status=int(status_line.split()[1]),
+        body=body.decode('utf-8', errors='replace'),
+        headers=headers,
+    )
+
+
+class PageArchive:
+    """Compressed, append-only response archive
+
+    Records are appended to pages-NNNN.warc.gz segments, each record as its
+    own gzip member so it can be read back by offset without decompressing
+    the segment. A SQLite index maps URL, host and fetch time to the record
+    location. A new segment is started once the current one reaches
+    segment_bytes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_bytes: Optional[int] = None):
+        """Initialize archive and create the index"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.directory = directory or self.config.PAGE_ARCHIVE_DIR
+        self.segment_bytes = (
+            self.config.PAGE_ARCHIVE_SEGMENT_BYTES if segment_bytes is None else segment_bytes
+        )
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._stream = None
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _open_segment(self):
+        """Append to the newest segment, or start the next one when it is full"""
+        segments = self._segments()
+        name = segments[-1] if segments else f"{SEGMENT_PREFIX}0000{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+
+        if self.segment_bytes and os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            number = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+            name = f"{SEGMENT_PREFIX}{number:04d}{SEGMENT_SUFFIX}"
+            path = os.path.join(self.directory, name)
+
+        self._segment = name
+        self._stream = open(path, 'ab')
+
+    def record(self, url: str, body: str, status: int = 200,
+               headers: Optional[Dict[str, str]] = None,
+               fetched_at: Optional[str] = None) -> int:
+        """Append one response and return its record id"""
+        page = ArchivedPage(
+            url=url,
+            fetched_at=fetched_at or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            status=status,
+            body=body,
+            headers=dict(headers or {}),
+        )
+        member = gzip.compress(encode_record(page))
+        content_hash = hashlib.sha1(page.body.encode('utf-8')).hexdigest()
+
+        with self._lock:
+            if self._stream is None or (
+                self.segment_bytes and self._stream.tell() >= self.segment_bytes
+            ):
+                self.close_segment()
+                self._open_segment()
+
+            offset = self._stream.tell()
+            self._stream.write(member)
+            self._stream.flush()
+
+            with self.conn:
+                cursor = self.conn.execute(
+                    'INSERT INTO records '
+                    '(url, host, fetched_at, status, segment, offset, length, content_hash) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (url, urlparse(url).hostname or '', page.fetched_at, status,
+                     self._segment, offset, len(member), content_hash)
+                )
+
+        return cursor.lastrowid
+
+    def read(self, entry) -> ArchivedPage:
+        """Read a record by id or index entry"""
+        if not isinstance(entry, dict):
+            record_id, entry = entry, self.get_entry(entry)
+            if entry is None:
+                raise KeyError(f"No archived record {record_id}")
+
+        with open(os.path.join(self.directory, entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            member = f.read(entry['length'])
+
+        page = decode_record(gzip.decompress(member))
+        page.record_id = entry['id']
+        return page
+
+    def get_entry(self, record_id: int) -> Optional[Dict]:
+        """Get the index entry of a record"""
+        row = self.conn.execute('SELECT * FROM records WHERE id = ?', (record_id,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self, url: Optional[str] = None, host: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None,
+                latest_only: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        """List index entries by URL (* wildcard), host and fetch time
+
+        With latest_only, only the newest capture of each URL is returned.
+        """
+        clauses = []
+        params: List = []
+
+        if url:
+            if '*' in url:
+                clauses.append('url LIKE ?')
+                params.append(url.replace('%', r'\%').replace('*', '%'))
+            else:
+                clauses.append('url = ?')
+                params.append(url)
+        if host:
+            clauses.append('host = ?')
+            params.append(host)
+        if since:
+            clauses.append('fetched_at >= ?')
+            params.append(since)
+        if until:
+            clauses.append('fetched_at <= ?')
+            params.append(until)
+
+        if latest_only:
+            clauses.append('id IN (SELECT MAX(id) FROM records GROUP BY url)')
+
+        sql = 'SELECT * FROM records'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY fetched_at, id'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def latest(self, url: str) -> Optional[ArchivedPage]:
+        """Get the newest capture of a URL"""
+        row = self.conn.execute(
+            'SELECT * FROM records WHERE url = ? ORDER BY fetched_at DESC, id DESC LIMIT 1', (url,)
+        ).fetchone()
+        return self.read(dict(row)) if row else None
+
+    def iter_pages(self, **filters) -> Iterator[ArchivedPage]:
+        """Read matching records in fetch order"""
+        for entry in self.entries(**filters):
+            yield self.read(entry)
+
+    def stats(self) -> Dict:
+        """Get record, URL and segment counts"""
+        row = self.conn.execute(
+            'SELECT COUNT(*) AS records, COUNT(DISTINCT url) AS urls, '
+            'MIN(fetched_at) AS first, MAX(fetched_at) AS last FROM records'
+        ).fetchone()
+        segments = self._segments()
+        return {
+            'records': row['records'],
+            'urls': row['urls'],
+            'first_capture': row['first'],
+            'last_capture': row['last'],
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(os.path.join(self.directory, s)) for s in segments),
+        }
+
+    def close_segment(self):
+        """Make the current segment durable and close it"""
+        if self._stream is not None:
+            self._stream.flush()
+            os.fsync(self._stream.fileno())
+            self._stream.close()
+            self._stream = None
+
+    def close(self):
+        """Close the archive"""
+        with self._lock:
+            self.close_segment()
+        self.conn.close()
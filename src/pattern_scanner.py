@@ -4,9 +4,52 @@ Handles pattern matching and string scanning operations
 """
 
 import re
-from typing import List, Dict, Optional, Pattern
+import time
+import logging
+import threading
+from bisect import bisect_right
+from typing import List, Dict, Optional, Pattern, Tuple
 from dataclasses import dataclass, asdict
+from config import get_config
 from logger import get_logger
+from metrics import get_metrics
+from profiler import ScanProfiler
+from memory_governor import MemoryGovernor
+from match_validator import MatchValidator
+from text_normalizer import normalize_text
+from watchlist import watchlist_regex
+
+# Built-in patterns; their matches are validated and they are the first to go
+# when a page runs over its CPU budget
+CRITICAL_PATTERNS = {
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'bitcoin': r'(bc1|[13])[a-zA-HJ-NP-Z0-9]{25,62}',
+    'ip_address': r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b',
+    'url': r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)',
+    'credit_card': r'\b(?:\d[ -]*?){13,19}\b',
+    'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
+    'api_key': r'(?i)(api[_-]?key|token|secret)["\']?\s*[:=]\s*["\']?[a-zA-Z0-9\-_]{20,}',
+}
+
+
+def _merge_spans(spans) -> List[Tuple[int, int]]:
+    """Sorted, non-overlapping union of (start, end) spans"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _overlaps(merged: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """True if start:end overlaps one of the merged spans"""
+    i = bisect_right(merged, (start, float('inf'))) - 1
+    if i >= 0 and merged[i][1] > start:
+        return True
+    return i + 1 < len(merged) and merged[i + 1][0] < end
+
 
 @dataclass
 class ScanResult:
@@ -17,6 +60,8 @@ class ScanResult:
     context: str
     timestamp: str
     confidence: float = 1.0
+    start: Optional[int] = None
+    end: Optional[int] = None
     
     def to_dict(self) -> Dict:
         """Convert to dictionary"""
@@ -26,26 +71,42 @@ class ScanResult:
 class PatternScanner:
     """Scans text content for patterns and keywords"""
     
-    def __init__(self, patterns: List[str] = None):
-        """Initialize scanner with patterns"""
+    # Matches between CPU budget checks within one pattern
+    BUDGET_CHECK_EVERY = 256
+    
+    def __init__(self, patterns: List[str] = None, profiler: Optional[ScanProfiler] = None,
+                 governor: Optional[MemoryGovernor] = None,
+                 validator: Optional[MatchValidator] = None):
+        """Initialize scanner with patterns
+        
+        With a memory governor, the context kept around each finding is
+        shortened while the run is under memory pressure. Matches of the
+        built-in patterns go through the validator before anything is built
+        for them. With NORMALIZE_TEXT, patterns run over the normalized text
+        and offsets and context refer to the original.
+        """
         self.logger = get_logger()
+        self.metrics = get_metrics()
+        self.profiler = profiler
+        self.governor = governor
+        self.validator = validator or MatchValidator()
+        config = get_config()
+        self.normalize = config.NORMALIZE_TEXT
+        self.budget_bytes = config.SCAN_BUDGET_BYTES
+        self.budget_seconds = config.SCAN_BUDGET_SECONDS
+        self.sample_window = config.SCAN_SAMPLE_WINDOW
+        try:
+            self.watchlist = watchlist_regex()
+        except OSError as e:
+            self.logger.warning("Could not read watchlist file: %s", e)
+            self.watchlist = None
+        self._local = threading.local()
         self.patterns: Dict[str, Pattern] = {}
         self.custom_patterns: List[str] = patterns or []
         self._compile_patterns()
     
     def _compile_patterns(self):
         """Compile regex patterns"""
-        # Default critical patterns
-        critical_patterns = {
-            'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            'bitcoin': r'(bc1|[13])[a-zA-HJ-NP-Z0-9]{25,62}',
-            'ip_address': r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b',
-            'url': r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)',
-            'credit_card': r'\b(?:\d[ -]*?){13,19}\b',
-            'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
-            'api_key': r'(?i)(api[_-]?key|token|secret)["\']?\s*[:=]\s*["\']?[a-zA-Z0-9\-_]{20,}',
-        }
-        
         # Add custom patterns
         for pattern_str in self.custom_patterns:
             try:
@@ -54,40 +115,176 @@ class PatternScanner:
                 self.logger.warning(f"Invalid regex pattern '{pattern_str}': {str(e)}")
         
         # Add critical patterns
-        for name, pattern_str in critical_patterns.items():
+        for name, pattern_str in CRITICAL_PATTERNS.items():
             try:
                 self.patterns[name] = re.compile(pattern_str, re.IGNORECASE)
             except re.error as e:
                 self.logger.error(f"Failed to compile critical pattern '{name}': {str(e)}")
     
     def scan_text(self, text: str, source_url: str, context_length: int = 100) -> List[ScanResult]:
-        """Scan text for patterns"""
+        """Scan text for patterns
+        
+        Pages longer than SCAN_BUDGET_BYTES are scanned in evenly spaced
+        windows adding up to the budget. Once a page has used
+        SCAN_BUDGET_SECONDS of CPU, the built-in patterns still to run are
+        skipped and only keyword patterns go on; at twice the budget those
+        stop too. A scan cut short either way also looks for ALERT_WATCHLIST
+        terms across the whole page, and is described by last_overrun().
+        """
         results: List[ScanResult] = []
+        self._local.overrun = None
         
         if not text:
             return results
+        if self.governor is not None:
+            context_length = self.governor.context_length(context_length)
+        
+        scan_seconds = self.metrics.histogram(
+            'darkwalker_scan_pattern_seconds', 'Scan time per pattern and page'
+        )
+        findings_total = self.metrics.counter(
+            'darkwalker_findings_total', 'Findings per pattern'
+        )
+        rejected_total = self.metrics.counter(
+            'darkwalker_matches_rejected_total', 'Matches dropped by validation per pattern'
+        )
+        log_matches = self.logger.is_enabled_for(logging.DEBUG)
+        validate = self.validator.validate
+        timestamp = self._get_timestamp()
+        normalized = normalize_text(text) if self.normalize else None
+        haystack = normalized.text if normalized is not None else text
+        cpu_started = time.thread_time()
+        windows = self._sample_windows(len(haystack))
+        chars_scanned = sum(end - start for start, end in windows) if windows else len(haystack)
+        self.metrics.counter(
+            'darkwalker_bytes_scanned_total', 'Characters of text scanned'
+        ).inc(chars_scanned)
+        skipped: List[str] = []
+        cut: List[str] = []
+        
+        def emit(pattern_name: str, match) -> Optional[bool]:
+            """Add a match to the results; None if validation drops it"""
+            matched_text = match.group()
+            confidence = validate(pattern_name, matched_text)
+            if confidence is None:
+                return None
+            start, end = match.span()
+            if normalized is not None:
+                start, end = normalized.original_span(start, end)
+            context = text[max(0, start - context_length):end + context_length].strip()
+            
+            results.append(ScanResult(
+                pattern=pattern_name,
+                matched_text=matched_text,
+                source_url=source_url,
+                context=context,
+                timestamp=timestamp,
+                confidence=confidence,
+                start=start,
+                end=end
+            ))
+            if log_matches:
+                self.logger.debug("Pattern '%s' matched in %s", pattern_name, source_url)
+            return True
         
         for pattern_name, pattern_regex in self.patterns.items():
-            matches = pattern_regex.finditer(text)
+            cpu_limit = self._cpu_limit(pattern_name)
+            if cpu_limit and time.thread_time() - cpu_started > cpu_limit:
+                skipped.append(pattern_name)
+                continue
+            started = time.perf_counter()
+            matched_before = len(results)
+            rejected = 0
             
-            for match in matches:
-                start_pos = max(0, match.start() - context_length)
-                end_pos = min(len(text), match.end() + context_length)
-                context = text[start_pos:end_pos].strip()
-                
-                result = ScanResult(
-                    pattern=pattern_name,
-                    matched_text=match.group(),
-                    source_url=source_url,
-                    context=context,
-                    timestamp=self._get_timestamp(),
-                    confidence=1.0
-                )
-                results.append(result)
-                self.logger.debug(f"Pattern '{pattern_name}' matched in {source_url}")
+            for begin, finish in windows or ((0, len(haystack)),):
+                for count, match in enumerate(pattern_regex.finditer(haystack, begin, finish), 1):
+                    if emit(pattern_name, match) is None:
+                        rejected += 1
+                    if (cpu_limit and count % self.BUDGET_CHECK_EVERY == 0
+                            and time.thread_time() - cpu_started > cpu_limit):
+                        cut.append(pattern_name)
+                        break
+                if cut and cut[-1] == pattern_name:
+                    break
+            
+            elapsed = time.perf_counter() - started
+            matched = len(results) - matched_before
+            scan_seconds.observe(elapsed, pattern=pattern_name)
+            if matched:
+                findings_total.inc(matched, pattern=pattern_name)
+            if rejected:
+                rejected_total.inc(rejected, pattern=pattern_name)
+            if self.profiler:
+                self.profiler.record(pattern_name, elapsed, chars_scanned, matched, source_url)
+        
+        if windows or skipped or cut:
+            self._record_overrun(source_url, haystack, windows, skipped, cut,
+                                 time.thread_time() - cpu_started)
+            if self.watchlist is not None:
+                # Terms inside a span a pattern already reported are not reported again
+                covered = _merge_spans((r.start, r.end) for r in results)
+                for match in self.watchlist.finditer(haystack):
+                    start, end = match.span()
+                    if normalized is not None:
+                        start, end = normalized.original_span(start, end)
+                    if not _overlaps(covered, start, end):
+                        emit('watchlist', match)
         
         return results
     
+    def _sample_windows(self, length: int) -> Optional[List[Tuple[int, int]]]:
+        """Evenly spaced windows adding up to the byte budget, None to scan it all"""
+        if not self.budget_bytes or length <= self.budget_bytes:
+            return None
+        window = max(1, min(self.sample_window, self.budget_bytes))
+        count = max(1, self.budget_bytes // window)
+        if count == 1:
+            return [(0, window)]
+        # First and last windows sit at the head and tail of the page
+        step = (length - window) / (count - 1)
+        return [(round(i * step), round(i * step) + window) for i in range(count)]
+    
+    def _cpu_limit(self, pattern_name: str) -> float:
+        """CPU seconds into a page after which a pattern no longer runs (0 = none)"""
+        if not self.budget_seconds:
+            return 0.0
+        if pattern_name in CRITICAL_PATTERNS:
+            return self.budget_seconds
+        return 2 * self.budget_seconds
+    
+    def _record_overrun(self, source_url: str, haystack: str, windows: Optional[List[Tuple[int, int]]],
+                        skipped: List[str], cut: List[str], cpu_seconds: float):
+        """Describe a scan that ran out of budget"""
+        stopped = skipped + cut
+        reasons = (['bytes'] if windows else []) + (['cpu'] if stopped else [])
+        if any(name not in CRITICAL_PATTERNS for name in stopped):
+            strategy = 'watchlist'
+        elif stopped:
+            strategy = 'keywords'
+        else:
+            strategy = 'sample'
+        self._local.overrun = {
+            'partial': True,
+            'strategy': strategy,
+            'reasons': reasons,
+            'chars': len(haystack),
+            'chars_sampled': sum(end - start for start, end in windows) if windows else len(haystack),
+            'cpu_seconds': round(cpu_seconds, 3),
+            'patterns_skipped': skipped,
+            'patterns_cut': cut,
+        }
+        overruns = self.metrics.counter(
+            'darkwalker_scan_budget_overruns_total', 'Pages scanned partially, by exceeded budget'
+        )
+        for reason in reasons:
+            overruns.inc(reason=reason)
+        self.logger.warning("Scan budget exceeded on %s (%s), scanned with %s fallback",
+                            source_url, '+'.join(reasons), strategy)
+    
+    def last_overrun(self) -> Optional[Dict]:
+        """Budget overrun of this thread's last scan_text call, None if it was complete"""
+        return getattr(self._local, 'overrun', None)
+    
     def scan_multiple(self, text_blocks: Dict[str, str]) -> Dict[str, List[ScanResult]]:
         """Scan multiple text blocks"""
         all_results: Dict[str, List[ScanResult]] = {}
@@ -99,6 +296,15 @@ class PatternScanner:
         
         return all_results
     
+    def enable_profiling(self, profiler: Optional[ScanProfiler] = None) -> ScanProfiler:
+        """Start recording per-pattern scan cost"""
+        self.profiler = profiler or ScanProfiler()
+        return self.profiler
+    
+    def disable_profiling(self):
+        """Stop recording per-pattern scan cost"""
+        self.profiler = None
+    
     def add_custom_pattern(self, pattern: str, name: Optional[str] = None):
         """Add a custom regex pattern"""
         try:
@@ -0,0 +1,164 @@
+"""
+Pipeline module
+Staged processing with bounded queues, per-stage worker pools and backpressure
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Executor
+from typing import List, Dict, Optional, Callable, Any
+from logger import get_logger
+from metrics import get_metrics
+
+
+_STOP = object()
+
+
+class Stage:
+    """Pipeline stage with a bounded input queue and its own worker pool"""
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = 16, executor: Optional[Executor] = None):
+        """Initialize stage
+
+        func returns the item for the next stage, or None to drop it.
+        When an executor is given, workers hand items to it (e.g. a process
+        pool for CPU-bound work) and wait for the result, so the stage never
+        has more than `workers` items in flight.
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.next_stage: Optional['Stage'] = None
+        self.threads: List[threading.Thread] = []
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.logger = get_logger()
+        metrics = get_metrics()
+        self._items_metric = metrics.counter('darkwalker_pipeline_items_total', 'Items processed per stage')
+        self._depth_metric = metrics.gauge('darkwalker_pipeline_queue_depth', 'Items waiting per stage')
+        self._seconds_metric = metrics.histogram('darkwalker_pipeline_stage_seconds', 'Time per item per stage')
+
+    def start(self):
+        """Start stage workers"""
+        self.started_at = time.monotonic()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"pipeline-{self.name}-{i}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            started = time.monotonic()
+            try:
+                if self.executor is not None:
+                    result = self.executor.submit(self.func, item).result()
+                else:
+                    result = self.func(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.errors += 1
+                self.logger.error("Pipeline stage '%s' failed: %s", self.name, e)
+
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.processed += 1
+                self.busy_seconds += elapsed
+                if result is None and self.next_stage is not None:
+                    self.dropped += 1
+            self._items_metric.inc(stage=self.name)
+            self._seconds_metric.observe(elapsed, stage=self.name)
+            self._depth_metric.set(self.queue.qsize(), stage=self.name)
+
+            # Blocking put: a full downstream queue stalls this stage (backpressure)
+            if result is not None and self.next_stage is not None:
+                self.next_stage.queue.put(result)
+
+    def stop(self):
+        """Signal workers to finish queued items and wait for them"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.stopped_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        """Get stage statistics"""
+        elapsed = 0.0
+        if self.started_at:
+            elapsed = (self.stopped_at or time.monotonic()) - self.started_at
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue.qsize(),
+                'queue_size': self.queue.maxsize,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'throughput': round(self.processed / elapsed, 3) if elapsed else 0.0,
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+            }
+
+
+class Pipeline:
+    """Chain of stages connected by bounded queues"""
+
+    def __init__(self, stages: List[Stage]):
+        """Initialize pipeline"""
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.submitted = 0
+        self.logger = get_logger()
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.next_stage = downstream
+
+    def start(self) -> 'Pipeline':
+        """Start all stages"""
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """Feed an item into the first stage, blocking while it is full"""
+        self.stages[0].queue.put(item, timeout=timeout)
+        self.submitted += 1
+
+    def pending(self) -> int:
+        """Number of submitted items not yet dropped or through the last stage"""
+        finished = self.stages[-1].stats()['processed']
+        finished += sum(stage.stats()['dropped'] for stage in self.stages[:-1])
+        return self.submitted - finished
+
+    def close(self):
+        """Drain the pipeline stage by stage and stop all workers"""
+        for stage in self.stages:
+            stage.stop()
+        self.logger.debug("Pipeline finished: %s", self.stats())
+
+    def stats(self) -> Dict[str, Dict]:
+        """Get per-stage queue depth and throughput"""
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,200 @@
+"""
+Profiler module
+Per-pattern scan cost accounting and super-linear growth detection
+"""
+
+import os
+import math
+import time
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Pattern, Callable
+from logger import get_logger
+
+
+# Inputs that tend to expose catastrophic backtracking in the built-in patterns
+GROWTH_PROBES: Dict[str, Callable[[int], str]] = {
+    'digits': lambda n: '1' * n,
+    'spaced_digits': lambda n: '1 ' * (n // 2),
+    'word_chars': lambda n: 'a' * n,
+    'email_like': lambda n: ('a.' * (n // 2)) + '@',
+    'key_like': lambda n: 'token=' + 'A' * n,
+}
+
+
+@dataclass
+class PatternProfile:
+    """Accumulated cost of one pattern"""
+    pattern: str
+    calls: int = 0
+    seconds: float = 0.0
+    bytes_scanned: int = 0
+    matches: int = 0
+    max_seconds: float = 0.0
+    outliers: List[Dict] = field(default_factory=list)
+    growth_exponent: Optional[float] = None
+    superlinear: bool = False
+
+    @property
+    def mb_per_second(self) -> float:
+        """Scan throughput"""
+        if not self.seconds:
+            return 0.0
+        return self.bytes_scanned / self.seconds / 1_000_000
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary"""
+        data = asdict(self)
+        data['mb_per_second'] = round(self.mb_per_second, 3)
+        return data
+
+
+class ScanProfiler:
+    """Records per-pattern scan cost for PatternScanner"""
+
+    def __init__(self, outlier_factor: float = 10.0, min_outlier_seconds: float = 0.005,
+                 max_outliers: int = 5):
+        """Initialize profiler
+
+        A call is recorded as an outlier when its time per byte exceeds the
+        pattern's running average by outlier_factor, which usually points to
+        regex backtracking on that input.
+        """
+        self.outlier_factor = outlier_factor
+        self.min_outlier_seconds = min_outlier_seconds
+        self.max_outliers = max_outliers
+        self.profiles: Dict[str, PatternProfile] = {}
+        self._lock = threading.Lock()
+
+    def record(self, pattern: str, seconds: float, nbytes: int, matches: int,
+               source: Optional[str] = None):
+        """Record one pattern run over one text"""
+        with self._lock:
+            profile = self.profiles.get(pattern)
+            if profile is None:
+                profile = self.profiles[pattern] = PatternProfile(pattern)
+
+            if profile.calls and profile.bytes_scanned and nbytes:
+                average_rate = profile.seconds / profile.bytes_scanned
+                rate = seconds / nbytes
+                if seconds >= self.min_outlier_seconds and rate > average_rate * self.outlier_factor:
+                    profile.outliers.append({
+                        'source': source,
+                        'seconds': round(seconds, 6),
+                        'bytes': nbytes,
+                        'slowdown': round(rate / average_rate, 1),
+                    })
+                    profile.outliers.sort(key=lambda o: o['seconds'], reverse=True)
+                    del profile.outliers[self.max_outliers:]
+
+            profile.calls += 1
+            profile.seconds += seconds
+            profile.bytes_scanned += nbytes
+            profile.matches += matches
+            profile.max_seconds = max(profile.max_seconds, seconds)
+
+    def ranked(self) -> List[PatternProfile]:
+        """Get profiles ordered from most to least expensive"""
+        return sorted(self.profiles.values(), key=lambda p: p.seconds, reverse=True)
+
+    def report(self) -> List[Dict]:
+        """Get ranked profiles as dictionaries"""
+        return [p.to_dict() for p in self.ranked()]
+
+    def reset(self):
+        """Clear recorded profiles"""
+        with self._lock:
+            self.profiles = {}
+
+
+def _time_pattern(regex: Pattern, text: str) -> float:
+    started = time.perf_counter()
+    for _ in regex.finditer(text):
+        pass
+    return time.perf_counter() - started
+
+
+def growth_exponent(regex: Pattern, sample: str = '',
+                    sizes: tuple = (1000, 2000, 4000, 8000),
+                    time_limit: float = 2.0) -> float:
+    """Estimate how scan time grows with input size for a pattern
+
+    Times the pattern over the corpus sample and adversarial probes at each
+    size and returns the worst log-log slope: ~1 is linear, ~2 quadratic.
+    """
+    generators = dict(GROWTH_PROBES)
+    if sample:
+        generators['corpus'] = lambda n: (sample * (n // max(1, len(sample)) + 1))[:n]
+
+    worst = 0.0
+    for make_text in generators.values():
+        points = []
+        for size in sizes:
+            elapsed = min(_time_pattern(regex, make_text(size)) for _ in range(3))
+            points.append((size, max(elapsed, 1e-7)))
+            if elapsed > time_limit:
+                break
+
+        if len(points) < 2:
+            continue
+
+        (size_a, time_a), (size_b, time_b) = points[0], points[-1]
+        # Very fast runs are dominated by timer noise
+        if time_b < 1e-4:
+            continue
+        slope = math.log(time_b / time_a) / math.log(size_b / size_a)
+        worst = max(worst, slope)
+
+    return round(worst, 2)
+
+
+def load_corpus(path: str) -> Dict[str, str]:
+    """Load a saved corpus from a file or directory of pages"""
+    # Imported here so the scanner can use the profiler without pulling in bs4
+    from dark_web_crawler import extract_text
+
+    paths = []
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            paths.extend(os.path.join(root, name) for name in sorted(files))
+    else:
+        paths.append(path)
+
+    corpus = {}
+    for file_path in paths:
+        with open(file_path, encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        if file_path.lower().endswith(('.html', '.htm')):
+            content = extract_text(content)
+        corpus[file_path] = content
+
+    return corpus
+
+
+def profile_corpus(scanner, corpus: Dict[str, str], check_growth: bool = True,
+                   superlinear_threshold: float = 1.3) -> List[Dict]:
+    """Profile a scanner's active patterns over a corpus, most expensive first"""
+    logger = get_logger()
+    profiler = ScanProfiler()
+    previous = scanner.profiler, scanner.budget_bytes, scanner.budget_seconds
+    # Profile every pattern over whole pages, not what the scan budget would let through
+    scanner.profiler, scanner.budget_bytes, scanner.budget_seconds = profiler, 0, 0
+
+    try:
+        for source, text in corpus.items():
+            scanner.scan_text(text, source)
+    finally:
+        scanner.profiler, scanner.budget_bytes, scanner.budget_seconds = previous
+
+    if check_growth:
+        sample = next(iter(corpus.values()), '')[:4000]
+        for name, regex in scanner.patterns.items():
+            profile = profiler.profiles.setdefault(name, PatternProfile(name))
+            profile.growth_exponent = growth_exponent(regex, sample)
+            profile.superlinear = profile.growth_exponent > superlinear_threshold
+            if profile.superlinear:
+                logger.warning(
+                    f"Pattern '{name}' scales super-linearly (exponent {profile.growth_exponent})"
+                )
+
+    return profiler.report()
@@ -0,0 +1,234 @@
+"""
+Query Planner module
+Fans keyword queries out to all search engines, merges their hits and fetches
+the best-ranked result pages within a global time budget
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Callable, Iterable, Set, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+from config import get_config
+from logger import get_logger
+
+
+_HREF = re.compile(r'''<a\s[^>]*?href\s*=\s*["']([^"'#]+)''', re.IGNORECASE)
+
+
+def _hrefs(html: str) -> List[str]:
+    return [href.strip() for href in _HREF.findall(html)]
+
+
+def extract_result_links(html: str, engine_url: str = '') -> List[str]:
+    """Onion links of a results page in page order, minus the engine's own pages"""
+    engine_base = engine_url.rstrip('/')
+    links = []
+    for href in _hrefs(html):
+        if '.onion' not in href or (engine_base and href.startswith(engine_base)):
+            continue
+        links.append(href)
+    return links
+
+
+def extract_ahmia_links(html: str, engine_url: str = '') -> List[str]:
+    """Ahmia wraps hits in /search/redirect?...&redirect_url=<target> links"""
+    links = []
+    for href in _hrefs(html):
+        target = parse_qs(urlparse(href).query).get('redirect_url')
+        if target:
+            links.append(unquote(target[0]))
+    return links or extract_result_links(html, engine_url)
+
+
+EXTRACTORS: Dict[str, Callable[[str, str], List[str]]] = {
+    'ahmia': extract_ahmia_links,
+}
+
+
+def normalize_url(url: str) -> str:
+    """Key used to deduplicate the same hit reported by several engines"""
+    parsed = urlparse(url.strip())
+    path = parsed.path.rstrip('/') or '/'
+    key = f"{parsed.scheme.lower() or 'http'}://{(parsed.netloc or '').lower()}{path}"
+    return f"{key}?{parsed.query}" if parsed.query else key
+
+
+@dataclass
+class Hit:
+    """A result page and the engines and queries that returned it"""
+    url: str
+    score: float = 0.0
+    engines: Set[str] = field(default_factory=set)
+    queries: Set[str] = field(default_factory=set)
+
+
+class QueryPlanner:
+    """Fan-out search planner
+
+    Keywords are split into groups of group_size, and every group is sent to
+    every engine at once on a shared pool of `workers` threads. Each results
+    page is handed to on_page and its hits are parsed with the engine's
+    extractor. Hits from all engines are merged by URL and ranked by
+    reciprocal rank (a page ranked high by several engines comes first); the
+    top_k best plus any seed pages are then fetched on the same pool and
+    handed to on_page too. No new request starts once `budget` seconds have
+    passed, and searches and page fetches are limited to the time left.
+    """
+
+    def __init__(self, search: Callable[[str, str, Optional[float]], Optional[str]],
+                 fetch: Callable[[str, float], Optional[str]],
+                 engines: Dict[str, str],
+                 group_size: Optional[int] = None, top_k: Optional[int] = None,
+                 workers: Optional[int] = None, budget: Optional[float] = None,
+                 page_timeout: Optional[float] = None):
+        """Initialize planner
+
+        search(query, engine, max_seconds) returns a results page and
+        fetch(url, max_seconds) a result page; max_seconds is None without a
+        budget. Both return None (or raise) on failure.
+        engines maps engine names to their base URLs.
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.search = search
+        self.fetch = fetch
+        self.engines = engines
+        self.group_size = max(1, group_size or self.config.QUERY_GROUP_SIZE)
+        self.top_k = self.config.QUERY_TOP_K if top_k is None else top_k
+        self.workers = max(1, workers or self.config.QUERY_WORKERS)
+        self.budget = self.config.QUERY_BUDGET_SECONDS if budget is None else budget
+        self.page_timeout = page_timeout or self.config.SITE_TIMEOUT
+
+    def plan(self, keywords: Iterable[str]) -> List[str]:
+        """Group keywords into queries"""
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        return [
+            ' '.join(keywords[i:i + self.group_size])
+            for i in range(0, len(keywords), self.group_size)
+        ]
+
+    def rank(self, results: Iterable[Tuple[str, str, List[str]]]) -> List[Hit]:
+        """Merge (engine, query, links) results into hits, best first"""
+        hits: Dict[str, Hit] = {}
+        for engine, query, links in results:
+            for position, url in enumerate(dict.fromkeys(links)):
+                hit = hits.setdefault(normalize_url(url), Hit(url))
+                hit.score += 1.0 / (position + 1)
+                hit.engines.add(engine)
+                hit.queries.add(query)
+        return sorted(hits.values(), key=lambda hit: -hit.score)
+
+    def run(self, keywords: Iterable[str],
+            on_page: Callable[[Dict], None],
+            seeds: Optional[Dict[str, str]] = None,
+            prepare: Optional[Callable[[Dict], Dict]] = None) -> Dict:
+        """Search, rank and fetch; return sweep statistics
+
+        on_page receives {'source', 'kind', 'url', 'html'} dictionaries for
+        every results page ('search') and fetched page ('hit' or 'seed'),
+        on the calling thread. prepare, when given, transforms each of them
+        first on the worker thread, so parsing and scanning run in parallel
+        with the fetches. seeds maps source names to URLs fetched regardless
+        of ranking, e.g. Hidden Wiki pages.
+        """
+        deadline = time.monotonic() + self.budget if self.budget else None
+        queries = self.plan(keywords)
+        stats = {
+            'queries': len(queries),
+            'searches': 0,
+            'search_failures': 0,
+            'hits': 0,
+            'pages_fetched': 0,
+            'page_failures': 0,
+            'skipped': 0,
+            'budget_exhausted': False,
+        }
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else deadline - time.monotonic()
+
+        def search_task(query: str, engine: str) -> Dict:
+            try:
+                html = self.search(query, engine, remaining())
+            except Exception as e:
+                self.logger.error("Error searching %s for %s: %s", engine, query, e)
+                html = None
+            links = EXTRACTORS.get(engine, extract_result_links)(html or '', self.engines[engine])
+            item = {'source': f"search:{engine}:{query}", 'kind': 'search', 'engine': engine,
+                    'query': query, 'url': self.engines[engine], 'html': html, 'links': links,
+                    'failed': not html}
+            return prepare(item) if prepare and html else item
+
+        def fetch_task(source: str, kind: str, url: str) -> Dict:
+            left = remaining()
+            max_seconds = self.page_timeout if left is None else min(self.page_timeout, left)
+            html = self.fetch(url, max_seconds)
+            item = {'source': source, 'kind': kind, 'url': url, 'html': html, 'failed': not html}
+            return prepare(item) if prepare and html else item
+
+        searches = [(query, engine) for query in queries for engine in self.engines]
+        search_results: List[Tuple[str, str, List[str]]] = []
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='planner') as executor:
+            for item in self._drain(executor, [(search_task, task) for task in searches],
+                                    remaining, stats):
+                stats['searches'] += 1
+                if item['failed']:
+                    stats['search_failures'] += 1
+                    continue
+                search_results.append((item['engine'], item['query'], item.pop('links')))
+                on_page(item)
+
+            hits = self.rank(search_results)
+            stats['hits'] = len(hits)
+            selected = hits[:self.top_k] if self.top_k else hits
+            self.logger.info(
+                "Planner: %d queries x %d engines gave %d distinct hits, fetching %d",
+                len(queries), len(self.engines), len(hits), len(selected)
+            )
+
+            pages = [(fetch_task, (name, 'seed', url)) for name, url in (seeds or {}).items()]
+            pages += [(fetch_task, (hit.url, 'hit', hit.url)) for hit in selected]
+            for item in self._drain(executor, pages, remaining, stats):
+                if item['failed']:
+                    stats['page_failures'] += 1
+                    continue
+                stats['pages_fetched'] += 1
+                on_page(item)
+
+        return stats
+
+    def _drain(self, executor: ThreadPoolExecutor, tasks: List[Tuple[Callable, Tuple]],
+               remaining: Callable[[], Optional[float]], stats: Dict):
+        """Run tasks on the pool, yielding results until done or out of budget
+
+        Tasks are submitted no faster than the pool drains them, so nothing
+        is queued that the budget would not let start.
+        """
+        tasks = list(tasks)
+        running = set()
+        while tasks or running:
+            left = remaining()
+            if left is not None and left <= 0:
+                stats['budget_exhausted'] = True
+                break
+            while tasks and len(running) < self.workers:
+                func, args = tasks.pop(0)
+                running.add(executor.submit(func, *args))
+            done, running = wait(running, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    self.logger.error("Planner task failed: %s", e)
+
+        # Requests still in flight finish within their own timeouts; their results are dropped
+        stats['skipped'] += len(tasks) + len(running)
+        for future in running:
+            future.cancel()
+        if tasks or running:
+            self.logger.warning(
+                "Planner budget of %ss used up; %d tasks skipped", self.budget, len(tasks) + len(running)
+            )
@@ -0,0 +1,257 @@
+"""
+Result Sink module
+Streaming writers that persist findings as they are produced
+"""
+
+import os
+import csv
+import gzip
+import json
+import time
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable, IO
+from logger import get_logger
+
+
+CSV_FIELDS = ['pattern', 'matched_text', 'source_url', 'context', 'timestamp', 'confidence']
+TRAILER_MARKER = '__trailer__'
+
+
+class ResultSink:
+    """Base class for streaming finding sinks"""
+
+    def write(self, finding: Dict):
+        """Write a single finding"""
+        raise NotImplementedError
+
+    def write_many(self, findings: Iterable[Dict]):
+        """Write a batch of findings"""
+        for finding in findings:
+            self.write(finding)
+
+    def write_trailer(self, statistics: Dict, metrics: Optional[Dict] = None):
+        """Write the closing statistics record"""
+        raise NotImplementedError
+
+    def close(self):
+        """Flush and close the sink"""
+
+    def get_paths(self) -> List[str]:
+        """Get files written by this sink"""
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FileSink(ResultSink):
+    """Append-only file sink with optional gzip and size/time rotation"""
+
+    extension = 'dat'
+
+    def __init__(self, base_path: str, compress: bool = False,
+                 max_bytes: int = 0, max_seconds: int = 0,
+                 fsync_interval: float = 1.0):
+        """Initialize sink; rotation is disabled when both limits are 0"""
+        self.logger = get_logger()
+        self.base_path = base_path
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.fsync_interval = fsync_interval
+        self.records_written = 0
+        self.paths: List[str] = []
+        self._raw: Optional[IO] = None
+        self._stream: Optional[IO] = None
+        self._segment = 0
+        self._opened_at = 0.0
+        self._last_sync = 0.0
+
+        base_dir = os.path.dirname(base_path)
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+
+        self._open_segment()
+
+    @property
+    def rotating(self) -> bool:
+        """Whether the sink splits output into segments"""
+        return bool(self.max_bytes or self.max_seconds)
+
+    def _segment_path(self) -> str:
+        """Build the path of the current segment"""
+        path = self.base_path
+        if self.rotating:
+            path += f".{self._segment:04d}"
+        path += f".{self.extension}"
+        if self.compress:
+            path += '.gz'
+        return path
+
+    def _open_segment(self):
+        """Open a new output segment"""
+        path = self._segment_path()
+        self._raw = open(path, 'ab')
+        if self.compress:
+            binary = gzip.GzipFile(fileobj=self._raw, mode='ab')
+        else:
+            binary = self._raw
+        self._stream = _TextWriter(binary)
+        self._opened_at = time.monotonic()
+        self.paths.append(path)
+        self._on_segment_opened()
+        self.logger.debug("Opened result segment %s", path)
+
+    def _on_segment_opened(self):
+        """Hook for format specific segment headers"""
+
+    def _close_segment(self):
+        """Flush, sync and close the current segment"""
+        if self._stream is None:
+            return
+        self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._stream = None
+        self._raw = None
+
+    def _maybe_rotate(self):
+        """Rotate to a new segment once size or age limits are reached"""
+        if not self.rotating:
+            return
+
+        too_big = self.max_bytes and self._raw.tell() >= self.max_bytes
+        too_old = self.max_seconds and time.monotonic() - self._opened_at >= self.max_seconds
+
+        if too_big or too_old:
+            self._close_segment()
+            self._segment += 1
+            self._open_segment()
+
+    def _sync(self, force: bool = False):
+        """Make written records durable"""
+        self._stream.flush()
+        self._raw.flush()
+        now = time.monotonic()
+        if force or now - self._last_sync >= self.fsync_interval:
+            os.fsync(self._raw.fileno())
+            self._last_sync = now
+
+    def _write_record(self, finding: Dict):
+        """Serialise one finding to the current segment"""
+        raise NotImplementedError
+
+    def _write_trailer_record(self, trailer: Dict):
+        """Serialise the trailer to the current segment"""
+        raise NotImplementedError
+
+    def write(self, finding: Dict):
+        """Write a single finding"""
+        self._maybe_rotate()
+        self._write_record(finding)
+        self.records_written += 1
+        self._sync()
+
+    def write_many(self, findings: Iterable[Dict]):
+        """Write a batch of findings with a single sync"""
+        for finding in findings:
+            self._maybe_rotate()
+            self._write_record(finding)
+            self.records_written += 1
+        self._sync()
+
+    def write_trailer(self, statistics: Dict, metrics: Optional[Dict] = None):
+        """Write the closing statistics record"""
+        trailer = {
+            'type': 'trailer',
+            'timestamp': datetime.now().isoformat(),
+            'records': self.records_written,
+            'segments': len(self.paths),
+            'statistics': statistics,
+        }
+        if metrics:
+            trailer['metrics'] = metrics
+        self._write_trailer_record(trailer)
+        self._sync(force=True)
+
+    def close(self):
+        """Flush and close the sink"""
+        self._close_segment()
+
+    def get_paths(self) -> List[str]:
+        """Get files written by this sink"""
+        return list(self.paths)
+
+
+class NDJSONSink(FileSink):
+    """Newline-delimited JSON sink"""
+
+    extension = 'ndjson'
+
+    def _write_record(self, finding: Dict):
+        self._stream.write(json.dumps(finding, separators=(',', ':')) + '\n')
+
+    def _write_trailer_record(self, trailer: Dict):
+        self._stream.write(json.dumps(trailer, separators=(',', ':')) + '\n')
+
+
+class CSVSink(FileSink):
+    """CSV sink; the trailer is a row whose pattern column is '__trailer__'"""
+
+    extension = 'csv'
+
+    def _on_segment_opened(self):
+        self._writer = csv.DictWriter(self._stream, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        if self._raw.tell() == 0:
+            self._writer.writeheader()
+
+    def _write_record(self, finding: Dict):
+        self._writer.writerow(finding)
+
+    def _write_trailer_record(self, trailer: Dict):
+        self._writer.writerow({
+            'pattern': TRAILER_MARKER,
+            'timestamp': trailer['timestamp'],
+            'context': json.dumps(trailer, separators=(',', ':')),
+        })
+
+
+class _TextWriter:
+    """Minimal text layer over a binary stream that keeps flush semantics"""
+
+    def __init__(self, binary: IO):
+        self.binary = binary
+
+    def write(self, text: str):
+        self.binary.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.binary.flush()
+
+    def close(self):
+        if self.binary is not None and isinstance(self.binary, gzip.GzipFile):
+            self.binary.close()
+        self.binary = None
+
+
+SINK_TYPES = {
+    'ndjson': NDJSONSink,
+    'csv': CSVSink,
+}
+
+
+def create_sink(base_path: str, fmt: str = 'ndjson', compress: bool = False,
+                max_bytes: int = 0, max_seconds: int = 0) -> FileSink:
+    """Create a streaming sink for the given format"""
+    if fmt not in SINK_TYPES:
+        raise ValueError(f"Unsupported stream format: {fmt}")
+    return SINK_TYPES[fmt](
+        base_path,
+        compress=compress,
+        max_bytes=max_bytes,
+        max_seconds=max_seconds
+    )
@@ -0,0 +1,129 @@
+"""
+Retry Queue module
+Delayed, budgeted retries of failed fetches that never block other work
+"""
+
+import math
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Any
+from config import get_config
+from logger import get_logger
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how late one class of error is retried"""
+    attempts: int
+    delay: float
+    backoff: float = 2.0
+
+    def delay_for(self, retry: int) -> float:
+        """Delay before the given retry (1 = first retry)"""
+        return self.delay * self.backoff ** (retry - 1)
+
+
+def default_policies() -> Dict[str, RetryPolicy]:
+    """Retry policies per error class from RETRY_POLICIES and RETRY_DELAY
+
+    Timeouts wait twice as long before their retry, since a slow host is
+    rarely faster a few seconds later. Skipped hosts (circuit) and client
+    errors (http_client) are never retried.
+    """
+    config = get_config()
+    policies = {}
+    for error_class, attempts in config.RETRY_POLICIES.items():
+        delay = config.RETRY_DELAY * (2 if error_class == 'timeout' else 1)
+        policies[error_class] = RetryPolicy(attempts=attempts, delay=delay)
+    policies.pop('circuit', None)
+    policies.pop('http_client', None)
+    return policies
+
+
+class RetryQueue:
+    """Time-ordered queue of failed work items waiting for another attempt
+
+    schedule() records a failure and, when the error class's policy and the
+    sweep's retry budget allow it, queues the item until its delay has
+    passed. The caller keeps working on first attempts and collects due
+    items with pop_due(). The budget is RETRY_BUDGET_RATIO of the sweep's
+    first attempts (at least RETRY_BUDGET_MIN), so a burst of failures can
+    only add a bounded amount of extra requests to a sweep.
+    """
+
+    def __init__(self, first_attempts: int = 0,
+                 policies: Optional[Dict[str, RetryPolicy]] = None,
+                 budget: Optional[int] = None):
+        """Initialize queue for a sweep of first_attempts items"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.policies = default_policies() if policies is None else policies
+        if budget is None:
+            budget = max(self.config.RETRY_BUDGET_MIN,
+                         math.ceil(first_attempts * self.config.RETRY_BUDGET_RATIO))
+        self.budget = budget
+        self._heap: List = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self.counts = {'scheduled': 0, 'retried': 0, 'not_retryable': 0,
+                       'exhausted': 0, 'over_budget': 0}
+
+    def schedule(self, item: Dict, error_class: Optional[str]) -> bool:
+        """Queue a failed item for a later attempt; False if it is given up
+
+        The item's 'attempt' key (1 for the first attempt) is advanced when
+        it is queued.
+        """
+        policy = self.policies.get(error_class or 'other')
+        attempt = item.get('attempt', 1)
+
+        with self._lock:
+            if policy is None:
+                self.counts['not_retryable'] += 1
+                return False
+            if attempt > policy.attempts:
+                self.counts['exhausted'] += 1
+                return False
+            if self.counts['scheduled'] >= self.budget:
+                self.counts['over_budget'] += 1
+                return False
+
+            self.counts['scheduled'] += 1
+            item['attempt'] = attempt + 1
+            due = time.monotonic() + policy.delay_for(attempt)
+            heapq.heappush(self._heap, (due, next(self._order), item))
+
+        self.logger.debug(
+            "Retrying %s after %s error in %.1fs (attempt %d)",
+            item.get('source') or item.get('url'), error_class, policy.delay_for(attempt), attempt + 1
+        )
+        return True
+
+    def pop_due(self, now: Optional[float] = None) -> List[Any]:
+        """Remove and return the items whose delay has passed"""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+            self.counts['retried'] += len(due)
+        return due
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Seconds until the next item is due (0 if one is), None when empty"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def stats(self) -> Dict[str, int]:
+        """Retry counters of the sweep"""
+        with self._lock:
+            return dict(self.counts, budget=self.budget, waiting=len(self._heap))
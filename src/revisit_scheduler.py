@@ -0,0 +1,317 @@
+"""
+Revisit Scheduler module
+Per-source revisit intervals estimated from content-hash history, so
+bandwidth goes to sources that change and yield new findings
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable
+from compaction import finding_fingerprint
+from config import get_config
+from logger import get_logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    interval REAL NOT NULL,
+    next_visit REAL,
+    last_visit REAL,
+    last_hash TEXT,
+    last_findings TEXT NOT NULL DEFAULT '[]',
+    history TEXT NOT NULL DEFAULT '[]',
+    visits INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    new_findings INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+COLUMNS = ('source', 'interval', 'next_visit', 'last_visit', 'last_hash', 'last_findings',
+           'history', 'visits', 'changes', 'new_findings')
+
+DAY = 86400.0
+# Finding fingerprints kept per source to tell new findings from repeats
+MAX_FINGERPRINTS = 5000
+
+
+def content_hash(text: str) -> str:
+    """Hash of page text, ignoring differences in whitespace"""
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+@dataclass
+class SourceSchedule:
+    """Revisit state of one source
+
+    `history` holds [visited_at, seconds_since_previous_visit, changed,
+    new_findings] for the most recent visits that had a previous visit to
+    compare with.
+    """
+    source: str
+    interval: float
+    next_visit: Optional[float] = None
+    last_visit: Optional[float] = None
+    last_hash: Optional[str] = None
+    last_findings: List[str] = field(default_factory=list)
+    history: List[List[float]] = field(default_factory=list)
+    visits: int = 0
+    changes: int = 0
+    new_findings: int = 0
+
+    def change_rate(self) -> Optional[float]:
+        """Estimated changes per second, None without enough history
+
+        A page checked n times at a mean gap of t, found changed X times,
+        changes at about -ln((n - X + 0.5) / (n + 0.5)) / t per second if
+        changes arrive as a Poisson process. This corrects for changes that
+        a single check cannot see, which the plain X / (n * t) misses.
+        """
+        n = len(self.history)
+        if not n:
+            return None
+        changed = sum(1 for entry in self.history if entry[2])
+        mean_gap = sum(entry[1] for entry in self.history) / n
+        if mean_gap <= 0:
+            return None
+        return -math.log((n - changed + 0.5) / (n + 0.5)) / mean_gap
+
+    def mean_new_findings(self) -> float:
+        if not self.history:
+            return 0.0
+        return sum(entry[3] for entry in self.history) / len(self.history)
+
+    def actual_rate(self) -> Optional[float]:
+        """Visits per second over the recorded history"""
+        if not self.history:
+            return None
+        first = self.history[0][0] - self.history[0][1]
+        span = self.history[-1][0] - first
+        return len(self.history) / span if span > 0 else None
+
+    def to_dict(self) -> Dict:
+        change_rate = self.change_rate()
+        actual_rate = self.actual_rate()
+        return {
+            'source': self.source,
+            'interval': round(self.interval, 1),
+            'planned_per_day': round(DAY / self.interval, 2),
+            'actual_per_day': round(actual_rate * DAY, 2) if actual_rate else None,
+            'changes_per_day': round(change_rate * DAY, 2) if change_rate is not None else None,
+            'visits': self.visits,
+            'changes': self.changes,
+            'new_findings': self.new_findings,
+            'last_visit': _iso(self.last_visit),
+            'next_visit': _iso(self.next_visit),
+        }
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class RevisitScheduler:
+    """Change-rate-aware revisit intervals per source
+
+    Every visit records a hash of the page text and the findings on it. From
+    the last REVISIT_HISTORY visits each source gets an estimated change
+    rate; once it has REVISIT_MIN_VISITS compared visits, its share of the
+    visit budget is proportional to
+
+        change rate * (1 + REVISIT_YIELD_WEIGHT * ln(1 + new findings per visit))
+
+    The budget is what a fixed schedule would spend: one visit per source
+    every MONITORING_INTERVAL. Sources still learning keep that interval;
+    the others split the rest. Intervals are kept between
+    REVISIT_MIN_INTERVAL and REVISIT_MAX_INTERVAL, so a static mirror is
+    still checked now and then and a busy board is not hammered. Records
+    are written through to SQLite, opened on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize scheduler"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.path = path or self.config.REVISIT_DB
+        self.base_interval = float(self.config.MONITORING_INTERVAL)
+        self.min_interval = self.config.REVISIT_MIN_INTERVAL
+        self.max_interval = max(self.min_interval, self.config.REVISIT_MAX_INTERVAL)
+        self.history_size = self.config.REVISIT_HISTORY
+        self.min_visits = self.config.REVISIT_MIN_VISITS
+        self.yield_weight = self.config.REVISIT_YIELD_WEIGHT
+        self.conn: Optional[sqlite3.Connection] = None
+        self._sources: Optional[Dict[str, SourceSchedule]] = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            db_dir = os.path.dirname(self.path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+        return self.conn
+
+    def _all(self) -> Dict[str, SourceSchedule]:
+        # Few sources and every replan touches all of them, so they are all cached
+        if self._sources is None:
+            self._sources = {}
+            for row in self._connect().execute('SELECT * FROM sources'):
+                values = dict(row)
+                values['last_findings'] = json.loads(values['last_findings'])
+                values['history'] = json.loads(values['history'])
+                self._sources[values['source']] = SourceSchedule(**values)
+        return self._sources
+
+    def _save(self, records: Iterable[SourceSchedule]):
+        rows = []
+        for record in records:
+            values = [getattr(record, column) for column in COLUMNS]
+            values[COLUMNS.index('last_findings')] = json.dumps(record.last_findings)
+            values[COLUMNS.index('history')] = json.dumps(record.history)
+            rows.append(values)
+        with self._connect():
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO sources ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows
+            )
+
+    def get(self, source: str) -> Optional[SourceSchedule]:
+        """Schedule of a source, None if it was never visited"""
+        with self._lock:
+            return self._all().get(source)
+
+    def is_due(self, source: str, now: Optional[float] = None) -> bool:
+        """True if the source was never visited or its next visit has come"""
+        record = self.get(source)
+        if record is None or record.next_visit is None:
+            return True
+        # A second of slack so a daemon woken for this visit does not just miss it
+        return record.next_visit <= (now or time.time()) + 1.0
+
+    def due(self, sources: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """The sources that are due for a visit"""
+        now = now or time.time()
+        return [source for source in sources if self.is_due(source, now)]
+
+    def seconds_until_due(self, sources: Iterable[str], now: Optional[float] = None) -> float:
+        """Seconds until the first of the sources is due (0 if one is due now)"""
+        now = now or time.time()
+        waits = []
+        for source in sources:
+            record = self.get(source)
+            if record is None or record.next_visit is None:
+                return 0.0
+            waits.append(record.next_visit - now)
+        return max(0.0, min(waits)) if waits else 0.0
+
+    def record_visit(self, source: str, page_hash: str,
+                     findings: Iterable[Dict] = (),
+                     now: Optional[float] = None) -> SourceSchedule:
+        """Record a visit with the page's content hash and finding dictionaries
+
+        Every source's interval is planned again, since they share one budget.
+        """
+        now = now or time.time()
+        fingerprints = list(dict.fromkeys(finding_fingerprint(f) for f in findings))
+        with self._lock:
+            sources = self._all()
+            record = sources.get(source)
+            if record is None:
+                record = sources[source] = SourceSchedule(source, self.base_interval)
+            if record.last_visit is not None and now > record.last_visit:
+                seen = set(record.last_findings)
+                new = sum(1 for fp in fingerprints if fp not in seen)
+                changed = page_hash != record.last_hash
+                record.history.append([now, now - record.last_visit, int(changed), new])
+                del record.history[:-self.history_size]
+                record.changes += changed
+                record.new_findings += new
+            record.visits += 1
+            record.last_visit = now
+            record.last_hash = page_hash
+            record.last_findings = fingerprints[:MAX_FINGERPRINTS]
+            self._plan(sources.values())
+            self._save(sources.values())
+            return record
+
+    def _plan(self, records: Iterable[SourceSchedule]):
+        records = list(records)
+        budget = len(records) / self.base_interval
+        scores: Dict[str, float] = {}
+        for record in records:
+            rate = record.change_rate() if len(record.history) >= self.min_visits else None
+            if rate is None:
+                record.interval = self.base_interval
+                budget -= 1 / self.base_interval
+            else:
+                scores[record.source] = rate * (1 + self.yield_weight * math.log1p(record.mean_new_findings()))
+        
+        # Sources pinned to a bound spend their visits first; the rest share what is left
+        intervals: Dict[str, float] = {}
+        while len(intervals) < len(scores):
+            free = {source: score for source, score in scores.items() if source not in intervals}
+            total = sum(free.values())
+            pinned = {}
+            for source, score in free.items():
+                share = budget * score / total if total > 0 and budget > 0 else 0
+                interval = 1 / share if share > 0 else self.max_interval
+                if interval >= self.max_interval:
+                    pinned[source] = self.max_interval
+                elif interval <= self.min_interval:
+                    pinned[source] = self.min_interval
+            if not pinned:
+                for source, score in free.items():
+                    intervals[source] = total / (budget * score)
+                break
+            intervals.update(pinned)
+            budget -= sum(1 / interval for interval in pinned.values())
+        
+        for record in records:
+            if record.source in intervals:
+                record.interval = intervals[record.source]
+            if record.last_visit is not None:
+                record.next_visit = record.last_visit + record.interval
+    
+    def schedules(self) -> List[SourceSchedule]:
+        """All source schedules, soonest next visit first"""
+        with self._lock:
+            records = list(self._all().values())
+        return sorted(records, key=lambda r: (r.next_visit or 0, r.source))
+
+    def report(self, sources: Optional[Iterable[str]] = None) -> Dict:
+        """Planned and actual revisit rates per source, and in total
+
+        `fixed_per_day` is what one visit per MONITORING_INTERVAL would cost
+        for the same sources.
+        """
+        records = self.schedules()
+        if sources is not None:
+            wanted = set(sources)
+            records = [r for r in records if r.source in wanted]
+        rows = [r.to_dict() for r in records]
+        return {
+            'planned_per_day': round(sum(row['planned_per_day'] for row in rows), 2),
+            'actual_per_day': round(sum(row['actual_per_day'] or 0 for row in rows), 2),
+            'fixed_per_day': round(len(rows) * DAY / self.base_interval, 2),
+            'sources': rows,
+        }
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
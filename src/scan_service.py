@@ -0,0 +1,368 @@
+"""
+Scan Service module
+Long-lived local HTTP service that scans submitted text with the compiled
+pattern set on a worker pool
+"""
+
+import re
+import json
+import time
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple, Iterator
+from pattern_scanner import PatternScanner
+from metrics import get_metrics
+from config import get_config
+from logger import get_logger
+
+
+_worker_scanner: Optional[PatternScanner] = None
+
+
+def _init_worker(pattern_specs: Dict[str, Tuple[str, int]]):
+    """Compile the service's pattern set once per worker process"""
+    global _worker_scanner
+    _worker_scanner = PatternScanner()
+    _worker_scanner.patterns = {
+        name: re.compile(pattern, flags) for name, (pattern, flags) in pattern_specs.items()
+    }
+
+
+def _scan_in_worker(text: str, source: str) -> List[Dict]:
+    """Scan one text inside a worker process"""
+    return [r.to_dict() for r in _worker_scanner.scan_text(text, source)]
+
+
+class RequestError(Exception):
+    """Malformed request; answered with the given HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ScanService:
+    """HTTP front end for a warm PatternScanner
+
+    Endpoints (all JSON):
+
+    - POST /scan: {"text", "source"} or a raw text/plain body; returns
+      {"findings", "seconds"}
+    - POST /scan/batch: {"items": [{"id", "text", "source"}, ...]}; the items
+      are scanned concurrently and returned in request order as
+      {"results": [{"id", "findings"}, ...], "seconds"}
+    - POST /scan/stream: NDJSON body, one item per line, Content-Length or
+      chunked; NDJSON results are streamed back as items finish, at most
+      2 x workers in flight, followed by a {"done", "seconds"} line
+    - GET /health, GET /patterns, GET /metrics (Prometheus)
+
+    Every scan response carries its server-side latency in "seconds" and
+    the X-Scan-Seconds header; latencies also go to the
+    darkwalker_service_request_seconds histogram. Patterns are compiled once
+    at start-up, in each worker process when use_processes is set, so
+    clients never pay for loading them.
+    """
+
+    def __init__(self, scanner: Optional[PatternScanner] = None,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 workers: Optional[int] = None, use_processes: Optional[bool] = None):
+        """Initialize service"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.metrics = get_metrics()
+        self.scanner = scanner or PatternScanner()
+        self.workers = max(1, workers or self.config.SCAN_SERVICE_WORKERS)
+        self.use_processes = (self.config.SCAN_SERVICE_USE_PROCESSES
+                              if use_processes is None else use_processes)
+        self.max_body = self.config.SCAN_SERVICE_MAX_BODY
+        self.max_batch = self.config.SCAN_SERVICE_MAX_BATCH
+        self.executor: Optional[Executor] = None
+        self.started_at: Optional[float] = None
+        self.requests = 0
+        self.items = 0
+        self._lock = threading.Lock()
+        self._latency = self.metrics.histogram(
+            'darkwalker_service_request_seconds', 'Scan service request latency',
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+        )
+        self.httpd = ThreadingHTTPServer(
+            (host or self.config.SCAN_SERVICE_HOST,
+             self.config.SCAN_SERVICE_PORT if port is None else port),
+            self._handler_class()
+        )
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, background: bool = True) -> 'ScanService':
+        """Start the worker pool and serve, in a thread unless background is False"""
+        if self.use_processes:
+            pattern_specs = {
+                name: (regex.pattern, regex.flags) for name, regex in self.scanner.patterns.items()
+            }
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(pattern_specs,)
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scan')
+        self.started_at = time.monotonic()
+        self.logger.info("Scan service on %s: %d patterns, %d %s workers", self.url,
+                         len(self.scanner.patterns), self.workers,
+                         'process' if self.use_processes else 'thread')
+        if background:
+            self.thread = threading.Thread(target=self.httpd.serve_forever, name='scan-service', daemon=True)
+            self.thread.start()
+        else:
+            self.httpd.serve_forever()
+        return self
+
+    def stop(self):
+        """Stop serving and shut the worker pool down"""
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.httpd.server_close()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def submit(self, text: str, source: str) -> Future:
+        """Scan text on the worker pool"""
+        if self.use_processes:
+            return self.executor.submit(_scan_in_worker, text, source)
+        return self.executor.submit(
+            lambda: [r.to_dict() for r in self.scanner.scan_text(text, source)]
+        )
+
+    def health(self) -> Dict:
+        """Service status"""
+        with self._lock:
+            requests, items = self.requests, self.items
+        return {
+            'status': 'ok',
+            'patterns': len(self.scanner.patterns),
+            'workers': self.workers,
+            'processes': self.use_processes,
+            'uptime': round(time.monotonic() - self.started_at, 3) if self.started_at else 0.0,
+            'requests': requests,
+            'items': items,
+        }
+
+    def _count(self, endpoint: str, items: int, started: float) -> float:
+        seconds = time.monotonic() - started
+        self._latency.observe(seconds, endpoint=endpoint)
+        with self._lock:
+            self.requests += 1
+            self.items += items
+        return round(seconds, 6)
+
+    @staticmethod
+    def _item(entry, index: int) -> Tuple[object, str, str]:
+        if not isinstance(entry, dict) or not isinstance(entry.get('text'), str):
+            raise RequestError(400, f"item {index} needs a 'text' string")
+        item_id = entry.get('id', index)
+        return item_id, entry['text'], str(entry.get('source') or f"service:{item_id}")
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; without this, keep-alive
+            # clients wait out the peer's delayed ACK on every response
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/health':
+                    self._send_json(200, service.health())
+                elif path == '/patterns':
+                    self._send_json(200, {'patterns': service.scanner.get_patterns()})
+                elif path == '/metrics':
+                    body = service.metrics.render_prometheus().encode('utf-8')
+                    self._send(200, body, 'text/plain; version=0.0.4; charset=utf-8')
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                started = time.monotonic()
+                try:
+                    if path == '/scan':
+                        self._scan_one(started)
+                    elif path == '/scan/batch':
+                        self._scan_batch(started)
+                    elif path == '/scan/stream':
+                        self._scan_stream(started)
+                    else:
+                        self._discard_body()
+                        self._send_json(404, {'error': 'not found'})
+                except RequestError as e:
+                    self.close_connection = True
+                    self._send_json(e.status, {'error': str(e)})
+                except Exception as e:
+                    service.logger.error("Scan service error on %s: %s", path, e)
+                    self.close_connection = True
+                    self._send_json(500, {'error': 'internal error'})
+
+            def _scan_one(self, started: float):
+                body = self._read_body()
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    try:
+                        item_id, text, source = service._item(json.loads(body), 0)
+                    except ValueError:
+                        raise RequestError(400, 'invalid JSON')
+                else:
+                    text, source = body.decode('utf-8', errors='replace'), 'service:0'
+                findings = service.submit(text, source).result()
+                seconds = service._count('scan', 1, started)
+                self._send_json(200, {'findings': findings, 'seconds': seconds}, seconds)
+
+            def _scan_batch(self, started: float):
+                try:
+                    payload = json.loads(self._read_body())
+                except ValueError:
+                    raise RequestError(400, 'invalid JSON')
+                entries = payload.get('items') if isinstance(payload, dict) else None
+                if not isinstance(entries, list):
+                    raise RequestError(400, "body needs an 'items' list")
+                if len(entries) > service.max_batch:
+                    raise RequestError(413, f"at most {service.max_batch} items per batch")
+                items = [service._item(entry, i) for i, entry in enumerate(entries)]
+                futures = [(item_id, service.submit(text, source)) for item_id, text, source in items]
+                results = [{'id': item_id, 'findings': future.result()} for item_id, future in futures]
+                seconds = service._count('batch', len(items), started)
+                self._send_json(200, {'results': results, 'seconds': seconds}, seconds)
+
+            def _scan_stream(self, started: float):
+                """Scan NDJSON lines as they arrive and stream results back"""
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                in_flight: List[Tuple[object, Future]] = []
+                count = 0
+                trailer: Dict = {}
+                try:
+                    for index, line in enumerate(self._body_lines()):
+                        if not line.strip():
+                            continue
+                        try:
+                            item_id, text, source = service._item(json.loads(line), index)
+                        except (ValueError, RequestError) as e:
+                            error = 'invalid JSON' if isinstance(e, ValueError) else str(e)
+                            self._write_chunk({'id': index, 'error': error})
+                            continue
+                        in_flight.append((item_id, service.submit(text, source)))
+                        count += 1
+                        # Bounded in-flight work: answer the oldest item before reading on
+                        while len(in_flight) >= 2 * service.workers or (in_flight and in_flight[0][1].done()):
+                            self._write_result(*in_flight.pop(0))
+                except RequestError as e:
+                    # Headers are already sent, so the error goes into the stream
+                    trailer['error'] = str(e)
+                    self.close_connection = True
+                for item_id, future in in_flight:
+                    self._write_result(item_id, future)
+
+                seconds = service._count('stream', count, started)
+                self._write_chunk(dict(trailer, done=count, seconds=seconds))
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _write_result(self, item_id, future: Future):
+                self._write_chunk({'id': item_id, 'findings': future.result()})
+
+            def _write_chunk(self, record: Dict):
+                data = (json.dumps(record) + '\n').encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+            def _read_body(self) -> bytes:
+                if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+                    return b''.join(self._chunks())
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > service.max_body:
+                    raise RequestError(413, f"body larger than {service.max_body} bytes")
+                return self.rfile.read(length)
+
+            def _discard_body(self):
+                if self.headers.get('Content-Length') or self.headers.get('Transfer-Encoding'):
+                    self.close_connection = True
+
+            def _chunks(self) -> Iterator[bytes]:
+                """Decode a chunked request body as it arrives"""
+                total = 0
+                while True:
+                    size_line = self.rfile.readline(1024)
+                    try:
+                        size = int(size_line.split(b';')[0].strip(), 16)
+                    except ValueError:
+                        raise RequestError(400, 'bad chunk size')
+                    if size == 0:
+                        while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                            pass
+                        return
+                    total += size
+                    if total > service.max_body:
+                        raise RequestError(413, f"body larger than {service.max_body} bytes")
+                    data = self.rfile.read(size)
+                    self.rfile.readline(1024)
+                    yield data
+
+            def _body_lines(self) -> Iterator[bytes]:
+                """Request body split into lines without reading it all first"""
+                if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+                    pending = b''
+                    for chunk in self._chunks():
+                        pending += chunk
+                        *lines, pending = pending.split(b'\n')
+                        yield from lines
+                    if pending:
+                        yield pending
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > service.max_body:
+                    raise RequestError(413, f"body larger than {service.max_body} bytes")
+                while length > 0:
+                    line = self.rfile.readline(min(length, service.max_body))
+                    if not line:
+                        return
+                    length -= len(line)
+                    yield line
+
+            def _send_json(self, status: int, payload: Dict, seconds: Optional[float] = None):
+                self._send(status, json.dumps(payload).encode('utf-8'), 'application/json', seconds)
+
+            def _send(self, status: int, body: bytes, content_type: str,
+                      seconds: Optional[float] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if seconds is not None:
+                    self.send_header('X-Scan-Seconds', f"{seconds:.6f}")
+                if self.close_connection:
+                    self.send_header('Connection', 'close')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,270 @@
+"""
+Sharding module
+Host-affine work partitioning for multi-worker crawls over a shared SQLite queue
+"""
+
+import os
+import time
+import socket
+import bisect
+import hashlib
+import sqlite3
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Iterable
+from config import get_config
+from logger import get_logger
+
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    host TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    claimed_at REAL,
+    finished_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    findings INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_tasks_status_host ON tasks(status, host);
+"""
+
+
+def url_host(url: str) -> str:
+    """Get the host used for partitioning a URL"""
+    return (urlparse(url).hostname or url).lower()
+
+
+def default_worker_id() -> str:
+    """Build a worker id unique across machines sharing a queue"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class HashRing:
+    """Consistent hash ring mapping hosts to workers"""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 64):
+        """Initialize ring with virtual nodes per worker"""
+        self.vnodes = vnodes
+        self._ring: List[tuple] = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in set(nodes)
+            for i in range(vnodes)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def owner(self, host: str) -> Optional[str]:
+        """Get the worker that owns a host"""
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, self._hash(host)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class WorkQueue:
+    """SQLite-backed work queue shared by crawl workers"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize queue"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.db_path = db_path or self.config.WORK_QUEUE_DB
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(QUEUE_SCHEMA)
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        """Add URLs to the queue, ignoring ones already queued"""
+        rows = [(url, url_host(url)) for url in urls if url]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO tasks (url, host) VALUES (?, ?)', rows
+            )
+            added = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def requeue_done(self) -> int:
+        """Reset finished tasks to pending for the next sweep"""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'pending', owner = NULL WHERE status IN ('done', 'failed')"
+        )
+        return cursor.rowcount
+
+    def register(self, worker_id: str):
+        """Register or refresh a worker"""
+        now = time.time()
+        self.conn.execute(
+            'INSERT INTO workers (id, started_at, heartbeat) VALUES (?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET heartbeat = excluded.heartbeat',
+            (worker_id, now, now)
+        )
+
+    def deregister(self, worker_id: str):
+        """Remove a worker so its hosts move to the remaining workers"""
+        self.conn.execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+        self.conn.execute(
+            "UPDATE tasks SET status = 'pending', owner = NULL "
+            "WHERE status = 'claimed' AND owner = ?",
+            (worker_id,)
+        )
+
+    def live_workers(self) -> List[str]:
+        """Get workers with a recent heartbeat"""
+        cutoff = time.time() - self.config.WORKER_HEARTBEAT_TTL
+        rows = self.conn.execute(
+            'SELECT id FROM workers WHERE heartbeat >= ? ORDER BY id', (cutoff,)
+        ).fetchall()
+        return [row['id'] for row in rows]
+
+    def claim(self, worker_id: str, ring: HashRing, limit: int = 10) -> List[Dict]:
+        """Claim pending tasks whose host this worker owns"""
+        lease_cutoff = time.time() - self.config.WORKER_LEASE_SECONDS
+
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            hosts = [
+                row['host'] for row in self.conn.execute(
+                    "SELECT DISTINCT host FROM tasks WHERE status = 'pending' "
+                    "OR (status = 'claimed' AND claimed_at < ?)",
+                    (lease_cutoff,)
+                )
+            ]
+            mine = [host for host in hosts if ring.owner(host) == worker_id]
+            if not mine:
+                self.conn.execute('COMMIT')
+                return []
+
+            placeholders = ','.join('?' * len(mine))
+            rows = self.conn.execute(
+                f"SELECT id, url, host FROM tasks WHERE host IN ({placeholders}) "
+                f"AND (status = 'pending' OR (status = 'claimed' AND claimed_at < ?)) "
+                f"ORDER BY host, id LIMIT ?",
+                (*mine, lease_cutoff, limit)
+            ).fetchall()
+
+            now = time.time()
+            self.conn.executemany(
+                "UPDATE tasks SET status = 'claimed', owner = ?, claimed_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker_id, now, row['id']) for row in rows]
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+        return [dict(row) for row in rows]
+
+    def complete(self, task_id: int, findings: int = 0, failed: bool = False):
+        """Mark a task as done or failed"""
+        self.conn.execute(
+            'UPDATE tasks SET status = ?, finished_at = ?, findings = ? WHERE id = ?',
+            ('failed' if failed else 'done', time.time(), findings, task_id)
+        )
+
+    def stats(self) -> Dict:
+        """Get queue statistics"""
+        counts = {
+            row['status']: row['n'] for row in self.conn.execute(
+                'SELECT status, COUNT(*) AS n FROM tasks GROUP BY status'
+            )
+        }
+        per_worker = {
+            row['owner']: row['n'] for row in self.conn.execute(
+                "SELECT owner, COUNT(*) AS n FROM tasks WHERE status = 'done' GROUP BY owner"
+            )
+        }
+        return {
+            'tasks': counts,
+            'live_workers': self.live_workers(),
+            'done_per_worker': per_worker,
+        }
+
+    def close(self):
+        """Close database connection"""
+        self.conn.close()
+
+
+class ShardedWorker:
+    """Crawl worker processing the hosts it owns on the shared hash ring"""
+
+    def __init__(self, monitor, queue: WorkQueue, worker_id: Optional[str] = None):
+        """Initialize worker around a DarkWebMonitor"""
+        self.config = get_config()
+        self.logger = get_logger()
+        self.monitor = monitor
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.processed = 0
+
+    def _ring(self) -> HashRing:
+        """Build the ring from currently live workers"""
+        return HashRing(self.queue.live_workers())
+
+    def run(self, once: bool = False, max_tasks: Optional[int] = None) -> int:
+        """Process owned tasks until stopped (or until idle when once=True)"""
+        self.queue.register(self.worker_id)
+        self.logger.info(f"Worker {self.worker_id} joined the work queue")
+
+        try:
+            while max_tasks is None or self.processed < max_tasks:
+                self.queue.register(self.worker_id)
+                limit = self.config.WORKER_BATCH_SIZE
+                if max_tasks is not None:
+                    limit = min(limit, max_tasks - self.processed)
+                tasks = self.queue.claim(self.worker_id, self._ring(), limit)
+
+                if not tasks:
+                    if once:
+                        break
+                    time.sleep(self.config.WORKER_POLL_INTERVAL)
+                    continue
+
+                for task in tasks:
+                    self._process(task)
+        finally:
+            self.queue.deregister(self.worker_id)
+            self.logger.info(f"Worker {self.worker_id} left after {self.processed} tasks")
+
+        return self.processed
+
+    def _process(self, task: Dict):
+        """Monitor one task URL and record its outcome"""
+        self.queue.register(self.worker_id)
+        # A task is a fresh visit: a URL fetched in an earlier sweep must be
+        # fetched again, and the visited list must not grow for the worker's life
+        self.monitor.crawler.clear_visited()
+        try:
+            results = self.monitor.monitor_specific_site(task['url'])
+            self.queue.complete(
+                task['id'],
+                findings=len(results.get('findings', [])),
+                failed=results.get('status') != 'success'
+            )
+        except Exception as e:
+            self.logger.error(f"Worker {self.worker_id} failed on {task['url']}: {str(e)}")
+            self.queue.complete(task['id'], failed=True)
+        self.processed += 1
@@ -0,0 +1,143 @@
+"""
+Text Normalizer module
+Single-pass normalization of page text before scanning (NFKC, zero-width
+stripping, de-obfuscation) with an offset map back to the original
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+# Invisible characters used to break up indicators (soft hyphen included)
+ZERO_WIDTH = frozenset('\u00ad\u180e\u200b\u200c\u200d\u2060\ufeff')
+
+_OPEN = r'[\[\(\{\uff3b\uff08\uff5b]'
+_CLOSE = r'[\]\)\}\uff3d\uff09\uff5d]'
+
+_OPENERS = frozenset('[({\uff3b\uff08\uff5b')
+_CLOSERS = frozenset('])}\uff3d\uff09\uff5d')
+
+# Bracketed "at"/"dot"/":" and "hxxp". Matches start at a bracket or an h so
+# the regex engine can skip ahead; case is spelled out and there are no
+# groups, since IGNORECASE and capture groups both disable that skip
+_OBFUSCATIONS = (
+    rf'{_OPEN}[ \t]*(?:[aA][tT]|@|[dD][oO][tT]|\.)[ \t]*{_CLOSE}[ \t]*'
+    rf'|{_OPEN}:{_CLOSE}'
+    r'|[hH][xX][xX][pP](?=[sS]?(?::|\[:\])//)'
+)
+_ASCII_TOKENS = re.compile(_OBFUSCATIONS)
+# Runs of non-ASCII characters are folded in the same scan
+_TOKENS = re.compile(_OBFUSCATIONS + r'|[^\x00-\x7f]+')
+_REPLACEMENTS = {'at': '@', '@': '@', 'dot': '.', '.': '.', ':': ':'}
+
+
+def _replacement(token: str) -> Optional[str]:
+    """What an obfuscation token stands for, None for a non-ASCII run"""
+    if token[0] in 'hH':
+        return 'http'
+    token = token.rstrip(' \t')
+    if token[0] in _OPENERS and token[-1] in _CLOSERS:
+        return _REPLACEMENTS.get(token[1:-1].strip(' \t').lower())
+    return None
+
+
+@lru_cache(maxsize=4096)
+def fold_char(char: str) -> str:
+    """NFKC form of one character, empty for zero-width characters"""
+    if char in ZERO_WIDTH:
+        return ''
+    return unicodedata.normalize('NFKC', char)
+
+
+@dataclass
+class NormalizedText:
+    """Normalized text and where its characters came from
+
+    The offset map is piecewise linear: `starts[i]` in the normalized text
+    corresponds to `origins[i]` in the original, and following characters
+    advance together until the next breakpoint. Breakpoints are only added
+    where a replacement changes the length, so plain text has one.
+    """
+    text: str
+    starts: Optional[array] = None
+    origins: Optional[array] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.starts is not None
+
+    def to_original(self, pos: int) -> int:
+        """Original offset of a normalized offset"""
+        if self.starts is None:
+            return pos
+        i = bisect_right(self.starts, pos) - 1
+        return self.origins[i] + pos - self.starts[i]
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Original span of a normalized span"""
+        if self.starts is None:
+            return start, end
+        return self.to_original(start), self.to_original(end)
+
+
+def normalize_text(text: str) -> NormalizedText:
+    """Normalize text in one pass for scanning
+
+    - NFKC folds full-width digits and letters, ligatures and similar
+      compatibility characters (per character, so combining marks are left
+      as they are)
+    - zero-width characters and soft hyphens are removed
+    - "[at]", "(at)", "{at}", "[@]" become "@", "[dot]", "(.)" and similar
+      become ".", "[:]" becomes ":" and "hxxp://" becomes "http://"
+
+    Text that needs none of this is returned as is with an identity map.
+    """
+    matches = (_ASCII_TOKENS if text.isascii() else _TOKENS).finditer(text)
+    first = next(matches, None)
+    if first is None:
+        return NormalizedText(text)
+
+    parts = []
+    starts = array('q')
+    origins = array('q')
+    length = 0
+    delta = None
+
+    def emit(piece: str, origin: int):
+        nonlocal length, delta
+        if not piece:
+            return
+        if origin - length != delta:
+            starts.append(length)
+            origins.append(origin)
+            delta = origin - length
+        parts.append(piece)
+        length += len(piece)
+
+    pos = 0
+    match = first
+    while match is not None:
+        token = match.group()
+        replacement = _replacement(token)
+        gap = text[pos:match.start()]
+        if replacement in ('@', '.'):
+            # "user [at] domain" -> "user@domain"
+            gap = gap.rstrip(' \t')
+        emit(gap, pos)
+        if replacement is None:
+            for offset, char in enumerate(token, match.start()):
+                emit(fold_char(char), offset)
+        else:
+            emit(replacement, match.start())
+        pos = match.end()
+        match = next(matches, None)
+    emit(text[pos:], pos)
+    # Offsets at or past the end map to the end of the original
+    starts.append(length)
+    origins.append(len(text))
+    return NormalizedText(''.join(parts), starts, origins)
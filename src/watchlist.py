@@ -0,0 +1,30 @@
+"""
+Watchlist module
+Watchlist terms (ALERT_WATCHLIST, ALERT_WATCHLIST_FILE) compiled into one regex,
+shared by alert rules and the scanner's over-budget fallback
+"""
+
+import re
+from typing import List, Optional, Iterable, Pattern
+from config import get_config
+
+
+def load_watchlist(path: str) -> List[str]:
+    """Watchlist terms from a file, one per line (# starts a comment)"""
+    with open(path, encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+
+def watchlist_regex(watchlist: Optional[Iterable[str]] = None) -> Optional[Pattern]:
+    """One case-insensitive alternation of the watchlist terms, None if there are none
+
+    Defaults to ALERT_WATCHLIST plus the terms in ALERT_WATCHLIST_FILE.
+    """
+    if watchlist is None:
+        config = get_config()
+        watchlist = list(config.ALERT_WATCHLIST)
+        if config.ALERT_WATCHLIST_FILE:
+            watchlist += load_watchlist(config.ALERT_WATCHLIST_FILE)
+    # Longest first, so a term wins over its own prefix
+    terms = sorted({term.lower() for term in watchlist if term}, key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE) if terms else None
@@ -4,16 +4,74 @@ Unit tests for the Dark Web Monitoring Tool
 
 import unittest
 import json
+import logging
 import os
+import subprocess
 import sys
+import tempfile
+import threading
+import time
+import http.client
+import itertools
 from datetime import datetime
 from pathlib import Path
+from unittest import mock
 
-# Add src to path
+# Keep test logs out of the repository (config reads LOG_FILE at import)
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.mkdtemp(prefix='darkwalker-logs-'), 'test.log'))
+
+# Add src and benchmarks to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
 
 from pattern_scanner import PatternScanner, ScanResult
 from dark_web_crawler import DarkWebCrawler
+from findings_store import FindingsStore
+from result_sink import create_sink, TRAILER_MARKER
+from compaction import ResultsCompactor
+from pipeline import Pipeline, Stage
+from sharding import HashRing, WorkQueue, ShardedWorker
+from metrics import MetricsRegistry, MetricsServer, LabelLimiter, get_metrics
+from profiler import ScanProfiler, growth_exponent, profile_corpus
+from page_archive import PageArchive
+from query_planner import QueryPlanner, extract_ahmia_links
+from host_health import HostHealthTracker
+from retry_queue import RetryQueue, RetryPolicy
+from link_graph import LinkGraph, onion_hosts
+from scan_service import ScanService
+from memory_governor import MemoryGovernor, SpillList
+from match_validator import MatchValidator
+from text_normalizer import normalize_text
+from alert_outbox import AlertOutbox, AlertRules
+from revisit_scheduler import RevisitScheduler
+from config import Config
+from logger import get_logger, JsonFormatter, RateLimitFilter
+from monitor import DarkWebMonitor
+from synthetic_corpus import SyntheticCorpus
+from run_benchmarks import compare
+from load_test import run_load
+from mock_onion import MockOnionNetwork, MockOnionServer, SocksProxy
+from mock_webhook import MockWebhookServer
+
+
+def make_monitor(results_dir, **overrides):
+    """Create a monitor writing into a temporary results directory"""
+    settings = {
+        'RESULTS_DIR': results_dir,
+        'FINDINGS_DB': os.path.join(results_dir, 'findings.db'),
+        'CHECKPOINT_FILE': os.path.join(results_dir, 'checkpoint.json'),
+        'HOST_HEALTH_DB': os.path.join(results_dir, 'host_health.db'),
+        'LINK_GRAPH_DB': os.path.join(results_dir, 'link_graph.db'),
+        'ALERT_OUTBOX_DB': os.path.join(results_dir, 'alerts.db'),
+        'REVISIT_DB': os.path.join(results_dir, 'revisits.db'),
+        'COMPACT_EVERY_CYCLE': False,
+    }
+    settings.update(overrides)
+    with mock.patch.multiple(Config, **settings):
+        monitor = DarkWebMonitor()
+    for key, value in settings.items():
+        setattr(monitor.config, key, value)
+    return monitor
 
 
 class TestPatternScanner(unittest.TestCase):
@@ -89,6 +147,172 @@ class TestPatternScanner(unittest.TestCase):
         self.assertEqual(result_dict['source_url'], 'http://test.onion')
 
 
+class TestMatchValidator(unittest.TestCase):
+    """Test cases for MatchValidator"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.validator = MatchValidator(min_confidence=0.3, tld_file='')
+
+    def test_bitcoin_checksums(self):
+        """Test Base58Check and Bech32 checksums decide bitcoin confidence"""
+        validate = self.validator.validate
+        self.assertEqual(validate('bitcoin', '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa'), 1.0)
+        self.assertEqual(validate('bitcoin', 'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4'), 1.0)
+        self.assertEqual(validate('bitcoin', 'bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0'), 1.0)
+        # Well-formed with a bad checksum is downgraded, onion name fragments are dropped
+        self.assertEqual(validate('bitcoin', '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNb'), MatchValidator.BAD_CHECKSUM)
+        self.assertIsNone(validate('bitcoin', '3vh6xsxvxtzwy3vdbx2wj4lukdow3lix7ho6vx2sjnaaeo5fmulq6q'))
+
+    def test_addresses_domains_and_tokens(self):
+        """Test IP classes, TLDs, entropy and Luhn"""
+        validate = self.validator.validate
+        self.assertEqual(validate('ip_address', '8.8.8.8'), 1.0)
+        self.assertEqual(validate('ip_address', '10.0.0.1'), MatchValidator.PRIVATE_ADDRESS)
+        self.assertEqual(validate('ip_address', '203.0.113.5'), MatchValidator.RESERVED_ADDRESS)
+        self.assertIsNone(validate('ip_address', '0.0.0.0'))
+        self.assertEqual(validate('email', 'admin@mail.ru'), 1.0)
+        self.assertEqual(validate('email', 'admin@abcdef.onion'), 1.0)
+        self.assertIsNone(validate('email', 'logo@2x.png'))
+        self.assertIsNone(validate('email', 'admin@host.zzqq'))
+        self.assertEqual(validate('api_key', 'secret=9fK2mQ7xL0pZr4Tb8WcY1sDe'), 1.0)
+        self.assertIsNone(validate('api_key', 'api_key=aaaaaaaaaaaaaaaaaaaaaaaa'))
+        self.assertIsNone(validate('api_key', 'token: "YOUR_API_KEY_GOES_HERE_1234"'))
+        self.assertEqual(validate('credit_card', '4111 1111 1111 1111'), 1.0)
+        self.assertIsNone(validate('credit_card', '4111 1111 1111 1112'))
+        self.assertEqual(validate('url', 'http://anything.onion'), 1.0)
+
+    def test_scanner_drops_and_scores_matches(self):
+        """Test the scanner attaches confidence and skips rejected matches"""
+        text = "pay 1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa from 10.0.0.1, icon logo@2x.png, bind 0.0.0.0"
+        results = PatternScanner(validator=self.validator).scan_text(text, 'test_url')
+        found = {(r.pattern, r.matched_text): r.confidence for r in results}
+
+        self.assertEqual(found[('bitcoin', '1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa')], 1.0)
+        self.assertEqual(found[('ip_address', '10.0.0.1')], MatchValidator.PRIVATE_ADDRESS)
+        self.assertNotIn(('email', 'logo@2x.png'), found)
+        self.assertNotIn(('ip_address', '0.0.0.0'), found)
+
+        with mock.patch.multiple(Config, VALIDATION_ENABLED=False):
+            unchecked = PatternScanner().scan_text(text, 'test_url')
+        self.assertTrue(any(r.matched_text == 'logo@2x.png' for r in unchecked))
+        self.assertTrue(all(r.confidence == 1.0 for r in unchecked))
+
+
+class TestTextNormalizer(unittest.TestCase):
+    """Test cases for text normalization"""
+
+    def test_normalize_maps_back_to_original(self):
+        """Test de-obfuscation, NFKC and zero-width stripping keep an offset map"""
+        original = "mail ad\u200bmin [at] mail [dot] ru or ｒｏｏｔ＠ｍａｉｌ．ｒｕ, see hxxps[:]//x[.]onion"
+        normalized = normalize_text(original)
+
+        self.assertEqual(normalized.text, "mail admin@mail.ru or root@mail.ru, see https://x.onion")
+        for value, source in [('admin@mail.ru', 'ad\u200bmin [at] mail [dot] ru'),
+                              ('root@mail.ru', 'ｒｏｏｔ＠ｍａｉｌ．ｒｕ'),
+                              ('https://x.onion', 'hxxps[:]//x[.]onion')]:
+            start = normalized.text.index(value)
+            begin, end = normalized.original_span(start, start + len(value))
+            self.assertEqual(original[begin:end], source)
+
+        plain = normalize_text("nothing to do here (really)")
+        self.assertFalse(plain.changed)
+        self.assertEqual(plain.original_span(3, 7), (3, 7))
+
+    def test_scanner_reports_original_offsets(self):
+        """Test obfuscated indicators are found once with offsets into the original"""
+        text = "leak by bob [at] corp [dot] com from １０.０.０.７"
+        results = PatternScanner().scan_text(text, 'test_url', context_length=5)
+        found = {r.matched_text: r for r in results}
+
+        email = found['bob@corp.com']
+        self.assertEqual(text[email.start:email.end], 'bob [at] corp [dot] com')
+        self.assertEqual(email.context, text[email.start - 5:email.end + 5].strip())
+        address = found['10.0.0.7']
+        self.assertEqual(text[address.start:address.end], '１０.０.０.７')
+
+        with mock.patch.multiple(Config, NORMALIZE_TEXT=False):
+            raw = PatternScanner().scan_text(text, 'test_url')
+        self.assertFalse(any(r.pattern == 'email' for r in raw))
+
+
+class TestScanBudget(unittest.TestCase):
+    """Test cases for the per-page scan budget"""
+
+    def test_oversized_page_is_sampled(self):
+        """Test a page over the byte budget is scanned in windows plus the watchlist"""
+        filler = 'lorem ipsum dolor sit amet ' * 40
+        text = ''.join(f"{filler} contact user{i}@mail.ru " for i in range(40))
+        text = text[:len(text) // 2] + ' acme-corp ' + text[len(text) // 2:]
+        with mock.patch.multiple(Config, SCAN_BUDGET_BYTES=4000, SCAN_SAMPLE_WINDOW=1000,
+                                 ALERT_WATCHLIST=['ACME-Corp']):
+            scanner = PatternScanner()
+        results = scanner.scan_text(text, 'big.onion')
+        overrun = scanner.last_overrun()
+
+        self.assertEqual(overrun['strategy'], 'sample')
+        self.assertEqual(overrun['reasons'], ['bytes'])
+        self.assertEqual(overrun['chars_sampled'], 4000)
+        emails = [r for r in results if r.pattern == 'email']
+        self.assertTrue(0 < len(emails) < 40)
+        self.assertEqual([r.matched_text for r in results if r.pattern == 'watchlist'], ['acme-corp'])
+
+        scanner.scan_text('small page admin@mail.ru', 'small.onion')
+        self.assertIsNone(scanner.last_overrun())
+
+    def test_cpu_budget_falls_back_to_keywords_then_watchlist(self):
+        """Test built-in patterns stop first, then keywords, once CPU time runs out"""
+        text = 'leaked dump for acme: admin@mail.ru 8.8.8.8'
+        for budget, strategy in [(60, 'keywords'), (30, 'watchlist')]:
+            with mock.patch.multiple(Config, SCAN_BUDGET_SECONDS=budget, ALERT_WATCHLIST=['acme']):
+                scanner = PatternScanner(patterns=[r'\bleaked\b', r'acme'])
+            # Every CPU reading after the start of the scan is 100 seconds in
+            with mock.patch('pattern_scanner.time.thread_time',
+                            side_effect=itertools.chain([0.0], itertools.repeat(100.0))):
+                results = scanner.scan_text(text, 'slow.onion')
+            overrun = scanner.last_overrun()
+            found = {r.pattern for r in results}
+
+            self.assertEqual(overrun['strategy'], strategy)
+            self.assertEqual(overrun['reasons'], ['cpu'])
+            self.assertIn('email', overrun['patterns_skipped'])
+            self.assertNotIn('email', found)
+            # A watchlist term the keyword patterns already reported is not reported twice
+            self.assertEqual('watchlist' in found, strategy == 'watchlist')
+            self.assertEqual(r'\bleaked\b' in found, strategy == 'keywords')
+    
+    def test_profiling_ignores_the_budget(self):
+        """Test the profiler sees every pattern over whole pages even with a tight budget"""
+        text = 'contact admin@mail.ru ' * 400
+        with mock.patch.multiple(Config, SCAN_BUDGET_BYTES=1000, SCAN_SAMPLE_WINDOW=500,
+                                 SCAN_BUDGET_SECONDS=0.000001):
+            scanner = PatternScanner(patterns=[r'\bleaked\b'])
+        report = {row['pattern']: row for row in profile_corpus(scanner, {'page': text}, check_growth=False)}
+        
+        self.assertEqual(set(report), set(scanner.patterns))
+        self.assertTrue(all(row['bytes_scanned'] == len(text) for row in report.values()))
+        self.assertEqual(report['email']['matches'], 400)
+        self.assertEqual((scanner.budget_bytes, scanner.budget_seconds), (1000, 0.000001))
+
+    def test_monitor_sites_reports_overruns_per_source(self):
+        """Test partial scans are reported per site in a batch"""
+        network = MockOnionNetwork(hosts=3, seed=4)
+
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            urls = [server.url_for(host) for host in network.hosts]
+            overrides = dict(server.config_overrides(), SCAN_BUDGET_BYTES=2000, SCAN_SAMPLE_WINDOW=500,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                results = monitor.monitor_sites(urls, workers=3)
+
+        budget = results['scan_budget']
+        self.assertEqual(budget['partial_pages'], 3)
+        self.assertEqual(set(budget['sources']), set(urls))
+        self.assertTrue(all(o['strategy'] == 'sample' for o in budget['sources'].values()))
+        self.assertTrue(all(site['scan_budget']['partial'] for site in results['sites']))
+
+
 class TestDarkWebCrawler(unittest.TestCase):
     """Test cases for DarkWebCrawler"""
     
@@ -130,6 +354,1491 @@ class TestDarkWebCrawler(unittest.TestCase):
         self.assertTrue(all('.onion' in link for link in links))
 
 
+class TestFindingsStore(unittest.TestCase):
+    """Test cases for FindingsStore"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = FindingsStore(os.path.join(self.tmp_dir.name, 'findings.db'))
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.store.close()
+        self.tmp_dir.cleanup()
+    
+    def _finding(self, pattern, matched_text, source_url, timestamp):
+        return {
+            'pattern': pattern,
+            'matched_text': matched_text,
+            'source_url': source_url,
+            'context': matched_text,
+            'timestamp': timestamp,
+            'confidence': 1.0,
+        }
+    
+    def test_query_by_value_and_pattern(self):
+        """Test indexed lookups by value and pattern"""
+        run_id = self.store.start_run('test')
+        self.store.add_findings([
+            self._finding('bitcoin', '1A1z7agoat2aZS8mkCvhQiiZwKHhzUUVLt', 'a.onion', '2024-01-01T00:00:00'),
+            self._finding('email', 'admin@example.com', 'b.onion', '2024-02-01T00:00:00'),
+        ], run_id=run_id)
+        
+        self.assertTrue(self.store.has_seen('1A1z7agoat2aZS8mkCvhQiiZwKHhzUUVLt'))
+        self.assertFalse(self.store.has_seen('nobody@example.com'))
+        self.assertEqual(len(self.store.query(pattern='email')), 1)
+        self.assertEqual(self.store.count(), 2)
+        
+        # Base58 addresses that differ only in case are different values; emails are not
+        self.assertFalse(self.store.has_seen('1a1z7agoat2azs8mkcvhqiizwkhhzuuvlt'))
+        self.assertFalse(self.store.has_seen('1A1Z7AGOAT2AZS8MKCVHQIIZWKHHZUUVLT', pattern='bitcoin'))
+        self.assertTrue(self.store.has_seen(' Admin@Example.com', pattern='email'))
+    
+    def test_query_by_source_and_date_range(self):
+        """Test source wildcard and date range filters"""
+        self.store.add_findings([
+            self._finding('email', 'a@example.com', 'search:ahmia:q', '2024-01-01T00:00:00'),
+            self._finding('email', 'b@example.com', 'search:torch:q', '2024-03-01T00:00:00'),
+        ])
+        
+        self.assertEqual(len(self.store.query(source='search:*')), 2)
+        results = self.store.query(since='2024-02-01', until='2024-04-01')
+        self.assertEqual([r['matched_text'] for r in results], ['b@example.com'])
+
+
+class TestResultSink(unittest.TestCase):
+    """Test cases for streaming result sinks"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.tmp_dir.name, 'run')
+        self.finding = {
+            'pattern': 'email',
+            'matched_text': 'admin@example.com',
+            'source_url': 'test.onion',
+            'context': 'contact admin@example.com',
+            'timestamp': datetime.now().isoformat(),
+            'confidence': 1.0,
+        }
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.tmp_dir.cleanup()
+    
+    def test_ndjson_gzip_with_trailer(self):
+        """Test gzip NDJSON output ends with a statistics trailer"""
+        import gzip
+        
+        with create_sink(self.base_path, 'ndjson', compress=True) as sink:
+            sink.write_many([self.finding, self.finding])
+            sink.write_trailer({'patterns_found': 2})
+        
+        with gzip.open(sink.get_paths()[0], 'rt') as f:
+            records = [json.loads(line) for line in f]
+        
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[-1]['type'], 'trailer')
+        self.assertEqual(records[-1]['statistics']['patterns_found'], 2)
+    
+    def test_records_durable_before_close(self):
+        """Test records are readable while the sink is still open"""
+        sink = create_sink(self.base_path, 'csv')
+        sink.write(self.finding)
+        
+        with open(sink.get_paths()[0]) as f:
+            content = f.read()
+        sink.close()
+        
+        self.assertIn('admin@example.com', content)
+        self.assertNotIn(TRAILER_MARKER, content)
+    
+    def test_size_rotation(self):
+        """Test rotation into numbered segments"""
+        with create_sink(self.base_path, 'ndjson', max_bytes=200) as sink:
+            sink.write_many([self.finding] * 10)
+        
+        self.assertGreater(len(sink.get_paths()), 1)
+        self.assertTrue(all(os.path.exists(p) for p in sink.get_paths()))
+
+
+class TestResultsCompactor(unittest.TestCase):
+    """Test cases for results compaction"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.results_dir = self.tmp_dir.name
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.tmp_dir.cleanup()
+    
+    def _write_run(self, name, findings):
+        path = os.path.join(self.results_dir, name)
+        with open(path, 'w') as f:
+            json.dump({'findings': findings}, f)
+        os.utime(path, (0, 0))
+        return path
+    
+    def test_compact_deduplicates_and_indexes(self):
+        """Test per-run files merge into one deduplicated archive"""
+        finding = {
+            'pattern': 'email',
+            'matched_text': 'admin@example.com',
+            'source_url': 'test.onion',
+            'context': '',
+            'timestamp': '2020-01-01T00:00:00',
+        }
+        # Base58 addresses differing only in case are different values
+        addresses = [dict(finding, pattern='bitcoin', matched_text=value)
+                     for value in ('1A1z7agoat2aZS8mkCvhQiiZwKHhzUUVLt', '1a1Z7agoat2aZS8mkCvhQiiZwKHhzUUVLt')]
+        self._write_run('monitor_20200101_000000.json', [finding] + addresses)
+        self._write_run('monitor_20200101_010000.json', [dict(finding, matched_text='Admin@example.com')])
+        
+        compactor = ResultsCompactor(self.results_dir)
+        compactor.config.COMPACT_RETENTION_DAYS = 0
+        stats = compactor.compact()
+        
+        self.assertEqual(stats['files_compacted'], 2)
+        self.assertEqual(stats['records_archived'], 3)
+        self.assertFalse(any(n.startswith('monitor_') for n in os.listdir(self.results_dir)))
+        self.assertEqual(len(compactor.query(value='ADMIN@example.com')), 1)
+        self.assertEqual(len(compactor.query(value='1a1Z7agoat2aZS8mkCvhQiiZwKHhzUUVLt')), 1)
+        self.assertEqual(compactor.candidate_archives(value='other@example.com'), [])
+        self.assertEqual(compactor.candidate_archives(pattern='ssn'), [])
+    
+    def test_retention_expires_old_archives(self):
+        """Test archives past the retention window are removed"""
+        self._write_run('monitor_20000101_000000.json', [{
+            'pattern': 'email',
+            'matched_text': 'old@example.com',
+            'source_url': 'test.onion',
+            'timestamp': '2000-01-01T00:00:00',
+        }])
+        
+        compactor = ResultsCompactor(self.results_dir)
+        compactor.config.COMPACT_RETENTION_DAYS = 30
+        stats = compactor.compact()
+        
+        self.assertEqual(stats['archives_expired'], 1)
+        self.assertEqual(compactor.manifest['archives'], {})
+    
+    def test_weekly_rollup_survives_interrupted_pass(self):
+        """Test batch and replay files are compacted, exports are kept and a rollup stopped mid-delete loses nothing"""
+        def finding(value, day):
+            return {'pattern': 'email', 'matched_text': value, 'source_url': 'test.onion',
+                    'timestamp': f"2020-01-0{day}T00:00:00"}
+        self._write_run('sites_20200101_000000.json', [finding('a@example.com', 1)])
+        self._write_run('replay_20200102_000000.json', [finding('b@example.com', 2)])
+        self._write_run('export_20200102_010000.json', [finding('c@example.com', 2)])
+        
+        real_remove = os.remove
+        deleted_dailies = []
+        
+        def crash_on_second_daily(path):
+            if os.sep + 'daily' + os.sep in path:
+                if deleted_dailies:
+                    raise OSError('interrupted')
+                deleted_dailies.append(path)
+            real_remove(path)
+        
+        with mock.patch.multiple(Config, COMPACT_RETENTION_DAYS=0, COMPACT_DAILY_DAYS=7):
+            with mock.patch('compaction.os.remove', side_effect=crash_on_second_daily):
+                with self.assertRaises(OSError):
+                    ResultsCompactor(self.results_dir).compact()
+            compactor = ResultsCompactor(self.results_dir)
+            compactor.compact()
+        
+        self.assertEqual(sorted(os.listdir(self.results_dir)), ['archive', 'export_20200102_010000.json'])
+        self.assertEqual(list(compactor.manifest['archives']), [os.path.join('weekly', '2020-W01.ndjson.gz')])
+        values = sorted(f['matched_text'] for f in compactor.query(pattern='email'))
+        self.assertEqual(values, ['a@example.com', 'b@example.com'])
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for the staged pipeline"""
+    
+    def test_items_flow_through_stages(self):
+        """Test items pass through every stage and None drops them"""
+        collected = []
+        pipeline = Pipeline([
+            Stage('double', lambda x: x * 2, workers=3, queue_size=2),
+            Stage('filter', lambda x: x if x % 4 == 0 else None, workers=2, queue_size=2),
+            Stage('sink', collected.append, workers=1, queue_size=2),
+        ])
+        
+        with pipeline:
+            for i in range(20):
+                pipeline.submit(i)
+        
+        self.assertEqual(sorted(collected), [i * 2 for i in range(20) if i % 2 == 0])
+        stats = pipeline.stats()
+        self.assertEqual(stats['double']['processed'], 20)
+        self.assertEqual(stats['filter']['dropped'], 10)
+    
+    def test_backpressure_bounds_buffering(self):
+        """Test a blocked sink stops upstream stages from buffering"""
+        release = threading.Event()
+        pipeline = Pipeline([
+            Stage('produce', lambda x: x, workers=1, queue_size=1),
+            Stage('sink', lambda x: release.wait(), workers=1, queue_size=1),
+        ]).start()
+        
+        # One item held by each worker plus one in each queue
+        for i in range(4):
+            pipeline.submit(i, timeout=1)
+        with self.assertRaises(Exception):
+            pipeline.submit(99, timeout=0.2)
+        
+        release.set()
+        pipeline.close()
+        self.assertEqual(pipeline.stats()['sink']['processed'], 4)
+    
+    def test_monitor_pipeline_mode(self):
+        """Test monitor_dark_web through the pipeline with stubbed fetching"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            monitor = make_monitor(tmp_dir, PIPELINE_USE_PROCESSES=False)
+            page = '<html><body><p>mail admin@example.com</p></body></html>'
+            monitor.crawler.fetch_url = lambda url: page
+            monitor.crawler.fetch_search_page = lambda query, engine: page
+            
+            results = monitor.monitor_dark_web(pipeline=True)
+            monitor.store.close()
+        
+        sources = {f['source_url'] for f in results['findings']}
+        self.assertIn('hidden_wiki:main', sources)
+        self.assertEqual(results['pipeline']['fetch']['processed'], len(sources))
+        self.assertEqual(results['statistics']['errors'], 0)
+
+
+class TestSharding(unittest.TestCase):
+    """Test cases for host-affine sharding"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = WorkQueue(os.path.join(self.tmp_dir.name, 'queue.db'))
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.queue.close()
+        self.tmp_dir.cleanup()
+    
+    def test_ring_minimal_reshuffle(self):
+        """Test adding a worker only moves hosts to the new worker"""
+        hosts = [f"host{i}.onion" for i in range(500)]
+        before = HashRing(['w1', 'w2', 'w3'])
+        after = HashRing(['w1', 'w2', 'w3', 'w4'])
+        
+        moved = [h for h in hosts if before.owner(h) != after.owner(h)]
+        
+        self.assertTrue(all(after.owner(h) == 'w4' for h in moved))
+        self.assertLess(len(moved), len(hosts) / 2)
+    
+    def test_workers_claim_disjoint_hosts(self):
+        """Test each host is claimed by exactly one worker"""
+        urls = [f"http://host{i}.onion/page{j}" for i in range(20) for j in range(2)]
+        self.assertEqual(self.queue.enqueue(urls), 40)
+        self.assertEqual(self.queue.enqueue(urls), 0)
+        
+        self.queue.register('w1')
+        self.queue.register('w2')
+        ring = HashRing(self.queue.live_workers())
+        
+        claimed_w1 = self.queue.claim('w1', ring, limit=100)
+        claimed_w2 = self.queue.claim('w2', ring, limit=100)
+        hosts_w1 = {t['host'] for t in claimed_w1}
+        hosts_w2 = {t['host'] for t in claimed_w2}
+        
+        self.assertEqual(len(claimed_w1) + len(claimed_w2), 40)
+        self.assertFalse(hosts_w1 & hosts_w2)
+    
+    def test_worker_processes_queue(self):
+        """Test a single worker drains the queue through the monitor"""
+        monitor = mock.Mock()
+        monitor.monitor_specific_site.return_value = {'status': 'success', 'findings': [{}]}
+        self.queue.enqueue(['http://a.onion', 'http://b.onion'])
+        
+        processed = ShardedWorker(monitor, self.queue, 'solo').run(once=True)
+        
+        self.assertEqual(processed, 2)
+        self.assertEqual(self.queue.stats()['tasks'], {'done': 2})
+        self.assertEqual(self.queue.live_workers(), [])
+    
+    def test_worker_refetches_requeued_sweep(self):
+        """Test a long-lived worker fetches the same URLs again after requeue_done"""
+        network = MockOnionNetwork(hosts=3, seed=11)
+        
+        with MockOnionServer(network) as server:
+            self.queue.enqueue([server.url_for(host) for host in network.hosts])
+            overrides = dict(server.config_overrides(),
+                             HOST_HEALTH_DB=os.path.join(self.tmp_dir.name, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(self.tmp_dir.name, STORE_FINDINGS=False)
+                worker = ShardedWorker(monitor, self.queue, 'solo')
+                worker.run(once=True)
+                self.assertEqual(self.queue.stats()['tasks'], {'done': 3})
+                
+                self.assertEqual(self.queue.requeue_done(), 3)
+                worker.run(once=True)
+        
+        self.assertEqual(self.queue.stats()['tasks'], {'done': 3})
+        self.assertLessEqual(len(monitor.crawler.get_visited_urls()), 1)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test cases for checkpoint and resume"""
+    
+    def test_resume_skips_completed_sources(self):
+        """Test an interrupted run resumes without refetching completed sources"""
+        page = '<p>mail admin@example.com</p>'
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            monitor = make_monitor(tmp_dir, CHECKPOINT_INTERVAL=0)
+            fetched = []
+            
+            def flaky_fetch(url):
+                fetched.append(url)
+                if len(fetched) == 2:
+                    raise KeyboardInterrupt()
+                monitor.crawler.visited_urls.append(url)
+                return page
+            
+            monitor.crawler.fetch_url = flaky_fetch
+            with self.assertRaises(KeyboardInterrupt):
+                monitor.monitor_dark_web(search_engines=['ahmia'], search_query='q')
+            self.assertTrue(monitor.checkpoint.exists())
+            
+            resumed = make_monitor(tmp_dir, CHECKPOINT_INTERVAL=0)
+            refetched = []
+            resumed.crawler.fetch_url = lambda url: refetched.append(url) or page
+            resumed.crawler.search_dark_web = lambda query, engine: {'status': 'error'}
+            results = resumed.monitor_dark_web(resume=True)
+            
+            self.assertEqual(results['search_query'], 'q')
+            self.assertNotIn(fetched[0], refetched)
+            self.assertIn(fetched[1], refetched)
+            self.assertEqual(len(results['findings']), len(self._wiki_urls()))
+            self.assertFalse(resumed.checkpoint.exists())
+            monitor.store.close()
+            resumed.store.close()
+    
+    def _wiki_urls(self):
+        return list(Config.HIDDEN_WIKI_URLS.values())
+
+
+class TestPageArchive(unittest.TestCase):
+    """Test cases for the page archive and offline replay"""
+    
+    def test_record_and_read_across_segments(self):
+        """Test records round-trip by index entry after segment rotation"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive = PageArchive(tmp_dir, segment_bytes=200)
+            archive.record('http://a.onion/', '<p>first</p>', fetched_at='2024-01-01T00:00:00Z')
+            archive.record('http://a.onion/', '<p>second ünïcode</p>', fetched_at='2024-01-02T00:00:00Z',
+                           headers={'Content-Type': 'text/html', 'Content-Length': '3'})
+            archive.record('http://b.onion/', '<p>other</p>', status=404)
+            
+            self.assertEqual(archive.latest('http://a.onion/').body, '<p>second ünïcode</p>')
+            self.assertEqual(archive.latest('http://a.onion/').headers, {'Content-Type': 'text/html'})
+            self.assertEqual(len(archive.entries(url='http://a.onion/*')), 2)
+            self.assertEqual(len(archive.entries(until='2024-01-01T23:59:59Z')), 1)
+            self.assertEqual(archive.read(archive.entries(host='b.onion')[0]['id']).status, 404)
+            self.assertGreater(archive.stats()['segments'], 1)
+            archive.close()
+    
+    def test_crawler_records_fetched_pages(self):
+        """Test the crawler archives successful responses"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive = PageArchive(tmp_dir)
+            with mock.patch.multiple(Config, HOST_HEALTH_ENABLED=False):
+                crawler = DarkWebCrawler(use_tor=False, archive=archive)
+            response = mock.Mock(url='http://c.onion/', text='<p>hello</p>', status_code=200,
+                                 headers={}, content=b'<p>hello</p>')
+            
+            with mock.patch.object(crawler.session, 'get', return_value=response), \
+                    mock.patch('dark_web_crawler.time.sleep'):
+                crawler.fetch_url('http://c.onion/')
+            
+            self.assertEqual(archive.latest('http://c.onion/').body, '<p>hello</p>')
+            archive.close()
+    
+    def test_replay_applies_new_patterns(self):
+        """Test replay rescans archived pages with a new pattern and no network"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive = PageArchive(os.path.join(tmp_dir, 'pages'))
+            archive.record('http://a.onion/', '<p>selling fresh-combo lists</p>')
+            archive.record('http://b.onion/', '<p>mail admin@example.com</p>')
+            
+            monitor = make_monitor(tmp_dir, PIPELINE_USE_PROCESSES=False)
+            monitor.scanner = PatternScanner(patterns=[r'fresh-combo'])
+            monitor.crawler.fetch_url = mock.Mock(side_effect=AssertionError('network used'))
+            results = monitor.replay_archive(archive=archive)
+            
+            matched = {(f['pattern'], f['source_url']) for f in results['findings']}
+            self.assertIn(('fresh-combo', 'http://a.onion/'), matched)
+            self.assertIn(('email', 'http://b.onion/'), matched)
+            self.assertEqual(results['statistics']['urls_crawled'], 2)
+            archive.close()
+            monitor.store.close()
+
+
+class TestMockOnionNetwork(unittest.TestCase):
+    """Test cases for the local mock onion server and SOCKS stand-in"""
+    
+    def setUp(self):
+        # Skip the crawler's politeness delay; the server's own sleeps must stay real
+        patcher = mock.patch('dark_web_crawler.random.uniform', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_monitor_end_to_end_against_mock(self):
+        """Test a full monitoring run against the mock network without Tor"""
+        network = MockOnionNetwork(hosts=12, seed=3)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides):
+                monitor = make_monitor(tmp_dir)
+                results = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'])
+            
+            sources = {f['source_url'] for f in results['findings']}
+            self.assertIn('search:ahmia:leaked', sources)
+            self.assertIn('hidden_wiki:main', sources)
+            self.assertEqual(results['statistics']['errors'], 0)
+            self.assertEqual(server.stats.requests, 2)
+            monitor.store.close()
+    
+    def test_socks_proxy_reaches_onion_hosts(self):
+        """Test a Tor-configured crawler reaches mock hosts through the SOCKS stand-in"""
+        network = MockOnionNetwork(hosts=5, links_per_page=3, seed=4)
+        host = network.hosts[0]
+        
+        with MockOnionServer(network) as server, SocksProxy(server.address) as proxy:
+            with mock.patch.multiple(Config, HOST_HEALTH_ENABLED=False, **server.config_overrides(proxy)):
+                crawler = DarkWebCrawler(use_tor=True)
+                html = crawler.fetch_url(f"http://{host}/")
+            
+            linked_hosts = {link.split('/')[2] for link in crawler.extract_onion_links(html)}
+            self.assertTrue(set(network.links[host]) <= linked_hosts)
+            self.assertEqual(proxy.connections, 1)
+    
+    def test_injected_errors_and_latency(self):
+        """Test per-host error rate and latency are applied"""
+        network = MockOnionNetwork(hosts=3, seed=5)
+        network.set_profile(network.hosts[0], error_rate=1.0)
+        network.set_profile(network.hosts[1], latency=0.2)
+        
+        with MockOnionServer(network) as server:
+            with mock.patch.multiple(Config, HOST_HEALTH_ENABLED=False):
+                crawler = DarkWebCrawler(use_tor=False)
+            
+            self.assertIsNone(crawler.fetch_url(server.url_for(network.hosts[0])))
+            started = time.monotonic()
+            self.assertIsNotNone(crawler.fetch_url(server.url_for(network.hosts[1])))
+            
+            self.assertGreaterEqual(time.monotonic() - started, 0.2)
+            self.assertEqual(server.stats.errors, 1)
+
+    
+    def test_monitor_sites_bounds_slow_hosts(self):
+        """Test a batch keeps going past a slow-drip host and streams findings"""
+        network = MockOnionNetwork(hosts=6, seed=6)
+        network.set_profile(network.hosts[0], slow_drip=True)
+        network.set_profile(network.hosts[1], error_rate=1.0)
+        progress = []
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            urls = [server.url_for(host) for host in network.hosts]
+            overrides = dict(server.config_overrides(), RETRY_POLICIES={}, STREAM_FORMAT='ndjson',
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                started = time.monotonic()
+                with monitor.open_sink('sites') as sink:
+                    results = monitor.monitor_sites(
+                        urls + urls[:1], sink=sink, workers=3, max_seconds=1.0,
+                        progress=lambda done, total, site: progress.append((done, total))
+                    )
+            
+            self.assertLess(time.monotonic() - started, 10)
+            status = {site['url']: site['status'] for site in results['sites']}
+            self.assertEqual(status[urls[0]], 'timeout')
+            self.assertEqual(status[urls[1]], 'failed')
+            self.assertEqual(list(status.values()).count('success'), 4)
+            self.assertEqual(progress[-1], (6, 6))
+            
+            with open(results['output_files'][0]) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(records[-1]['statistics']['timeouts'], 1)
+            self.assertEqual(len(records) - 1, results['statistics']['patterns_found'])
+            self.assertGreater(results['statistics']['patterns_found'], 0)
+
+    
+    def test_pipeline_retries_failed_search(self):
+        """Test the pipeline stays open for a delayed retry of a failed search"""
+        network = MockOnionNetwork(hosts=3, seed=10)
+        engine = network.search_engines['ahmia']
+        network.set_profile(engine, error_rate=1.0)
+        recover = threading.Timer(0.2, network.set_profile, (engine,), {'error_rate': 0.0})
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), RETRY_DELAY=0.5,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir)
+                recover.start()
+                results = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                   pipeline=True)
+            
+            self.assertEqual(results['statistics']['errors'], 0)
+            self.assertEqual(results['retries']['retried'], 1)
+            self.assertIn('search:ahmia:leaked', {f['source_url'] for f in results['findings']})
+            monitor.store.close()
+    
+    def test_monitor_sites_retries_flapping_host(self):
+        """Test a failing site is retried after a delay while the rest of the batch goes on"""
+        network = MockOnionNetwork(hosts=5, seed=9)
+        flapping = network.hosts[0]
+        network.set_profile(flapping, error_rate=1.0)
+        recover = threading.Timer(0.2, network.set_profile, (flapping,), {'error_rate': 0.0})
+        order = []
+        
+        with MockOnionServer(network) as server, SocksProxy(server.address) as proxy, \
+                tempfile.TemporaryDirectory() as tmp_dir:
+            urls = [f"http://{host}/" for host in network.hosts]
+            overrides = dict(server.config_overrides(proxy), RETRY_DELAY=0.5,
+                             RETRY_POLICIES={'http': 2}, HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                recover.start()
+                results = monitor.monitor_sites(
+                    urls, workers=2, max_seconds=5.0,
+                    progress=lambda done, total, site: order.append(site['url'])
+                )
+            
+            self.assertEqual(order[-1], urls[0])
+            self.assertEqual(results['statistics']['urls_crawled'], 5)
+            self.assertEqual(results['statistics']['errors'], 0)
+            sites = {site['url']: site for site in results['sites']}
+            self.assertEqual(sites[urls[0]]['attempts'], 2)
+            self.assertEqual(results['retries']['scheduled'], 1)
+            self.assertEqual(results['retries']['waiting'], 0)
+            self.assertEqual(results['link_graph']['pages'], 5)
+            self.assertEqual(set(monitor.link_graph.linked_from(network.links[flapping][0])) & {flapping},
+                             {flapping})
+            monitor.link_graph.close()
+    
+    @staticmethod
+    def flap(network, host):
+        """Make a host answer 503 for the next 0.1 seconds"""
+        network.set_profile(host, error_rate=1.0)
+        threading.Timer(0.1, network.set_profile, (host,), {'error_rate': 0.0}).start()
+    
+    def test_single_site_and_planner_retry_in_line(self):
+        """Test paths without a retry queue still retry a flapping host"""
+        network = MockOnionNetwork(hosts=5, seed=9)
+        flapping, engine = network.hosts[0], network.search_engines['ahmia']
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), RETRY_DELAY=0.3, QUERY_TOP_K=0,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                self.flap(network, flapping)
+                site = monitor.monitor_specific_site(server.url_for(flapping))
+                self.assertEqual(site['status'], 'success')
+                self.assertEqual(server.stats.per_host[flapping], 2)
+                
+                self.flap(network, engine)
+                planned = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                   planner=True)['planner']
+            
+            self.assertEqual((planned['searches'], planned['search_failures']), (1, 0))
+            self.assertEqual(server.stats.per_host[engine], 2)
+            monitor.link_graph.close()
+    
+    def test_monitor_sites_refetches_on_second_batch(self):
+        """Test the same batch run twice on one monitor fetches every site both times"""
+        network = MockOnionNetwork(hosts=3, seed=9)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            urls = [server.url_for(host) for host in network.hosts]
+            overrides = dict(server.config_overrides(), HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                batches = [monitor.monitor_sites(urls, workers=2) for _ in range(2)]
+            
+            for results in batches:
+                self.assertEqual({site['status'] for site in results['sites']}, {'success'})
+                self.assertEqual(results['statistics']['urls_crawled'], 3)
+            self.assertEqual(server.stats.requests, 6)
+            monitor.link_graph.close()
+    
+    def test_monitor_sites_does_not_retry_client_errors(self):
+        """Test a 404 is reported at once instead of being queued for a retry"""
+        network = MockOnionNetwork(hosts=2, seed=9)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            urls = [server.url_for(network.hosts[0]), server.url_for('gone' * 14 + '.onion')]
+            overrides = dict(server.config_overrides(), RETRY_DELAY=5,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                results = monitor.monitor_sites(urls, workers=2)
+            
+            sites = {site['url']: site for site in results['sites']}
+            self.assertEqual(sites[urls[1]]['status'], 'failed')
+            self.assertEqual(sites[urls[1]]['error_class'], 'http_client')
+            self.assertEqual(sites[urls[1]]['attempts'], 1)
+            self.assertEqual((results['retries']['scheduled'], results['retries']['not_retryable']), (0, 1))
+            self.assertLess(results['seconds'], 5)
+            monitor.link_graph.close()
+
+class TestQueryPlanner(unittest.TestCase):
+    """Test cases for the fan-out query planner"""
+    
+    def setUp(self):
+        patcher = mock.patch('dark_web_crawler.random.uniform', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_extract_and_rank_hits(self):
+        """Test engine-specific extraction and cross-engine deduplication"""
+        ahmia = ('<a href="/search/redirect?search_term=x&redirect_url=http%3A%2F%2Fb.onion%2F">b</a>'
+                 '<a href="/search/redirect?redirect_url=http://a.onion/">a</a>')
+        self.assertEqual(extract_ahmia_links(ahmia), ['http://b.onion/', 'http://a.onion/'])
+        
+        planner = QueryPlanner(search=None, fetch=None, engines={})
+        hits = planner.rank([
+            ('ahmia', 'q', ['http://b.onion/', 'http://a.onion/']),
+            ('torch', 'q', ['http://A.onion', 'http://c.onion/']),
+        ])
+        self.assertEqual([hit.url for hit in hits], ['http://a.onion/', 'http://b.onion/', 'http://c.onion/'])
+        self.assertEqual(hits[0].engines, {'ahmia', 'torch'})
+    
+    def test_budget_bounds_sweep(self):
+        """Test no new requests start once the budget is spent"""
+        def slow_search(query, engine, max_seconds):
+            time.sleep(0.3)
+            return '<a href="http://hit.onion/">hit</a>'
+        
+        fetched = []
+        planner = QueryPlanner(
+            search=slow_search, fetch=lambda url, max_seconds: fetched.append(url),
+            engines={'ahmia': 'http://ahmia.onion', 'torch': 'http://torch.onion'},
+            group_size=1, workers=2, budget=0.5
+        )
+        started = time.monotonic()
+        stats = planner.run(['a', 'b', 'c', 'd'], on_page=lambda item: None)
+        
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertTrue(stats['budget_exhausted'])
+        self.assertEqual(stats['searches'], 2)
+        self.assertGreater(stats['skipped'], 0)
+        self.assertEqual(fetched, [])
+    
+    def test_budget_bounds_slow_search(self):
+        """Test a search in flight is cut off when the budget runs out"""
+        network = MockOnionNetwork(hosts=5, seed=7)
+        network.set_profile(network.search_engines['torch'], latency=3.0)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), QUERY_BUDGET_SECONDS=0.5, REQUEST_TIMEOUT=30,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                started = time.monotonic()
+                results = monitor.monitor_dark_web(search_query='leaked', planner=True)
+            
+            self.assertLess(time.monotonic() - started, 2.0)
+            self.assertTrue(results['planner']['budget_exhausted'])
+    
+    def test_planned_sweep_against_mock(self):
+        """Test keyword groups hit every engine once and top hits are scanned"""
+        network = MockOnionNetwork(hosts=20, seed=7)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), MONITORED_PATTERNS=['a', 'b', 'c', 'd'],
+                             QUERY_GROUP_SIZE=2, QUERY_TOP_K=5,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                results = monitor.monitor_dark_web(planner=True)
+            
+            planned = results['planner']
+            self.assertEqual(planned['searches'], 4)
+            self.assertEqual(planned['pages_fetched'], 6)  # 5 hits + the wiki
+            self.assertEqual(server.stats.requests, 10)
+            kinds = {f['source_url'].split(':')[0] for f in results['findings']}
+            self.assertEqual(kinds, {'search', 'hidden_wiki', 'http'})
+
+
+class TestHostHealth(unittest.TestCase):
+    """Test cases for host health tracking and circuit breaking"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'hosts.db')
+        patcher = mock.patch.multiple(
+            Config, HOST_FAILURE_THRESHOLD=2, HOST_PROBE_BASE=60, HOST_PROBE_MAX=200,
+            HOST_MIN_SAMPLES=3, HOST_TIMEOUT_FACTOR=4, HOST_TIMEOUT_MIN=2, REQUEST_TIMEOUT=30
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_circuit_opens_backs_off_and_persists(self):
+        """Test repeated failures skip a host, probes back off and state survives restarts"""
+        tracker = HostHealthTracker(self.db_path)
+        tracker.record_failure('dead.onion', 'timeout')
+        self.assertTrue(tracker.allow('dead.onion'))
+        tracker.record_failure('dead.onion', 'timeout')
+        self.assertFalse(tracker.allow('dead.onion'))
+        self.assertEqual(tracker.get('dead.onion').backoff, 60)
+        tracker.close()
+        
+        tracker = HostHealthTracker(self.db_path)
+        record = tracker.get('dead.onion')
+        self.assertEqual(record.state(), 'open')
+        record.next_probe = time.time() - 1
+        self.assertTrue(tracker.allow('dead.onion'))
+        self.assertFalse(tracker.allow('dead.onion'))  # one probe at a time
+        
+        tracker.record_failure('dead.onion', 'connection')
+        self.assertEqual(record.backoff, 120)
+        tracker.record_failure('dead.onion', 'connection')
+        self.assertEqual(record.backoff, 200)
+        
+        tracker.record_success('dead.onion', 1.0)
+        self.assertTrue(tracker.allow('dead.onion'))
+        self.assertEqual(tracker.stats()['ok'], 1)
+        tracker.close()
+    
+    def test_timeout_adapts_to_latency(self):
+        """Test timeouts follow the host's p95 latency within bounds"""
+        tracker = HostHealthTracker(self.db_path)
+        self.assertEqual(tracker.timeout_for('fast.onion'), 30)
+        for seconds in (0.1, 0.2, 0.3):
+            tracker.record_success('fast.onion', seconds)
+            tracker.record_success('slow.onion', seconds * 20)
+        
+        self.assertEqual(tracker.timeout_for('fast.onion'), 2)
+        self.assertEqual(tracker.timeout_for('slow.onion'), 24)
+        self.assertAlmostEqual(tracker.get('slow.onion').p50, 4.0)
+        tracker.close()
+    
+    def test_crawler_skips_failing_host(self):
+        """Test the crawler stops contacting a host once its circuit opens"""
+        network = MockOnionNetwork(hosts=2, seed=8)
+        dead = network.hosts[0]
+        network.set_profile(dead, error_rate=1.0)
+        
+        with MockOnionServer(network) as server, SocksProxy(server.address) as proxy, \
+                mock.patch('dark_web_crawler.random.uniform', return_value=0):
+            with mock.patch.multiple(Config, **server.config_overrides(proxy)):
+                tracker = HostHealthTracker(self.db_path)
+                crawler = DarkWebCrawler(use_tor=True, health=tracker)
+                for _ in range(3):
+                    self.assertIsNone(crawler.fetch_url(f"http://{dead}/"))
+            
+            self.assertEqual(crawler.last_error(), 'circuit')
+            self.assertEqual(server.stats.requests, 2)
+            self.assertEqual(tracker.get(dead).last_error, 'http')
+            tracker.close()
+
+
+
+class TestRetryQueue(unittest.TestCase):
+    """Test cases for delayed, budgeted retries"""
+    
+    def test_policies_per_error_class(self):
+        """Test each error class is retried as often as its policy allows"""
+        retries = RetryQueue(policies={'timeout': RetryPolicy(1, 0.0), 'http': RetryPolicy(2, 0.0)})
+        slow, broken, odd = {'url': 'slow'}, {'url': 'broken'}, {'url': 'odd'}
+        
+        self.assertTrue(retries.schedule(slow, 'timeout'))
+        self.assertFalse(retries.schedule(slow, 'timeout'))
+        self.assertTrue(retries.schedule(broken, 'http'))
+        self.assertTrue(retries.schedule(broken, 'http'))
+        self.assertFalse(retries.schedule(broken, 'http'))
+        self.assertFalse(retries.schedule(odd, 'circuit'))
+        
+        self.assertEqual(broken['attempt'], 3)
+        stats = retries.stats()
+        self.assertEqual((stats['scheduled'], stats['exhausted'], stats['not_retryable']), (3, 2, 1))
+    
+    def test_delay_order_and_budget(self):
+        """Test items come back in due order and the budget caps extra attempts"""
+        policies = {'connection': RetryPolicy(3, 10.0, backoff=3.0)}
+        with mock.patch.multiple(Config, RETRY_BUDGET_MIN=1, RETRY_BUDGET_RATIO=0.2):
+            retries = RetryQueue(first_attempts=10, policies=policies)
+        
+        first, second = {'url': 'a', 'attempt': 2}, {'url': 'b'}
+        self.assertTrue(retries.schedule(first, 'connection'))
+        self.assertTrue(retries.schedule(second, 'connection'))
+        self.assertFalse(retries.schedule({'url': 'c'}, 'connection'))
+        
+        now = time.monotonic()
+        self.assertEqual(retries.pop_due(now), [])
+        self.assertAlmostEqual(retries.seconds_until_due(), 10.0, delta=0.5)
+        self.assertEqual(retries.pop_due(now + 11), [second])
+        self.assertEqual(retries.pop_due(now + 31), [first])
+        self.assertIsNone(retries.seconds_until_due())
+        self.assertEqual(retries.stats()['over_budget'], 1)
+
+
+class TestLinkGraph(unittest.TestCase):
+    """Test cases for the persistent onion link graph"""
+    
+    HUB = 'h' * 56 + '.onion'
+    LEAK = 'l' * 56 + '.onion'
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'graph.db')
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    @staticmethod
+    def host(i):
+        return 'abcdefghijklmnopqrstuvwxyz234567'[i] * 16 + '.onion'
+    
+    def test_hosts_extracted_and_updates_batched(self):
+        """Test linked hosts are parsed from HTML and written once per batch"""
+        html = (f'<a href="http://{self.HUB}/x">hub</a> mirror: www.{self.host(1).upper()} '
+                f'<a href="http://{self.HUB}/y">again</a> not-an-onion.onion')
+        self.assertEqual(onion_hosts(html), [self.HUB, self.host(1)])
+        
+        graph = LinkGraph(self.db_path, batch_size=3)
+        graph.add_page(f"http://{self.host(0)}/", [self.HUB], now=100.0)
+        graph.add_page(f"http://{self.host(0)}/b", [self.HUB, self.host(0)], now=200.0)
+        self.assertEqual(graph.counts['flushes'], 0)
+        graph.add_page(f"http://{self.host(2)}/", [self.HUB], now=300.0)
+        self.assertEqual(graph.counts['flushes'], 1)
+        
+        stats = graph.stats()
+        self.assertEqual((stats['hosts'], stats['edges'], stats['new_hosts']), (3, 2, 3))
+        hub = next(h for h in graph.top_hosts() if h['host'] == self.HUB)
+        self.assertEqual((hub['first_seen'], hub['last_seen'], hub['fetches']), (100.0, 300.0, 0))
+        self.assertEqual(graph.linked_from(self.HUB), [self.host(0), self.host(2)])
+        graph.close()
+    
+    def test_ranks_update_incrementally(self):
+        """Test PageRank favours linked-to hosts and warm starts after small changes"""
+        graph = LinkGraph(self.db_path)
+        for i in range(1, 11):
+            graph.add_page(f"http://{self.host(i)}/", [self.HUB, self.host(i % 10 + 1)])
+        graph.add_page(f"http://{self.HUB}/", [self.host(1)])
+        cold = graph.update_ranks()
+        self.assertEqual(graph.update_ranks(), 0)
+        
+        graph.add_page(f"http://{self.host(20)}/", [self.HUB])
+        warm = graph.update_ranks()
+        
+        self.assertLess(warm, cold)
+        self.assertEqual(graph.top_hosts(1)[0]['host'], self.HUB)
+        self.assertAlmostEqual(sum(h['rank'] for h in graph.top_hosts(100)), 1.0, places=4)
+        graph.close()
+    
+    def test_new_hosts_from_leak_sites_and_fetch_order(self):
+        """Test the new-host query and that unfetched new hosts are fetched first"""
+        graph = LinkGraph(self.db_path)
+        now = time.time()
+        graph.add_page(f"http://{self.host(0)}/", [self.host(1)], now=now - 3 * 86400)
+        graph.add_page(f"http://{self.LEAK}/dump", [self.host(2), self.host(1)], findings=4, now=now)
+        graph.add_page(f"http://{self.HUB}/", [self.host(3)], now=now)
+        graph.update_ranks()
+        
+        leak_linked = [h['host'] for h in graph.new_hosts(from_leak_sites=True)]
+        self.assertEqual(leak_linked, [self.host(2)])
+        self.assertEqual({h['host'] for h in graph.new_hosts()},
+                         {self.LEAK, self.HUB, self.host(2), self.host(3)})
+        
+        started = time.monotonic()
+        for _ in range(100):
+            graph.new_hosts(from_leak_sites=True)
+        self.assertLess((time.monotonic() - started) / 100, 0.01)
+        
+        urls = [f"http://{host}/" for host in (self.HUB, self.host(1), 'plain.example', self.host(3))]
+        self.assertEqual(graph.order(urls)[0], urls[3])
+        graph.close()
+
+
+class TestScanService(unittest.TestCase):
+    """Test cases for the local HTTP scan service"""
+    
+    def _post(self, conn, path, body, content_type='application/json', **kwargs):
+        conn.request('POST', path, body=body, headers={'Content-Type': content_type}, **kwargs)
+        response = conn.getresponse()
+        return response, response.read()
+    
+    def test_single_batch_and_streamed_requests(self):
+        """Test the three scan endpoints share one warm scanner over a keep-alive connection"""
+        with ScanService(port=0, workers=2, use_processes=False) as service:
+            conn = http.client.HTTPConnection('127.0.0.1', service.port, timeout=10)
+            
+            response, body = self._post(conn, '/scan', 'contact bob@example.com', 'text/plain')
+            self.assertEqual(response.status, 200)
+            self.assertEqual([f['pattern'] for f in json.loads(body)['findings']], ['email'])
+            self.assertGreater(float(response.headers['X-Scan-Seconds']), 0)
+            
+            items = [{'id': 'a', 'text': 'server 10.0.0.1'}, {'id': 'b', 'text': 'nothing here'}]
+            response, body = self._post(conn, '/scan/batch', json.dumps({'items': items}))
+            results = json.loads(body)['results']
+            self.assertEqual([r['id'] for r in results], ['a', 'b'])
+            self.assertEqual([len(r['findings']) for r in results], [1, 0])
+            
+            lines = [json.dumps({'id': i, 'text': f"user{i}@example.com"}) + '\n' for i in range(10)]
+            response, body = self._post(conn, '/scan/stream', (line.encode() for line in lines),
+                                        'application/x-ndjson', encode_chunked=True)
+            records = [json.loads(line) for line in body.splitlines()]
+            self.assertEqual(sorted(r['id'] for r in records[:-1]), list(range(10)))
+            self.assertEqual(records[-1]['done'], 10)
+            
+            response, body = self._post(conn, '/scan/batch', json.dumps({'items': [{'id': 1}]}))
+            self.assertEqual(response.status, 400)
+            conn.close()
+            
+            health = service.health()
+            self.assertEqual((health['requests'], health['items']), (3, 13))
+    
+    def test_load_test_against_process_workers(self):
+        """Test the load-test client against a service scanning in worker processes"""
+        with ScanService(port=0, workers=2, use_processes=True) as service:
+            report = run_load(service.url, mode='batch', clients=2, requests=6, batch_size=4, size=500)
+        
+        self.assertEqual((report['requests'], report['items'], report['errors']), (6, 24, 0))
+        self.assertGreater(report['findings'], 0)
+        self.assertIsNotNone(report['server']['p95_ms'])
+
+class TestMemoryGovernor(unittest.TestCase):
+    """Test cases for the per-run memory budget"""
+    
+    def test_findings_spill_to_disk_and_save(self):
+        """Test findings move to a temp file under pressure and are saved in order"""
+        governor = MemoryGovernor(budget_mb=1_000_000)
+        findings = governor.findings_buffer([{'pattern': 'email', 'n': 0}])
+        governor.threshold = 0
+        findings.extend({'pattern': 'email', 'n': n} for n in range(1, 5))
+        
+        self.assertIsInstance(findings, SpillList)
+        self.assertEqual((len(findings), findings.spilled), (5, 4))
+        self.assertTrue(os.path.exists(findings.path))
+        self.assertEqual([f['n'] for f in findings], list(range(5)))
+        self.assertEqual((findings[0]['n'], findings[3]['n'], findings[-1]['n']), (0, 3, 4))
+        self.assertEqual([f['n'] for f in findings[1:3]], [1, 2])
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            monitor = make_monitor(tmp_dir, STORE_FINDINGS=False, EXPORT_FORMAT='json')
+            path = monitor.save_results({'timestamp': 'now', 'findings': findings}, 'spilled')
+            with open(path) as f:
+                self.assertEqual(json.load(f)['findings'], list(findings))
+        
+        spill_dir = governor.spill_dir
+        governor.close()
+        self.assertFalse(os.path.exists(spill_dir))
+    
+    def test_fetch_slots_capped_under_pressure(self):
+        """Test in-flight fetches drop to MEMORY_PRESSURE_FETCHES once RSS nears the budget"""
+        with mock.patch.multiple(Config, MEMORY_PRESSURE_FETCHES=1, MEMORY_MAX_FETCHES=0):
+            governor = MemoryGovernor(budget_mb=1_000_000)
+        
+        def run_fetches():
+            in_flight = [0, 0]
+            lock = threading.Lock()
+            
+            def fetch():
+                with governor.fetch_slot():
+                    with lock:
+                        in_flight[0] += 1
+                        in_flight[1] = max(in_flight)
+                    time.sleep(0.05)
+                    with lock:
+                        in_flight[0] -= 1
+            
+            threads = [threading.Thread(target=fetch) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return in_flight[1]
+        
+        self.assertEqual(run_fetches(), 4)
+        governor.threshold = 0
+        self.assertEqual(run_fetches(), 1)
+        self.assertEqual(governor.report()['fetch_waits'], 3)
+    
+    def test_pipeline_run_spills_pages_and_reports_peak(self):
+        """Test a pipeline run over budget parks page text on disk and reports peak RSS"""
+        network = MockOnionNetwork(hosts=3, seed=3)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), MEMORY_BUDGET_MB=1, MEMORY_SPILL_MIN_BYTES=0,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                results = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                   pipeline=True)
+            
+            memory = results['memory']
+            self.assertEqual(memory['pages_spilled'], 2)
+            self.assertEqual(memory['findings_spilled'], results['statistics']['patterns_found'])
+            self.assertGreaterEqual(memory['peak_rss_mb'], memory['start_rss_mb'])
+            self.assertIn('search:ahmia:leaked', {f['source_url'] for f in results['findings']})
+            # Parked pages are removed once read; only the findings file is left
+            self.assertEqual(os.listdir(monitor.governor.spill_dir), [os.path.basename(results['findings'].path)])
+            monitor.governor.close()
+
+
+class TestAlertOutbox(unittest.TestCase):
+    """Test cases for the durable alert outbox and its dispatchers"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp_dir, 'alerts.db')
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+    
+    def finding(self, text, pattern='email', context=''):
+        return {'pattern': pattern, 'matched_text': text, 'source_url': 'http://x.onion/',
+                'context': context or text, 'timestamp': '2024-01-01T00:00:00', 'confidence': 1.0}
+    
+    def test_batches_coalesce_and_watchlist_fast_path(self):
+        """Test duplicates merge, normal alerts wait for their batch and a watchlist hit goes at once"""
+        rules = AlertRules(patterns=['email'], watchlist=['acme.com'])
+        with MockWebhookServer() as webhook, \
+                mock.patch.multiple(Config, ALERT_BATCH_SECONDS=30, ALERT_COALESCE_SECONDS=3600):
+            outbox = AlertOutbox(self.db, targets=[webhook.url], rules=rules)
+            created = outbox.submit([self.finding('a@example.com'), self.finding('b@example.com'),
+                                     self.finding('A@example.com'), self.finding('10.0.0.1', 'ip_address')])
+            self.assertEqual(created, 2)
+            time.sleep(0.2)
+            self.assertEqual(webhook.requests, 0)
+            
+            started = time.monotonic()
+            outbox.submit([self.finding('ceo@acme.com')])
+            self.assertTrue(webhook.wait_for(3, timeout=2))
+            self.assertLess(time.monotonic() - started, 1)
+            
+            self.assertEqual(len(webhook.batches), 1)
+            alerts = {a['finding']['matched_text']: a for a in webhook.alerts}
+            self.assertEqual(alerts['ceo@acme.com']['rule'], 'watchlist:acme.com')
+            self.assertEqual(alerts['ceo@acme.com']['severity'], 'high')
+            self.assertEqual(alerts['a@example.com']['occurrences'], 2)
+            
+            # Already delivered within the coalescing window: counted, not sent again
+            self.assertEqual(outbox.submit([self.finding('ceo@acme.com')]), 0)
+            stats = outbox.stats()
+            self.assertEqual((stats['total_alerts'], stats['total_occurrences'], stats['coalesced']), (3, 5, 2))
+            outbox.close()
+    
+    def test_failing_targets_retry_without_slowing_submit(self):
+        """Test backoff retries, dead deliveries and that submit never waits on a slow target"""
+        with MockWebhookServer() as flaky, MockWebhookServer(latency=1.0) as slow:
+            flaky.fail_next = 2
+            unreachable = 'http://127.0.0.1:9/alerts'
+            with mock.patch.multiple(Config, ALERT_BATCH_SECONDS=0, ALERT_RETRY_DELAY=0.1,
+                                     ALERT_MAX_ATTEMPTS=3, ALERT_TIMEOUT=2):
+                outbox = AlertOutbox(self.db, targets=[flaky.url, slow.url, unreachable],
+                                     rules=AlertRules(patterns=['*'], watchlist=[]))
+            
+            started = time.monotonic()
+            for i in range(20):
+                outbox.submit([self.finding(f"user{i}@example.com")])
+            self.assertLess(time.monotonic() - started, 0.5)
+            
+            self.assertTrue(flaky.wait_for(20, timeout=5))
+            self.assertEqual(flaky.requests - len(flaky.batches), 2)
+            outbox.flush(timeout=5, include_retries=True)
+            targets = outbox.stats()['targets']
+            self.assertEqual(targets[flaky.url]['delivered'], 20)
+            self.assertEqual(targets[slow.url]['delivered'], 20)
+            self.assertEqual(targets[unreachable]['dead'], 20)
+            self.assertIsNotNone(targets[unreachable]['last_error'])
+            outbox.close()
+    
+    def test_monitor_run_alerts_survive_restart(self):
+        """Test a mock run queues alerts durably and a later process delivers them to a file"""
+        network = MockOnionNetwork(hosts=3, seed=3)
+        alert_file = os.path.join(self.tmp_dir, 'alerts.ndjson')
+        
+        with MockOnionServer(network) as server:
+            overrides = dict(server.config_overrides(), ALERTS_ENABLED=True, ALERT_PATTERNS=['email'],
+                             ALERT_TARGETS=[f"file://{alert_file}"], ALERT_BATCH_SECONDS=60,
+                             HOST_HEALTH_DB=os.path.join(self.tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(self.tmp_dir, STORE_FINDINGS=False, ALERT_OUTBOX_DB=self.db)
+                results = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'])
+            monitor.alerts.close()
+            
+            emails = {f['matched_text'].lower() for f in results['findings'] if f['pattern'] == 'email'}
+            self.assertEqual(results['alerts']['alerts'], len(emails))
+            self.assertFalse(os.path.exists(alert_file))
+            
+            with mock.patch.multiple(Config, ALERT_TARGETS=[f"file://{alert_file}"]):
+                outbox = AlertOutbox(self.db)
+            self.assertTrue(outbox.flush(timeout=5))
+            outbox.close()
+            with open(alert_file) as f:
+                delivered = [json.loads(line) for line in f]
+            self.assertEqual({a['finding']['matched_text'].lower() for a in delivered}, emails)
+
+
+class TestRevisitScheduler(unittest.TestCase):
+    """Test cases for change-rate-aware revisit scheduling"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmp_dir, 'revisits.db')
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_bandwidth_moves_to_changing_sources(self):
+        """Test a static source backs off, a changing one is visited more and the budget holds"""
+        settings = dict(MONITORING_INTERVAL=3600, REVISIT_MIN_INTERVAL=600, REVISIT_MAX_INTERVAL=86400,
+                        REVISIT_MIN_VISITS=3, REVISIT_HISTORY=20, REVISIT_YIELD_WEIGHT=1.0)
+        with mock.patch.multiple(Config, **settings):
+            scheduler = RevisitScheduler(self.db)
+        start = 1_700_000_000
+        for visit in range(7):
+            now = start + visit * 3600
+            scheduler.record_visit('static', 'same', [{'pattern': 'email', 'matched_text': 'a@x.onion'}], now=now)
+            scheduler.record_visit('busy', f"hash{visit}",
+                                   [{'pattern': 'email', 'matched_text': f"user{visit}@x.onion"}], now=now)
+        scheduler.record_visit('fresh', 'first', now=now)
+        
+        # 'fresh' keeps the fixed interval until it has history; 'busy' gets the rest of the budget
+        self.assertEqual(scheduler.get('static').interval, 86400)
+        self.assertEqual(scheduler.get('fresh').interval, 3600)
+        self.assertAlmostEqual(scheduler.get('busy').interval, 86400 / 47)
+        self.assertEqual(scheduler.due(['static', 'busy', 'fresh'], now=now + 1900), ['busy'])
+        self.assertAlmostEqual(scheduler.seconds_until_due(['static', 'fresh'], now=now), 3600)
+        scheduler.close()
+        
+        with mock.patch.multiple(Config, **settings):
+            reopened = RevisitScheduler(self.db)
+        report = reopened.report()
+        rows = {row['source']: row for row in report['sources']}
+        self.assertEqual(rows['busy']['planned_per_day'], 47)
+        self.assertEqual(rows['busy']['actual_per_day'], 24)
+        self.assertEqual((rows['busy']['changes'], rows['busy']['new_findings']), (6, 6))
+        self.assertEqual((rows['static']['changes'], rows['static']['new_findings']), (0, 0))
+        self.assertEqual(rows['static']['changes_per_day'], 0)
+        self.assertIsNone(rows['fresh']['actual_per_day'])
+        self.assertEqual(report['fixed_per_day'], 72)
+        self.assertEqual(report['planned_per_day'], report['fixed_per_day'])
+        reopened.close()
+    
+    def test_scheduled_runs_skip_sources_not_due(self):
+        """Test a scheduled run defers sources visited moments ago and both run paths record visits"""
+        network = MockOnionNetwork(hosts=3, seed=3)
+        
+        with MockOnionServer(network) as server:
+            overrides = dict(server.config_overrides(), REVISIT_ENABLED=True,
+                             HOST_HEALTH_DB=os.path.join(self.tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(self.tmp_dir, STORE_FINDINGS=False)
+                first = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                 pipeline=True, scheduled=True)
+                second = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                  pipeline=True, scheduled=True)
+                # Same monitor and crawler, as in the daemon: every source is fetched again
+                third = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                 pipeline=False)
+                planned = monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                   planner=True, scheduled=True)
+        
+        sources = [row['source'] for row in first['revisits']['sources']]
+        self.assertIn('hidden_wiki:main', sources)
+        self.assertTrue(first['revisits']['scheduled'])
+        self.assertEqual(first['revisits']['deferred'], [])
+        self.assertGreater(first['statistics']['patterns_found'], 0)
+        self.assertEqual(sorted(second['revisits']['deferred']), sorted(sources))
+        self.assertEqual(second['statistics']['patterns_found'], 0)
+        self.assertEqual({row['visits'] for row in third['revisits']['sources']}, {2})
+        self.assertEqual({row['changes'] for row in third['revisits']['sources']}, {0})
+        self.assertEqual(third['statistics']['errors'], 0)
+        self.assertFalse(planned['revisits']['scheduled'])
+        self.assertEqual(planned['revisits']['deferred'], [])
+        monitor.revisits.close()
+
+
+class TestLogging(unittest.TestCase):
+    """Test cases for queued, lazy and rate-limited logging"""
+    
+    def _record(self, message='Error fetching %s', args=('http://a.onion',), level=40, lineno=10):
+        return logging.LogRecord('DarkWebMonitor', level, 'crawler.py', lineno, message, args, None)
+    
+    def test_disabled_levels_skip_formatting(self):
+        """Test %-style arguments are not formatted for disabled levels"""
+        formatted = []
+        
+        class Expensive:
+            def __str__(self):
+                formatted.append(1)
+                return 'expensive'
+        
+        logger = get_logger()
+        previous = logger.logger.level
+        logger.logger.setLevel(logging.INFO)
+        try:
+            logger.debug("value %s", Expensive())
+        finally:
+            logger.logger.setLevel(previous)
+        
+        self.assertEqual(formatted, [])
+    
+    def test_queued_records_reach_file_with_caller_location(self):
+        """Test records are written by the background writer with the caller's location"""
+        logger = get_logger()
+        marker = f"queued-{os.getpid()}-{time.time()}"
+        logger.warning("marker %s", marker)
+        logger.flush()
+        
+        with open(logger.listener.handlers[0].baseFilename) as f:
+            line = next(l for l in f if marker in l)
+        self.assertIn('test_monitor.py', line)
+    
+    def test_rate_limit_per_call_site(self):
+        """Test repeated records from one call site are limited and the drop count reported"""
+        rate_filter = RateLimitFilter(limit=2, window=3600)
+        passed = [rate_filter.filter(self._record()) for _ in range(5)]
+        
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertTrue(rate_filter.filter(self._record(lineno=11)))
+        self.assertTrue(rate_filter.filter(self._record(level=20)))
+        
+        rate_filter.window = 0
+        record = self._record()
+        self.assertTrue(rate_filter.filter(record))
+        self.assertEqual(record.getMessage(), 'Error fetching http://a.onion (3 similar messages suppressed)')
+    
+    def test_json_format(self):
+        """Test JSON log lines carry level, message and location"""
+        entry = json.loads(JsonFormatter().format(self._record()))
+        
+        self.assertEqual(entry['level'], 'ERROR')
+        self.assertEqual(entry['message'], 'Error fetching http://a.onion')
+        self.assertEqual(entry['line'], 10)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the metrics registry"""
+    
+    def test_prometheus_rendering(self):
+        """Test counters, gauges and histograms render in text format"""
+        registry = MetricsRegistry()
+        registry.counter('fetches_total', 'Fetches').inc(host='a.onion')
+        registry.counter('fetches_total').inc(2, host='a.onion')
+        registry.gauge('queue_depth', 'Depth').set(3, stage='fetch')
+        registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)).observe(0.5)
+        
+        text = registry.render_prometheus()
+        
+        self.assertIn('fetches_total{host="a.onion"} 3', text)
+        self.assertIn('queue_depth{stage="fetch"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 1', text)
+        self.assertIn('latency_seconds_count 1', text)
+    
+    def test_scanner_records_per_pattern_metrics(self):
+        """Test scan_text records scan time and findings per pattern"""
+        PatternScanner().scan_text("mail admin@example.com", "test_url")
+        
+        snapshot = get_metrics().snapshot()
+        patterns = {v['labels']['pattern'] for v in snapshot['darkwalker_scan_pattern_seconds']['values']}
+        findings = {v['labels']['pattern'] for v in snapshot['darkwalker_findings_total']['values']}
+        
+        self.assertIn('bitcoin', patterns)
+        self.assertIn('email', findings)
+    
+    def test_run_deltas_worker_merge_and_label_cap(self):
+        """Test per-run snapshots, merging a worker's drained values and folding extra hosts"""
+        registry = MetricsRegistry()
+        registry.counter('fetches_total', 'Fetches').inc(5, host='a.onion')
+        registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)).observe(0.5)
+        since = registry.export()
+        registry.counter('fetches_total').inc(2, host='a.onion')
+        
+        worker = MetricsRegistry()
+        worker.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)).observe(0.05)
+        worker.counter('findings_total', 'Findings').inc(3, pattern='email')
+        registry.merge(worker.drain())
+        self.assertEqual(worker.snapshot(), {})
+        
+        run = registry.snapshot(since=since)
+        self.assertEqual(run['fetches_total']['values'], [{'labels': {'host': 'a.onion'}, 'value': 2}])
+        self.assertEqual(run['latency_seconds']['values'][0]['count'], 1)
+        self.assertEqual(run['latency_seconds']['values'][0]['buckets'], {'0.1': 1})
+        self.assertEqual(run['findings_total']['values'][0]['value'], 3)
+        self.assertEqual(registry.snapshot()['latency_seconds']['values'][0]['count'], 2)
+        
+        limit = LabelLimiter(2)
+        self.assertEqual([limit(h) for h in ['a', 'b', 'c', 'a', 'd']], ['a', 'b', 'other', 'a', 'other'])
+    
+    def test_process_pipeline_reports_scan_metrics_per_run(self):
+        """Test scan metrics from worker processes reach the run snapshot, counted once per run"""
+        network = MockOnionNetwork(hosts=3, seed=3)
+        
+        with MockOnionServer(network) as server, tempfile.TemporaryDirectory() as tmp_dir:
+            overrides = dict(server.config_overrides(), PIPELINE_USE_PROCESSES=True,
+                             HOST_HEALTH_DB=os.path.join(tmp_dir, 'hosts.db'))
+            with mock.patch.multiple(Config, **overrides), \
+                    mock.patch('dark_web_crawler.random.uniform', return_value=0):
+                monitor = make_monitor(tmp_dir, STORE_FINDINGS=False)
+                runs = [monitor.monitor_dark_web(search_query='leaked', search_engines=['ahmia'],
+                                                 pipeline=True) for _ in range(2)]
+        
+        for results in runs:
+            found = sum(v['value'] for v in results['metrics']['darkwalker_findings_total']['values'])
+            self.assertEqual(found, results['statistics']['patterns_found'])
+            self.assertIn('darkwalker_scan_pattern_seconds', results['metrics'])
+        self.assertGreater(runs[1]['statistics']['patterns_found'], 0)
+    
+    def test_metrics_endpoint(self):
+        """Test the HTTP endpoint serves the registry"""
+        from urllib.request import urlopen
+        
+        registry = MetricsRegistry()
+        registry.counter('up_total', 'Up').inc()
+        server = MetricsServer(port=0, registry=registry).start()
+        try:
+            with urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.stop()
+        
+        self.assertIn('up_total 1', body)
+
+
+class TestProfiler(unittest.TestCase):
+    """Test cases for the scan profiler"""
+    
+    def test_profiling_records_each_pattern(self):
+        """Test opt-in profiling records time, bytes and matches"""
+        scanner = PatternScanner()
+        profiler = scanner.enable_profiling()
+        
+        scanner.scan_text("mail admin@example.com or root@example.com", "test_url")
+        
+        self.assertEqual(set(profiler.profiles), set(scanner.patterns))
+        self.assertEqual(profiler.profiles['email'].matches, 2)
+        self.assertGreater(profiler.profiles['email'].bytes_scanned, 0)
+    
+    def test_outlier_detection(self):
+        """Test calls much slower per byte than average are flagged"""
+        profiler = ScanProfiler(outlier_factor=10, min_outlier_seconds=0.001)
+        profiler.record('slow', 0.001, 10_000, 0, 'normal')
+        profiler.record('slow', 0.5, 10_000, 0, 'evil')
+        
+        self.assertEqual(profiler.profiles['slow'].outliers[0]['source'], 'evil')
+    
+    def test_superlinear_pattern_flagged(self):
+        """Test a backtracking-prone pattern is flagged and a linear one is not"""
+        import re
+        
+        self.assertGreater(growth_exponent(re.compile(r'(a|aa)*b'), sizes=(20, 24, 28)), 1.3)
+        self.assertLess(growth_exponent(re.compile(r'\bssn\b')), 1.3)
+    
+    def test_profile_corpus_ranks_patterns(self):
+        """Test profile_corpus returns every active pattern ranked by cost"""
+        scanner = PatternScanner()
+        report = profile_corpus(scanner, {'doc': 'admin@example.com 192.168.1.1'}, check_growth=False)
+        
+        self.assertEqual(len(report), len(scanner.patterns))
+        self.assertEqual(report, sorted(report, key=lambda r: r['seconds'], reverse=True))
+        self.assertIsNone(scanner.profiler)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the synthetic corpus and benchmark comparison"""
+    
+    def test_corpus_is_deterministic(self):
+        """Test the same seed produces identical documents of the requested size"""
+        first = SyntheticCorpus(seed=7).generate('html_page', 5000, index=3)
+        second = SyntheticCorpus(seed=7).generate('html_page', 5000, index=3)
+        
+        self.assertEqual(first, second)
+        self.assertGreaterEqual(len(first), 5000)
+        self.assertNotEqual(first, SyntheticCorpus(seed=8).generate('html_page', 5000, index=3))
+        self.assertIn('.onion', SyntheticCorpus().generate('link_farm', 2000))
+    
+    def test_regression_beyond_tolerance(self):
+        """Test only throughput drops larger than the tolerance are reported"""
+        baseline = {'scan': {'mb_per_second': 10.0}, 'parse': {'mb_per_second': 10.0}}
+        current = {'scan': {'mb_per_second': 8.0}, 'parse': {'mb_per_second': 6.0},
+                   'new': {'mb_per_second': 1.0}}
+        
+        regressions = compare(current, baseline, tolerance=0.25)
+        
+        self.assertEqual([r['benchmark'] for r in regressions], ['parse'])
+
+
+class TestStartup(unittest.TestCase):
+    """Startup cost of the CLI"""
+    
+    SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    # Crawler, table and colour dependencies, and the SQLite-backed stores
+    HEAVY_MODULES = ('requests', 'bs4', 'tabulate', 'colorama', 'sqlite3', 'monitor',
+                     'dark_web_crawler', 'findings_store', 'link_graph', 'host_health',
+                     'checkpoint', 'alert_outbox', 'revisit_scheduler')
+    
+    def run_cli(self, code, *args):
+        """Run code in a fresh interpreter in src/; return its stdout and the files it left"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, RESULTS_DIR=tmpdir, LOG_FILE=os.path.join(tmpdir, 'test.log'),
+                       TOR_ENABLED='False')
+            code = f"import sys; sys.argv = ['main'] + {list(args)!r}; {code}"
+            proc = subprocess.run(
+                [sys.executable, '-c', code],
+                cwd=self.SRC_DIR, env=env, capture_output=True, text=True, timeout=60
+            )
+            self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+            return proc.stdout, sorted(set(os.listdir(tmpdir)) - {'test.log'})
+    
+    def test_cli_import_skips_heavy_modules(self):
+        """Test importing the CLI loads none of the heavy modules"""
+        stdout, _ = self.run_cli("import cli; print(','.join(sorted(sys.modules)))")
+        loaded = set(stdout.strip().split(','))
+        self.assertIn('cli', loaded)
+        self.assertEqual(loaded & set(self.HEAVY_MODULES), set())
+    
+    def test_quick_commands_skip_heavy_imports(self):
+        """Test info and the pattern commands load no heavy module and create no files"""
+        code = "import cli; cli.main(); print('modules:' + ','.join(sorted(sys.modules)))"
+        for args in (['info'], ['patterns'], ['add-pattern', r'acme\d+', '-n', 'acme']):
+            stdout, created = self.run_cli(code, *args)
+            loaded = set(stdout.rsplit('modules:', 1)[1].strip().split(','))
+            self.assertEqual(loaded & set(self.HEAVY_MODULES) - {'colorama'}, set(), args)
+            self.assertEqual(created, [], args)
+        self.assertIn('Pattern added successfully', stdout)
+    
+    def test_monitor_builds_crawler_on_first_use(self):
+        """Test the crawler is only constructed when accessed"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            monitor = make_monitor(tmpdir, STORE_FINDINGS=False, CHECKPOINT_ENABLED=False)
+            self.assertIsNone(monitor._crawler)
+            crawler = monitor.crawler
+            self.assertIsInstance(crawler, DarkWebCrawler)
+            self.assertIs(monitor.crawler, crawler)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests"""
     